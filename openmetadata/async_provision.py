@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Асинхронная настройка сервисов ClickHouse и их пайплайнов в OpenMetadata (asyncio + httpx).
+
+Делает то же, что reconcile.py и provision.py, но в одном event loop: история запусков всех сервисов
+(для адаптивного расписания) запрашивается одновременно до сверки, для каждого сервиса поиск сервиса
+и поиск пайплайна запрашиваются одновременно, обновление
+сервиса и изменение пайплайна отправляются параллельно, готовность деплоя нового пайплайна проверяется
+через asyncio.sleep, не занимая поток. Сервисы обрабатываются конкурентно, не более --concurrency одновременно.
+
+httpx не входит в зависимости скриптов: pip install httpx.
+
+    python async_provision.py                       # сервис из cfg.py
+    python async_provision.py services.toml --trigger
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import httpx
+except ImportError:  # httpx нужен только этому скрипту
+    httpx = None
+
+from cfg import OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN, SCHEDULE_ADAPTIVE
+from om_client import (
+    DEFAULT_TIMEOUT, DEFAULT_TIMEOUTS, RETRYABLE_POST_STATUSES, RETRYABLE_STATUSES, OpenMetadataClient, RequestMetrics,
+)
+from provision import load_manifest, print_summary
+from reconcile import (
+    CREATED, NOOP, PIPELINES_PATH, SERVICES_PATH, UPDATED, DesiredState, ReconcileResult, check_deploy_response,
+    desired_from_cfg, pipeline_operations, raise_for_status, restagger_schedules, service_differs,
+)
+from schedule import adaptive_interval
+
+
+class AsyncOpenMetadataClient:
+    """
+    Асинхронный клиент REST API OpenMetadata с той же политикой, что и om_client.OpenMetadataClient:
+    keep-alive соединения, таймауты по эндпоинтам, повторы с экспоненциальной задержкой и джиттером
+    на 429/5xx (POST - только на 429) и метрики задержек.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str = "",
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeouts: Optional[dict[str, float]] = None,
+    ):
+        if httpx is None:
+            raise RuntimeError("httpx is required for async provisioning: pip install httpx")
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.metrics = RequestMetrics()
+
+        headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "User-Agent": "openmetadata-clickhouse-helper/1.0",
+        }
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def __aenter__(self) -> "AsyncOpenMetadataClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> "httpx.Response":
+        """
+        Выполняет запрос к API. Ответы с ошибкой возвращаются как есть, как в OpenMetadataClient.request.
+        """
+        method = method.upper()
+        timeout = timeout or self._timeout_for(path)
+        endpoint = OpenMetadataClient._endpoint_name(path)
+        retryable_statuses = RETRYABLE_POST_STATUSES if method == "POST" else RETRYABLE_STATUSES
+
+        for attempt in range(self.max_retries + 1):
+            started_at = time.perf_counter()
+            try:
+                response = await self.client.request(method, path, timeout=timeout, **kwargs)
+            except httpx.TransportError:
+                self.metrics.record(method, endpoint, 0, time.perf_counter() - started_at)
+                if attempt == self.max_retries or method == "POST":
+                    raise
+                await self._sleep(attempt, None)
+                continue
+
+            self.metrics.record(method, endpoint, response.status_code, time.perf_counter() - started_at)
+            if response.status_code in retryable_statuses and attempt < self.max_retries:
+                await self._sleep(attempt, response.headers.get("Retry-After"))
+                continue
+            return response
+        raise AssertionError("unreachable")
+
+    async def get(self, path: str, **kwargs) -> "httpx.Response":
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> "httpx.Response":
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs) -> "httpx.Response":
+        return await self.request("PUT", path, **kwargs)
+
+    async def patch(self, path: str, **kwargs) -> "httpx.Response":
+        return await self.request("PATCH", path, **kwargs)
+
+    def print_metrics(self) -> None:
+        for line in self.metrics.summary():
+            print(line)
+
+    def _timeout_for(self, path: str) -> float:
+        for prefix, timeout in self.timeouts.items():
+            if path.startswith(prefix):
+                return timeout
+        return DEFAULT_TIMEOUT
+
+    async def _sleep(self, attempt: int, retry_after: Optional[str]) -> None:
+        delay = self.backoff_factor * 2 ** attempt + random.uniform(0, self.backoff_factor)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        await asyncio.sleep(delay)
+
+
+class AsyncReconciler:
+    """
+    Асинхронный аналог reconcile.Reconciler с тем же результатом для каждого сервиса.
+    Сравнение с желаемым состоянием общее с Reconciler (service_differs, pipeline_operations).
+    """
+
+    def __init__(self, client: AsyncOpenMetadataClient, trigger: bool = False, deploy_timeout: float = 120,
+                 dry_run: bool = False, adaptive_schedule: bool = False):
+        self.client = client
+        self.trigger = trigger
+        self.deploy_timeout = deploy_timeout
+        self.dry_run = dry_run
+        self.adaptive_schedule = adaptive_schedule
+
+    async def reconcile_all(self, states: Iterable[DesiredState], max_concurrency: int = 8) -> List[ReconcileResult]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def limited(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        states = list(states)
+        scheduled = [state for state in states if state.schedule]
+        if self.adaptive_schedule and scheduled:
+            # Интервалы подбираются до сверки: расписания всех сервисов разносятся заново, как в Reconciler
+            intervals = await asyncio.gather(*(limited(self._adaptive_interval(state)) for state in scheduled))
+            states = restagger_schedules(states, dict(zip((state.service_name for state in scheduled), intervals)))
+        return list(await asyncio.gather(*(limited(self.reconcile(state)) for state in states)))
+
+    async def reconcile(self, state: DesiredState) -> ReconcileResult:
+        result = ReconcileResult(state.service_name)
+        try:
+            # Сервис и пайплайн друг от друга не зависят
+            service, pipeline = await asyncio.gather(
+                self._get(f"{SERVICES_PATH}/name/{state.service_name}", params={"fields": "connection"}),
+                self._get(f"{PIPELINES_PATH}/name/{state.pipeline_fqn}"),
+            )
+            desired = state.pipeline
+
+            if service is None:
+                # Пайплайну нужен id сервиса, поэтому здесь порядок строгий
+                result.service = CREATED
+                result.actions.append(f"create service {state.service_name}")
+                service_id = None if self.dry_run else await self._put_service(state)
+                pipeline_id = await self._reconcile_pipeline(state, desired, pipeline, service_id, result)
+            else:
+                service_task = self._reconcile_service(state, service, result)
+                pipeline_task = self._reconcile_pipeline(state, desired, pipeline, service["id"], result)
+                _, pipeline_id = await asyncio.gather(service_task, pipeline_task)
+
+            if self.dry_run or pipeline_id is None:
+                return result
+            if result.service != NOOP or result.pipeline != NOOP:
+                result.deployed = await self._deploy(pipeline_id, bool(pipeline and pipeline.get("deployed")))
+                if self.trigger:
+                    await self._post(f"{PIPELINES_PATH}/trigger/{pipeline_id}")
+                    result.triggered = True
+        except (httpx.HTTPError, RuntimeError) as error:  # pyright: ignore [reportOptionalMemberAccess]
+            result.error = str(error)
+        return result
+
+    async def _reconcile_service(self, state: DesiredState, current: Dict[str, Any], result: ReconcileResult) -> None:
+        if not service_differs(current, state.service):
+            return
+        result.service = UPDATED
+        result.actions.append(f"update service {state.service_name}")
+        if not self.dry_run:
+            await self._put_service(state)
+
+    async def _reconcile_pipeline(self, state: DesiredState, desired: Dict[str, Any], current: Optional[Dict[str, Any]],
+                                  service_id: Optional[str], result: ReconcileResult) -> Optional[str]:
+        if current is None:
+            result.pipeline = CREATED
+            result.actions.append(f"create pipeline {state.pipeline_fqn}")
+            if self.dry_run:
+                return None
+            payload = {**desired, "service": {"id": service_id, "type": "databaseService"}}
+            return (await self._post(PIPELINES_PATH, json=payload))["id"]
+
+        operations = pipeline_operations(current, desired)
+        if not operations:
+            return current["id"]
+
+        result.pipeline = UPDATED
+        result.actions.extend(f"{op['op']} {state.pipeline_fqn}{op['path']}" for op in operations)
+        if not self.dry_run:
+            response = await self.client.patch(
+                f"{PIPELINES_PATH}/{current['id']}",
+                content=json.dumps(operations),
+                headers={"Content-Type": "application/json-patch+json"},
+            )
+            raise_for_status(response)
+        return current["id"]
+
+    async def _adaptive_interval(self, state: DesiredState) -> int:
+        base_interval = state.schedule.interval_minutes  # pyright: ignore [reportOptionalMemberAccess]
+        try:
+            return adaptive_interval(await self._fetch_history(state), base_interval)
+        except (httpx.HTTPError, RuntimeError) as error:  # pyright: ignore [reportOptionalMemberAccess]
+            print(f"{state.service_name}: run history is unavailable, keeping {base_interval} min interval: {error}")
+            return base_interval
+
+    async def _fetch_history(self, state: DesiredState, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        Статусы запусков пайплайна за последние days дней, как schedule.fetch_pipeline_history.
+        """
+        end_ts = int(time.time() * 1000)
+        history = await self._get(
+            f"{PIPELINES_PATH}/{state.pipeline_fqn}/pipelineStatus",
+            params={"startTs": end_ts - days * 24 * 3600 * 1000, "endTs": end_ts},
+        )
+        return (history or {}).get("data", [])
+
+    async def _deploy(self, pipeline_id: str, was_deployed: bool) -> bool:
+        """
+        Деплоит пайплайн, как Reconciler._deploy: deployed опрашивается только для ещё не задеплоенного пайплайна.
+        """
+        check_deploy_response(await self._post(f"{PIPELINES_PATH}/deploy/{pipeline_id}"), pipeline_id)
+        if was_deployed:
+            return True
+        delay = 0.5
+        deadline = time.monotonic() + self.deploy_timeout
+        while True:
+            pipeline = await self._get(f"{PIPELINES_PATH}/{pipeline_id}")
+            if pipeline and pipeline.get("deployed"):
+                return True
+            if time.monotonic() + delay > deadline:
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10)
+
+    async def _put_service(self, state: DesiredState) -> str:
+        response = await self.client.put(SERVICES_PATH, json=state.service)
+        raise_for_status(response)
+        return response.json()["id"]
+
+    async def _get(self, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+        response = await self.client.get(path, **kwargs)
+        if response.status_code == 404:
+            return None
+        raise_for_status(response)
+        return response.json()
+
+    async def _post(self, path: str, **kwargs) -> Dict[str, Any]:
+        response = await self.client.post(path, **kwargs)
+        raise_for_status(response)
+        return response.json() if response.content else {}
+
+
+async def provision_async(states: List[DesiredState], concurrency: int = 8, trigger: bool = False,
+                          deploy_timeout: float = 120, dry_run: bool = False,
+                          adaptive_schedule: bool = False) -> List[ReconcileResult]:
+    """
+    Приводит все сервисы к желаемому состоянию в текущем event loop.
+    """
+    async with AsyncOpenMetadataClient(
+        OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN, pool_size=concurrency * 2  # pyright: ignore [reportArgumentType]
+    ) as client:
+        reconciler = AsyncReconciler(client, trigger=trigger, deploy_timeout=deploy_timeout, dry_run=dry_run,
+                                     adaptive_schedule=adaptive_schedule)
+        results = await reconciler.reconcile_all(states, concurrency)
+        client.print_metrics()
+    return results
+
+
+def provision(states: List[DesiredState], concurrency: int = 8, **kwargs) -> List[ReconcileResult]:
+    """
+    Синхронная обёртка над provision_async для вызова из обычного кода.
+    """
+    return asyncio.run(provision_async(states, concurrency, **kwargs))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Асинхронная настройка сервисов ClickHouse в OpenMetadata")
+    parser.add_argument("manifest", nargs="?", help="Путь к TOML-манифесту (provision.py). Без него - сервис из cfg.py")
+    parser.add_argument("--concurrency", type=int, default=8, help="Сколько сервисов обрабатывать одновременно")
+    parser.add_argument("--trigger", action="store_true", help="Запустить изменённые пайплайны")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать отличия")
+    parser.add_argument("--deploy-timeout", type=float, default=120)
+    parser.add_argument("--adaptive-schedule", action="store_true", default=SCHEDULE_ADAPTIVE,
+                        help="Подобрать интервал по истории запусков для сервисов с interval_minutes")
+    args = parser.parse_args()
+
+    states = load_manifest(args.manifest) if args.manifest else desired_from_cfg()
+    started_at = time.perf_counter()
+    results = provision(states, args.concurrency, trigger=args.trigger, deploy_timeout=args.deploy_timeout,
+                        dry_run=args.dry_run, adaptive_schedule=args.adaptive_schedule)
+    print_summary(results, time.perf_counter() - started_at)
+    if args.dry_run:
+        for result in results:
+            for action in result.actions:
+                print(f"{result.service_name}: {action}")
+    if any(result.error for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,17 @@ OPENMETADATA_HOST_PORT = os.getenv('OPENMETADATA_HOST_PORT')
 OPENMETADATA_API_TOKEN = os.getenv('OPENMETADATA_API_TOKEN', '')
 
 SCHEDULE_INTERVAL = os.getenv('SCHEDULE_INTERVAL', '0 * * * *')
+# Разнесение запусков: если задан интервал в минутах, расписание строится со смещением по хешу имени сервиса
+# вместо SCHEDULE_INTERVAL. Старты распределяются по окну SCHEDULE_WINDOW_MINUTES слотами по
+# SCHEDULE_SLOT_MINUTES, не более SCHEDULE_MAX_CONCURRENCY запусков на слот (0 - без ограничения)
+SCHEDULE_INTERVAL_MINUTES = int(os.getenv('SCHEDULE_INTERVAL_MINUTES', '0'))
+SCHEDULE_WINDOW_MINUTES = int(os.getenv('SCHEDULE_WINDOW_MINUTES', '60'))
+SCHEDULE_SLOT_MINUTES = int(os.getenv('SCHEDULE_SLOT_MINUTES', '5'))
+SCHEDULE_MAX_CONCURRENCY = int(os.getenv('SCHEDULE_MAX_CONCURRENCY', '0'))
+# Адаптивный интервал по истории запусков (reconcile.py / provision.py)
+SCHEDULE_ADAPTIVE = bool(os.getenv('SCHEDULE_ADAPTIVE', ''))
+SCHEDULE_MIN_INTERVAL_MINUTES = int(os.getenv('SCHEDULE_MIN_INTERVAL_MINUTES', '15'))
+SCHEDULE_MAX_INTERVAL_MINUTES = int(os.getenv('SCHEDULE_MAX_INTERVAL_MINUTES', '1440'))
 
 # ClickHouse service definition
 CLICKHOUSE_SERVICE_NAME = os.getenv('CLICKHOUSE_SERVICE_NAME')
@@ -21,6 +32,8 @@ CLICKHOUSE_USERNAME = os.getenv('CLICKHOUSE_USERNAME')
 CLICKHOUSE_PASSWORD = os.getenv('CLICKHOUSE_PASSWORD')
 CLICKHOUSE_DB_NAME = os.getenv('CLICKHOUSE_DB')
 CLICKHOUSE_DATABASE_SCHEMA = os.getenv('CLICKHOUSE_DATABASE_SCHEMA')
+# Количество потоков для параллельной обработки таблиц в кастомном ингесторе (пусто - последовательно)
+CLICKHOUSE_INGESTION_THREADS = os.getenv('CLICKHOUSE_INGESTION_THREADS')
 
 
 #Фильтры
@@ -14,18 +14,25 @@ def build_filter_pattern(
         pattern["excludes"] = excludes
     return pattern or None
 
-def create_filters() -> dict[str, dict[str, list[str]]]:
+def create_filters(
+    db_includes: list[str] = CLICKHOUSE_DB_INCLUDES,
+    db_excludes: list[str] = CLICKHOUSE_DB_EXCLUDES,
+    schema_includes: list[str] = CLICKHOUSE_SCHEMA_INCLUDES,
+    schema_excludes: list[str] = CLICKHOUSE_SCHEMA_EXCLUDES,
+    table_includes: list[str] = CLICKHOUSE_TABLE_INCLUDES,
+    table_excludes: list[str] = CLICKHOUSE_TABLE_EXCLUDES,
+) -> dict[str, dict[str, list[str]]]:
     filters = {}
 
-    database_pattern = build_filter_pattern(CLICKHOUSE_DB_INCLUDES, CLICKHOUSE_DB_EXCLUDES)
+    database_pattern = build_filter_pattern(db_includes, db_excludes)
     if database_pattern:
         filters["databaseFilterPattern"] = database_pattern
 
-    schema_pattern = build_filter_pattern(CLICKHOUSE_SCHEMA_INCLUDES, CLICKHOUSE_SCHEMA_EXCLUDES)
+    schema_pattern = build_filter_pattern(schema_includes, schema_excludes)
     if schema_pattern:
         filters["schemaFilterPattern"] = schema_pattern
 
-    table_pattern = build_filter_pattern(CLICKHOUSE_TABLE_INCLUDES, CLICKHOUSE_TABLE_EXCLUDES)
+    table_pattern = build_filter_pattern(table_includes, table_excludes)
     if table_pattern:
         filters["tableFilterPattern"] = table_pattern
         
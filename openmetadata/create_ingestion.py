@@ -1,22 +1,21 @@
 import time
 from pprint import pprint
-
-import requests
+from typing import Dict, List, Optional
 
 from cfg import OPENMETADATA_HOST_PORT, CLICKHOUSE_SERVICE_NAME, OPENMETADATA_API_TOKEN, CLICKHOUSE_USE_FQN_FILTERS, \
-    CLICKHOUSE_MARK_DELETED_TABLES, SCHEDULE_INTERVAL, CLICKHOUSE_SCHEMA_INCLUDES, CLICKHOUSE_MARK_DELETED_SCHEMAS, \
+    CLICKHOUSE_MARK_DELETED_TABLES, CLICKHOUSE_SCHEMA_INCLUDES, CLICKHOUSE_MARK_DELETED_SCHEMAS, \
     CLICKHOUSE_OVERRIDE_METADATA
 from create_filters import create_filters
+from om_client import get_client
+from schedule import default_schedule_interval
 
 
 def delete_pipeline_if_exists(pipeline_name: str) -> None:
     """Ensure we start from a clean slate before creating an ingestion pipeline."""
-    auth_headers = {"Authorization": f"Bearer {OPENMETADATA_API_TOKEN}"}
-    lookup = requests.get(
-        f"{OPENMETADATA_HOST_PORT}/api/v1/services/ingestionPipelines/name/{pipeline_name}",
-        headers=auth_headers,
+    client = get_client(OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN)  # pyright: ignore [reportArgumentType]
+    lookup = client.get(
+        f"/api/v1/services/ingestionPipelines/name/{pipeline_name}",
         params={"fields": "id"},
-        timeout=30,
     )
 
     if lookup.status_code == 404:
@@ -25,47 +24,68 @@ def delete_pipeline_if_exists(pipeline_name: str) -> None:
 
     lookup.raise_for_status()
     pipeline_id = lookup.json()["id"]
-    delete = requests.delete(
-        f"{OPENMETADATA_HOST_PORT}/api/v1/services/ingestionPipelines/{pipeline_id}",
-        headers=auth_headers,
+    delete = client.delete(
+        f"/api/v1/services/ingestionPipelines/{pipeline_id}",
         params={"hardDelete": "true"},
-        timeout=30,
     )
     delete.raise_for_status()
     print(f"Removed existing ingestion '{pipeline_name}' ({pipeline_id}).")
 
-def main():
-    resp = requests.get(
-        f"{OPENMETADATA_HOST_PORT}/api/v1/services/databaseServices/name/{CLICKHOUSE_SERVICE_NAME}",
-        headers={"Authorization": f"Bearer {OPENMETADATA_API_TOKEN}"},
-        params={"fields": "id"},
-        timeout=30,
-    )
-    service_id = resp.json()["id"]
-    print(service_id)
-    print(resp.json())
-    payload = {
-        "name": "clickhouse_metadata_hourly",
+PIPELINE_NAME = "clickhouse_metadata_hourly"
+
+
+def build_pipeline_payload(
+    service_id: Optional[str] = None,
+    schedule_interval: Optional[str] = None,
+    use_fqn_for_filtering: bool = CLICKHOUSE_USE_FQN_FILTERS,
+    override_metadata: bool = CLICKHOUSE_OVERRIDE_METADATA,
+    mark_deleted_tables: bool = CLICKHOUSE_MARK_DELETED_TABLES,
+    mark_deleted_schemas: bool = CLICKHOUSE_MARK_DELETED_SCHEMAS,
+    filters: Optional[Dict[str, Dict[str, List[str]]]] = None,
+) -> Dict[str, object]:
+    """
+    Тело запроса на создание пайплайна метаданных. По умолчанию все параметры берутся из cfg,
+    filters - из create_filters(), schedule_interval - из schedule.default_schedule_interval.
+    Без service_id ссылка на сервис не добавляется.
+    """
+    if schedule_interval is None:
+        schedule_interval = default_schedule_interval(CLICKHOUSE_SERVICE_NAME)
+    payload: Dict[str, object] = {
+        "name": PIPELINE_NAME,
         "pipelineType": "metadata",
-        "service": {"id": service_id, "type": "databaseService"},
         "sourceConfig": {
             "config": {
                 "type": "DatabaseMetadata",
-                "useFqnForFiltering": CLICKHOUSE_USE_FQN_FILTERS,
-                "overrideMetadata": CLICKHOUSE_OVERRIDE_METADATA,
-                "markDeletedTables": CLICKHOUSE_MARK_DELETED_TABLES,
-                "markDeletedSchemas": CLICKHOUSE_MARK_DELETED_SCHEMAS,
+                "useFqnForFiltering": use_fqn_for_filtering,
+                "overrideMetadata": override_metadata,
+                "markDeletedTables": mark_deleted_tables,
+                "markDeletedSchemas": mark_deleted_schemas,
             }
         },
-        "airflowConfig": {"scheduleInterval": SCHEDULE_INTERVAL, "pipelineTimezone": "UTC"},
+        "airflowConfig": {"scheduleInterval": schedule_interval, "pipelineTimezone": "UTC"},
         "raiseOnError": True
     }
-    filters = create_filters()
+    if service_id:
+        payload["service"] = {"id": service_id, "type": "databaseService"}
+    if filters is None:
+        filters = create_filters()
     if filters:
-        payload["sourceConfig"]["config"].update(filters)
-    resp = requests.post(
-        f"{OPENMETADATA_HOST_PORT}/api/v1/services/ingestionPipelines",
-        headers={"Authorization": f"Bearer {OPENMETADATA_API_TOKEN}", "Content-Type": "application/json"},
+        payload["sourceConfig"]["config"].update(filters)  # pyright: ignore [reportIndexIssue]
+    return payload
+
+
+def main():
+    client = get_client(OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN)  # pyright: ignore [reportArgumentType]
+    resp = client.get(
+        f"/api/v1/services/databaseServices/name/{CLICKHOUSE_SERVICE_NAME}",
+        params={"fields": "id"},
+    )
+    service_id = resp.json()["id"]
+    print(service_id)
+    print(resp.json())
+    payload = build_pipeline_payload(service_id)
+    resp = client.post(
+        "/api/v1/services/ingestionPipelines",
         json=payload,
         timeout=60,
     )
@@ -75,17 +95,14 @@ def main():
     pipeline_id = pipeline["id"]
     for action in ("deploy", "trigger"):
         print(action)
-        resp = requests.post(
-            f"{OPENMETADATA_HOST_PORT}/api/v1/services/ingestionPipelines/{action}/{pipeline_id}",
-            headers={"Authorization": f"Bearer {OPENMETADATA_API_TOKEN}"},
-            timeout=30,
-        )
+        resp = client.post(f"/api/v1/services/ingestionPipelines/{action}/{pipeline_id}")
         resp.raise_for_status()
         if action == 'deploy':
             time.sleep(2)
+    client.print_metrics()
 
 
 
 if __name__ == '__main__':
-    delete_pipeline_if_exists(f'{CLICKHOUSE_SERVICE_NAME}.clickhouse_metadata_hourly')
+    delete_pipeline_if_exists(f'{CLICKHOUSE_SERVICE_NAME}.{PIPELINE_NAME}')
     main()
\ No newline at end of file
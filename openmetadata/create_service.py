@@ -9,73 +9,85 @@ from pathlib import Path
 from pprint import pprint
 import requests
 from typing import Dict, List, Optional
-from urllib import error, request
 from cfg import CLICKHOUSE_HOST_PORT, CLICKHOUSE_USERNAME, CLICKHOUSE_DB_NAME, CLICKHOUSE_PASSWORD, \
     CLICKHOUSE_DATABASE_SCHEMA, CLICKHOUSE_SERVICE_DESCRIPTION, CLICKHOUSE_SERVICE_NAME, OPENMETADATA_HOST_PORT, \
     OPENMETADATA_API_TOKEN, CLICKHOUSE_DB_INCLUDES, CLICKHOUSE_DB_EXCLUDES, CLICKHOUSE_SCHEMA_INCLUDES, \
-    CLICKHOUSE_SCHEMA_EXCLUDES, CLICKHOUSE_TABLE_INCLUDES, CLICKHOUSE_TABLE_EXCLUDES, CLICKHOUSE_USE_FQN_FILTERS
+    CLICKHOUSE_SCHEMA_EXCLUDES, CLICKHOUSE_TABLE_INCLUDES, CLICKHOUSE_TABLE_EXCLUDES, CLICKHOUSE_USE_FQN_FILTERS, \
+    CLICKHOUSE_INGESTION_THREADS
 from create_filters import create_filters
+from om_client import get_client
 
 
-def build_payload() -> Dict[str, object]:
+def build_payload(
+    name: Optional[str] = CLICKHOUSE_SERVICE_NAME,
+    host_port: Optional[str] = CLICKHOUSE_HOST_PORT,
+    username: Optional[str] = CLICKHOUSE_USERNAME,
+    password: Optional[str] = CLICKHOUSE_PASSWORD,
+    database_name: Optional[str] = CLICKHOUSE_DB_NAME,
+    database_schema: Optional[str] = CLICKHOUSE_DATABASE_SCHEMA,
+    description: Optional[str] = CLICKHOUSE_SERVICE_DESCRIPTION,
+    ingestion_threads: Optional[str] = CLICKHOUSE_INGESTION_THREADS,
+    filters: Optional[Dict[str, Dict[str, List[str]]]] = None,
+) -> Dict[str, object]:
+    """
+    Тело запроса на создание сервиса. По умолчанию все параметры берутся из cfg,
+    filters - из create_filters().
+    """
 
     connection_config: Dict[str, object] = {
         "type": "CustomDatabase",
         "sourcePythonClass": "custom_ingestors.clickhouse.ClickhouseCustomIngestor",
-        "hostPort": CLICKHOUSE_HOST_PORT,
-        "username": CLICKHOUSE_USERNAME,
-        "password": CLICKHOUSE_PASSWORD,
-        "databaseName": CLICKHOUSE_DB_NAME
+        "hostPort": host_port,
+        "username": username,
+        "password": password,
+        "databaseName": database_name
 
     }
     
-    if CLICKHOUSE_DATABASE_SCHEMA:
-        connection_config.update({"databaseSchema": CLICKHOUSE_DATABASE_SCHEMA})
+    if database_schema:
+        connection_config.update({"databaseSchema": database_schema})
 
-    filters = create_filters()
+    if ingestion_threads:
+        connection_config.update({"connectionOptions": {"ingestionThreads": str(ingestion_threads)}})
+
+    if filters is None:
+        filters = create_filters()
     if filters:
         connection_config.update(filters)
 
     payload: Dict[str, object] = {
-        "name": CLICKHOUSE_SERVICE_NAME,
+        "name": name,
         "serviceType": "CustomDatabase",
         "connection": {"config": connection_config},
     }
-    if CLICKHOUSE_SERVICE_DESCRIPTION:
-        payload["description"] = CLICKHOUSE_SERVICE_DESCRIPTION
+    if description:
+        payload["description"] = description
     return payload
 
 
 def create_or_update_service(
     base_url: str, token: str, service_name: str, payload: Dict[str, object], test_run: bool = True
 ) -> None:
-    url = f"{base_url.rstrip('/')}/api/v1/services/databaseServices"
+    path = "/api/v1/services/databaseServices"
     if test_run:
-        print("Dry-run mode: would send payload to", url)
+        print("Dry-run mode: would send payload to", f"{base_url.rstrip('/')}{path}")
         print(json.dumps(payload, indent=2))
         return
 
-    data = json.dumps(payload).encode("utf-8")
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-        "User-Agent": "openmetadata-clickhouse-helper/1.0",
-        "Authorization": f"Bearer {token}"
-    }
     if not token:
         raise Exception('Добавьте токен авторизации')
     print(payload)
     try:
-        resp = requests.put(url=url, data=data, headers=headers)
+        resp = get_client(base_url, token).put(path, json=payload)
+        resp.raise_for_status()
         print(f"Service '{service_name}' created/updated successfully.")
         if resp.json():
             print(resp.json())
-    except error.HTTPError as http_error:
-        message = http_error.read().decode("utf-8")
+    except requests.HTTPError as http_error:
         raise RuntimeError(
-            f"OpenMetadata API returned {http_error.code}: {message}"
+            f"OpenMetadata API returned {http_error.response.status_code}: {http_error.response.text}"
         ) from http_error
-    except error.URLError as url_error:
+    except requests.RequestException as url_error:
         raise RuntimeError(f"Failed to reach OpenMetadata API: {url_error}") from url_error
 
 
@@ -89,6 +101,7 @@ def main() -> None:
         payload=payload,
         test_run=False
     )
+    get_client(OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN).print_metrics()  # pyright: ignore [reportArgumentType]
 
 
 if __name__ == "__main__":
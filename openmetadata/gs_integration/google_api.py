@@ -1,9 +1,15 @@
+import datetime
 import os.path
+import threading
+from typing import Any
 
+import google_auth_httplib2
 from google.auth.exceptions import RefreshError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from googleapiclient.http import build_http
 
 
 class BaseGoogleApi:
@@ -13,7 +19,16 @@ class BaseGoogleApi:
       - Google sheets;
     etc.
     Все возможные скоупы для google API перечислены тут: https://developers.google.com/identity/protocols/oauth2/scopes?hl=ru
+    Авторизационные данные и клиенты сервисов общие на весь процесс: токен читается с диска один раз
+    и обновляется только незадолго до истечения, а клиенты строятся по встроенному discovery-документу.
     """
+    # Ключ - путь к токену, чтобы разные учётные записи не смешивались
+    _credentials_cache: dict[str, Credentials] = {}
+    _services_cache: dict[tuple[str, str, str], Any] = {}
+    _clients_lock = threading.RLock()
+    # Токен обновляется заранее, если до истечения осталось меньше этого времени
+    TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
     def __init__(self):
         self.token_path = 'token.json'
         self.SCOPES = [
@@ -23,21 +38,72 @@ class BaseGoogleApi:
         ]
 
     def get_credentials(self):
+        """
+        Возвращает авторизационные данные из памяти процесса.
+        При первом обращении токен берётся из локального файла либо инициируется процесс авторизации,
+        дальше токен обновляется только если он истёк или скоро истечёт.
+
+        Returns:
+            google.oauth2.credentials.Credentials: Объект с авторизационными данными.
+        """
+        with self._clients_lock:
+            cached_creds = self._credentials_cache.get(self.token_path)
+            if cached_creds is not None and not self._expires_soon(cached_creds):
+                return cached_creds
+
+            creds = self._obtain_credentials(cached_creds)
+            if creds is not cached_creds:
+                # Клиенты держат ссылку на старый объект с токеном, пересоздаём их
+                for key in [key for key in self._services_cache if key[0] == self.token_path]:
+                    del self._services_cache[key]
+            self._credentials_cache[self.token_path] = creds
+            return creds
+
+    def get_service(self, service_name: str, version: str):
+        """
+        Возвращает закэшированный на процесс клиент сервиса Google API, например ('sheets', 'v4') или ('drive', 'v3').
+        Клиент строится по встроенному discovery-документу (без сетевых запросов) поверх
+        httplib2-транспорта, который переиспользует соединения.
+        """
+        with self._clients_lock:
+            creds = self.get_credentials()
+            key = (self.token_path, service_name, version)
+            service = self._services_cache.get(key)
+            if service is None:
+                http = google_auth_httplib2.AuthorizedHttp(creds, http=build_http())
+                service = build(service_name, version, http=http, static_discovery=True, cache_discovery=False)
+                self._services_cache[key] = service
+            return service
+
+    def _obtain_credentials(self, creds):
         """
         Получает токен авторизации из локального файла или инициирует процесс авторизации.
 
+        Args:
+            creds (google.oauth2.credentials.Credentials | None): Токен, который уже есть в памяти.
+
         Returns:
             google.oauth2.credentials.Credentials: Объект с авторизационными данными.
         """
-        creds = self._load_token()
-        if not creds or not creds.valid:  # токен не найден, либо не валидный.
-            if creds and creds.expired and creds.refresh_token: # токен найден, но истёк срок жизни.
+        creds = creds or self._load_token()
+        if not creds or not creds.valid or self._expires_soon(creds):  # токен не найден, не валидный или скоро истечёт.
+            if creds and creds.refresh_token: # токен найден, но истёк срок жизни.
                 creds = self._refresh_token(creds)
             else: # токен не найден, делаем новый.
                 creds = self._authorize()
             self._save_token(creds)
         return creds
 
+    def _expires_soon(self, creds) -> bool:
+        """
+        Проверяет, что до истечения токена осталось меньше TOKEN_REFRESH_MARGIN.
+        """
+        if not creds.expiry:
+            return False
+        # google-auth хранит expiry как naive datetime в UTC
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < self.TOKEN_REFRESH_MARGIN
+
     def _load_token(self):
         """
         Загружает токен авторизации из локального файла.
@@ -1,13 +1,11 @@
 import datetime
-from pprint import pprint
 from typing import Any
 from zoneinfo import ZoneInfo
 
-import pandas as pd
-import requests
-
-from openmetadata.cfg import CLICKHOUSE_SERVICE_NAME, CLICKHOUSE_DB_NAME, OPENMETADATA_API_TOKEN
+from openmetadata.cfg import CLICKHOUSE_SERVICE_NAME, CLICKHOUSE_DB_NAME, OPENMETADATA_API_TOKEN, OPENMETADATA_HOST_PORT
 from openmetadata.gs_integration.gs_collector import GoogleSheetsCollector
+from openmetadata.gs_integration.table_resolver import TableResolver
+from openmetadata.om_client import get_client
 
 
 
@@ -21,6 +19,16 @@ class ClickHouseGSInfo:
 
         self.tables = self.get_all_tables()
         self.tables_data = {}
+        self._table_resolver = None
+
+    @property
+    def table_resolver(self) -> TableResolver:
+        # Клиент OpenMetadata нужен только при обращении к таблицам в OpenMetadata, создаём его при первом обращении
+        if self._table_resolver is None:
+            self._table_resolver = TableResolver(
+                get_client(OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN)  # pyright: ignore [reportArgumentType]
+            )
+        return self._table_resolver
 
     
     @property
@@ -32,15 +40,14 @@ class ClickHouseGSInfo:
     
     def get_all_tables(self) -> list[str]:
         try:
-            list_with_tables = self._collector.get_data_from_original_source(list_name='Список таблиц')
-            if list_with_tables.empty:
+            list_with_tables = self._collector.get_values(list_name='Список таблиц')
+            if len(list_with_tables) < 2:
                 print('Лист с таблицами пуст. Завершаем работу')
                 return []
-            if 'Таблица' not in list_with_tables.columns:
+            if 'Таблица' not in list_with_tables[0]:
                 print('На листе с названиями таблиц отсутствует колонка "Таблица"')
                 return []
-            tables = list_with_tables['Таблица']
-            return list(tables)
+            return [table for table, in self._collector.iter_columns(list_with_tables, 'Таблица')]
         except KeyError:
             print('Лист "Список таблиц" отсутствует в ресурсе. Завершаем работу.')
             return []
@@ -50,13 +57,8 @@ class ClickHouseGSInfo:
     @staticmethod
     def update_info_about_table_in_metadata(table: dict[str, Any]):
         
-        url = f"http://localhost:8585/api/v1/tables/{table['id']}"
-        headers = {
-            "Authorization": "Bearer ваш_токен",
-            "Content-Type": "application/json"
-        }
-    
-        response = requests.put(url, headers=headers, json=table)
+        client = get_client(OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN)  # pyright: ignore [reportArgumentType]
+        response = client.put(f"/api/v1/tables/{table['id']}", json=table)
         response.raise_for_status()
     
         return response.json()
@@ -68,32 +70,28 @@ class ClickHouseGSInfo:
         table_fqn: Fully Qualified Name (например: 'service_name.db_name.schema_name.table_name')
         """
         table_fqn = f"{service_name}.{db_name}.{schema_name}.{table_name}"
-        
-        url = f"http://localhost:8585/api/v1/tables/name/{table_fqn}"
-        headers = {
-            "Authorization": f"Bearer {OPENMETADATA_API_TOKEN}",
-            "Content-Type": "application/json",
-            
-        }
-    
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-    
-        table_data = response.json()
-        pprint(table_data)
+
+        # Таблицы схемы загружаются постранично один раз, дальше берутся из кэша
+        table_data = self.table_resolver.get(table_fqn)
+        if table_data is None:
+            raise KeyError(f'Таблица {table_fqn} не найдена в OpenMetadata')
         return table_data
     
     def get_info_about_tables_in_gs(self):
+        existing_tables = []
         for table_name in self.tables:
-            try:
-                table_df = self._collector.get_data_from_original_source(table_name)
-            except KeyError:
+            if table_name not in self._collector.existing_sheets:
                 print(f'Отсутствует лист "{table_name}", хотя он был в списке таблиц, продолжаем обработку')
                 continue
-            if table_df.empty:
-                continue
-                
-            self.tables_data[table_name] = {row[table_name]: row['Описание'] for _, row in table_df.iterrows()}
+            existing_tables.append(table_name)
+
+        # Вся книга забирается несколькими запросами batchGet вместо запроса на каждый лист
+        for table_name, table_values in self._collector.get_values_from_many_sources(existing_tables).items():
+            try:
+                # Колонка с названиями полей называется так же, как лист
+                self.tables_data[table_name] = dict(self._collector.iter_columns(table_values, table_name, 'Описание'))
+            except KeyError as e:
+                print(f'Пропускаем лист "{table_name}": {e}')
         self.tables_data = {k: v for k, v in self.tables_data.items() if v}
         return self.tables_data
             
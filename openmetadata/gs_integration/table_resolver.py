@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TableResolver:
+    """
+    Поиск таблиц OpenMetadata по FQN пачками.
+
+    Вместо запроса на каждую таблицу список таблиц схемы забирается постранично через
+    /api/v1/tables?databaseSchema=...&fields=columns с курсорной пагинацией, результаты кладутся
+    в LRU-кэш FQN -> сущность с TTL. Повторный запрос таблицы той же схемы обслуживается из кэша.
+    Схема загружается одним потоком и без блокировки кэша: остальные потоки, которым нужна та же схема,
+    ждут её загрузки, а таблицы других схем обслуживаются параллельно. Если из кэша вытеснена таблица
+    загруженной схемы, схема снова считается незагруженной, чтобы отсутствие таблицы в кэше не выдавалось
+    за отсутствие в OpenMetadata.
+
+    Args:
+        client: Клиент OpenMetadata (OpenMetadataClient).
+        fields: Какие поля таблиц запрашивать.
+        page_size: Размер страницы при листинге схемы.
+        cache_size: Максимум сущностей в кэше.
+        ttl_seconds: Время жизни сущности и листинга схемы в кэше.
+    """
+
+    def __init__(
+        self,
+        client,
+        fields: str = 'columns',
+        page_size: int = 1000,
+        cache_size: int = 10000,
+        ttl_seconds: float = 300,
+    ):
+        self.client = client
+        self.fields = fields
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self._tables: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._loaded_schemas: dict[str, float] = {}
+        # Схемы, которые сейчас загружает один из потоков
+        self._loading_schemas: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get(self, table_fqn: str) -> Optional[dict[str, Any]]:
+        """
+        Возвращает таблицу по FQN (service.db.schema.table) или None, если в схеме такой таблицы нет.
+        """
+        schema_fqn = table_fqn.rsplit('.', 1)[0]
+        while True:
+            with self._lock:
+                table = self._get_cached(table_fqn)
+                if table is not None:
+                    return table
+                if self._loaded_schemas.get(schema_fqn, 0) > time.monotonic():
+                    # Схема недавно загружена целиком, и таблицы в ней нет
+                    return None
+                loading = self._loading_schemas.get(schema_fqn)
+                if loading is None:
+                    loading = self._loading_schemas[schema_fqn] = threading.Event()
+                    break
+            # Схему загружает другой поток. Если загрузка не удалась, схему попробует загрузить этот
+            loading.wait()
+
+        try:
+            return self.load_schema(schema_fqn).get(table_fqn)
+        finally:
+            with self._lock:
+                del self._loading_schemas[schema_fqn]
+            loading.set()
+
+    def load_schema(self, schema_fqn: str) -> dict[str, dict[str, Any]]:
+        """
+        Загружает все таблицы схемы постранично и кладёт их в кэш.
+
+        Returns:
+            Словарь FQN -> сущность таблицы.
+        """
+        tables = {}
+        after = None
+        while True:
+            params = {'databaseSchema': schema_fqn, 'fields': self.fields, 'limit': self.page_size}
+            if after:
+                params['after'] = after
+            response = self.client.get('/api/v1/tables', params=params)
+            response.raise_for_status()
+            page = response.json()
+            for table in page.get('data', []):
+                tables[table['fullyQualifiedName']] = table
+            after = page.get('paging', {}).get('after')
+            if not after:
+                break
+
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl_seconds
+            # Отметка ставится до записи таблиц: если схема не помещается в кэш, _put её снимет
+            self._loaded_schemas[schema_fqn] = expires_at
+            for table_fqn, table in tables.items():
+                self._put(table_fqn, table, expires_at)
+        return tables
+
+    def _get_cached(self, table_fqn: str) -> Optional[dict[str, Any]]:
+        cached = self._tables.get(table_fqn)
+        if cached is None:
+            return None
+        expires_at, table = cached
+        if expires_at <= time.monotonic():
+            del self._tables[table_fqn]
+            return None
+        self._tables.move_to_end(table_fqn)
+        return table
+
+    def _put(self, table_fqn: str, table: dict[str, Any], expires_at: float) -> None:
+        self._tables[table_fqn] = (expires_at, table)
+        self._tables.move_to_end(table_fqn)
+        while len(self._tables) > self.cache_size:
+            evicted_fqn, _ = self._tables.popitem(last=False)
+            self._loaded_schemas.pop(evicted_fqn.rsplit('.', 1)[0], None)
@@ -0,0 +1,196 @@
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Эндпоинты, которым нужен таймаут больше стандартного, сопоставляются по префиксу пути
+DEFAULT_TIMEOUTS = {
+    '/api/v1/services/ingestionPipelines/deploy': 120,
+    '/api/v1/services/ingestionPipelines/trigger': 60,
+}
+DEFAULT_TIMEOUT = 30
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# POST не идемпотентен, его повторяем только если сервер явно попросил подождать
+RETRYABLE_POST_STATUSES = {429}
+
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.IGNORECASE)
+_NAME_RE = re.compile(r'/name/[^/?]+')
+
+
+class RequestMetrics:
+    """
+    Задержки и статусы запросов к OpenMetadata в разрезе метода и эндпоинта.
+    listeners получают каждый запрос: (метод, эндпоинт, статус, время в секундах).
+    Запись потокобезопасна: клиент общий для потоков провижининга и ингестии.
+    """
+
+    # Для перцентилей храним не больше стольких последних замеров на эндпоинт
+    MAX_SAMPLES = 10000
+
+    def __init__(self):
+        self.calls: dict[tuple[str, str], int] = defaultdict(int)
+        self.total_seconds: dict[tuple[str, str], float] = defaultdict(float)
+        self.latencies: dict[tuple[str, str], list[float]] = defaultdict(list)
+        self.statuses: dict[tuple[str, str, int], int] = defaultdict(int)
+        self.listeners: list[Callable[[str, str, int, float], None]] = []
+        self._lock = threading.Lock()
+
+    def record(self, method: str, endpoint: str, status: int, elapsed: float) -> None:
+        key = (method, endpoint)
+        with self._lock:
+            self.calls[key] += 1
+            self.total_seconds[key] += elapsed
+            latencies = self.latencies[key]
+            if len(latencies) >= self.MAX_SAMPLES:
+                latencies[self.calls[key] % self.MAX_SAMPLES] = elapsed
+            else:
+                latencies.append(elapsed)
+            self.statuses[(method, endpoint, status)] += 1
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(method, endpoint, status, elapsed)
+
+    def summary(self) -> list[str]:
+        with self._lock:
+            calls = dict(self.calls)
+            total_seconds = dict(self.total_seconds)
+            latencies_by_endpoint = {key: sorted(latencies) for key, latencies in self.latencies.items()}
+            statuses = dict(self.statuses)
+        lines = []
+        for (method, endpoint), latencies in sorted(latencies_by_endpoint.items()):
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            count = calls[(method, endpoint)]
+            endpoint_statuses = ', '.join(
+                f'{status}: {status_count}' for (m, e, status), status_count in sorted(statuses.items())
+                if (m, e) == (method, endpoint)
+            )
+            lines.append(
+                f'{method} {endpoint}: {count} calls, '
+                f'avg {total_seconds[(method, endpoint)] / count * 1000:.0f} ms, p50 {p50 * 1000:.0f} ms, '
+                f'p99 {p99 * 1000:.0f} ms, statuses {{{endpoint_statuses}}}'
+            )
+        return lines
+
+
+class OpenMetadataClient:
+    """
+    Клиент REST API OpenMetadata для скриптов настройки.
+
+    Поверх одной requests.Session: пул keep-alive соединений, общий заголовок авторизации, gzip,
+    таймауты по эндпоинтам, повторы с экспоненциальной задержкой и джиттером на 429/5xx и метрики задержек.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str = '',
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeouts: Optional[dict[str, float]] = None,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.metrics = RequestMetrics()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': 'openmetadata-clickhouse-helper/1.0',
+        })
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Выполняет запрос к API. Ответы с ошибкой возвращаются как есть, raise_for_status - на стороне вызывающего.
+
+        Args:
+            method: HTTP-метод.
+            path: Путь относительно хоста OpenMetadata, например /api/v1/tables.
+            timeout: Таймаут запроса. По умолчанию берётся из таймаутов по эндпоинтам.
+        """
+        method = method.upper()
+        url = f'{self.base_url}{path}'
+        timeout = timeout or self._timeout_for(path)
+        endpoint = self._endpoint_name(path)
+        retryable_statuses = RETRYABLE_POST_STATUSES if method == 'POST' else RETRYABLE_STATUSES
+
+        for attempt in range(self.max_retries + 1):
+            started_at = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.metrics.record(method, endpoint, 0, time.perf_counter() - started_at)
+                if attempt == self.max_retries or method == 'POST':
+                    raise
+                self._sleep(attempt, None)
+                continue
+
+            self.metrics.record(method, endpoint, response.status_code, time.perf_counter() - started_at)
+            if response.status_code in retryable_statuses and attempt < self.max_retries:
+                self._sleep(attempt, response.headers.get('Retry-After'))
+                continue
+            return response
+        raise AssertionError('unreachable')
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self.request('PUT', path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', path, **kwargs)
+
+    def print_metrics(self) -> None:
+        for line in self.metrics.summary():
+            print(line)
+
+    def _timeout_for(self, path: str) -> float:
+        for prefix, timeout in self.timeouts.items():
+            if path.startswith(prefix):
+                return timeout
+        return DEFAULT_TIMEOUT
+
+    def _sleep(self, attempt: int, retry_after: Optional[str]) -> None:
+        delay = self.backoff_factor * 2 ** attempt + random.uniform(0, self.backoff_factor)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        time.sleep(delay)
+
+    @staticmethod
+    def _endpoint_name(path: str) -> str:
+        """
+        Приводит путь к шаблону эндпоинта для метрик: id и имена сущностей заменяются плейсхолдерами.
+        """
+        path = path.split('?', 1)[0]
+        return _NAME_RE.sub('/name/{name}', _UUID_RE.sub('{id}', path))
+
+
+@lru_cache(maxsize=None)
+def get_client(base_url: str, token: str = '') -> OpenMetadataClient:
+    """
+    Возвращает общий на процесс клиент для пары (хост, токен), чтобы все скрипты делили одно соединение.
+    """
+    return OpenMetadataClient(base_url, token)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Проверка фильтров из cfg на списке таблиц ClickHouse без запуска ингестии.
+
+Список таблиц берётся из system.tables через HTTP-интерфейс ClickHouse и кэшируется в json-файле,
+повторные запуски с другими фильтрами работают без обращения к ClickHouse.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+
+import requests
+
+from cfg import CLICKHOUSE_HOST_PORT, CLICKHOUSE_USERNAME, CLICKHOUSE_PASSWORD, CLICKHOUSE_DB_NAME, \
+    CLICKHOUSE_SERVICE_NAME, CLICKHOUSE_USE_FQN_FILTERS
+from create_filters import create_filters
+from filters import FilterSet
+
+TABLES_QUERY = (
+    "SELECT database, name FROM system.tables "
+    "WHERE database NOT IN ('system', 'INFORMATION_SCHEMA', 'information_schema') "
+    "ORDER BY database, name FORMAT JSONCompact"
+)
+CACHE_TTL_SECONDS = int(os.getenv('CLICKHOUSE_TABLES_CACHE_TTL_SECONDS', 24 * 3600))
+
+
+def fetch_tables(host_port: str, username: str, password: str) -> List[Tuple[str, str]]:
+    url = host_port if '://' in host_port else f'http://{host_port}'
+    response = requests.post(
+        url,
+        data=TABLES_QUERY,
+        headers={'X-ClickHouse-User': username or 'default', 'X-ClickHouse-Key': password or ''},
+        timeout=60,
+    )
+    response.raise_for_status()
+    return [(database, table) for database, table in response.json()['data']]
+
+
+def load_tables(cache_path: Path, refresh: bool = False) -> List[Tuple[str, str]]:
+    """
+    Список (база, таблица) из кэша, если он не старше CACHE_TTL_SECONDS, иначе из ClickHouse.
+    """
+    if not refresh and cache_path.exists() and time.time() - cache_path.stat().st_mtime < CACHE_TTL_SECONDS:
+        with open(cache_path, encoding='utf-8') as cache_file:
+            return [tuple(row) for row in json.load(cache_file)]  # pyright: ignore [reportReturnType]
+
+    tables = fetch_tables(CLICKHOUSE_HOST_PORT, CLICKHOUSE_USERNAME, CLICKHOUSE_PASSWORD)  # pyright: ignore [reportArgumentType]
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as cache_file:
+        json.dump(tables, cache_file)
+    return tables
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Проверка фильтров ингестии на списке таблиц ClickHouse')
+    parser.add_argument('--refresh', action='store_true', help='Перечитать system.tables, игнорируя кэш')
+    parser.add_argument('--cache', default=f'/tmp/clickhouse_tables_{CLICKHOUSE_SERVICE_NAME}.json')
+    parser.add_argument('--show', type=int, default=20, help='Сколько подходящих таблиц вывести')
+    args = parser.parse_args()
+
+    service, database = CLICKHOUSE_SERVICE_NAME or '', CLICKHOUSE_DB_NAME or 'default'
+    started_at = time.perf_counter()
+    tables = load_tables(Path(args.cache), refresh=args.refresh)
+    load_time = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    filters = FilterSet.from_config(create_filters(), use_fqn=CLICKHOUSE_USE_FQN_FILTERS)
+    compile_time = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    counts: Counter = Counter()
+    included = []
+    database_filtered = filters.filter_database(service, database)
+    schema_filtered = {}
+    for schema, table in tables:
+        if database_filtered:
+            counts['database'] += 1
+            continue
+        if schema not in schema_filtered:
+            schema_filtered[schema] = filters.filter_schema(service, database, schema)
+        if schema_filtered[schema]:
+            counts['schema'] += 1
+        elif filters.filter_table(service, database, schema, table):
+            counts['table'] += 1
+        else:
+            included.append(f'{schema}.{table}')
+    match_time = time.perf_counter() - started_at
+
+    print(f"Tables: {len(tables)} ({len(schema_filtered)} schemas), loaded in {load_time * 1000:.0f} ms")
+    print(f"Database '{database}': {'filtered' if database_filtered else 'included'}")
+    print(f"Schemas included: {sum(1 for filtered in schema_filtered.values() if not filtered)} "
+          f"of {len(schema_filtered)}")
+    print(f"Tables included: {len(included)}, filtered by database: {counts['database']}, "
+          f"by schema: {counts['schema']}, by table: {counts['table']}")
+    print(f"Compiled filters in {compile_time * 1000:.2f} ms, matched in {match_time * 1000:.2f} ms")
+    for name in included[:args.show]:
+        print(f"  {name}")
+    if len(included) > args.show:
+        print(f"  ... and {len(included) - args.show} more")
+
+
+if __name__ == "__main__":
+    main()
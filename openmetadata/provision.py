@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Параллельная настройка многих сервисов ClickHouse и их пайплайнов по одному манифесту.
+
+Манифест - TOML-файл. Секция [defaults] задаёт общие параметры, каждая [[services]] - один сервис,
+её ключи перекрывают значения по умолчанию. Пароли в манифест не пишутся: password_env указывает
+переменную окружения с паролем.
+
+Расписание задаётся либо явно (schedule_interval), либо интервалом в минутах (interval_minutes) - тогда
+запуски сервисов разносятся по окну из секции [schedule] не более чем по max_concurrency на слот.
+
+    [defaults]
+    username = "openmetadata"
+    password_env = "CLICKHOUSE_PASSWORD"
+    database_name = "default"
+    interval_minutes = 60
+    mark_deleted_tables = true
+
+    [schedule]
+    window_minutes = 60
+    slot_minutes = 5
+    max_concurrency = 4
+
+    [[services]]
+    name = "clickhouse_prod"
+    host_port = "ch-prod:8123"
+    schema_includes = ["^analytics$", "^marts$"]
+
+    [[services]]
+    name = "clickhouse_stage"
+    host_port = "ch-stage:8123"
+    schedule_interval = "30 */3 * * *"
+    table_excludes = ["^tmp_.*"]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+import tomllib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from cfg import OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN, SCHEDULE_ADAPTIVE
+from create_filters import create_filters
+from create_ingestion import build_pipeline_payload
+from create_service import build_payload
+from om_client import OpenMetadataClient
+from reconcile import DesiredState, ReconcileResult, Reconciler
+from schedule import Schedule, assign_schedules, default_schedule_interval
+
+SERVICE_KEYS = (
+    "name", "host_port", "username", "password", "database_name", "database_schema", "description",
+    "ingestion_threads",
+)
+PIPELINE_KEYS = (
+    "schedule_interval", "use_fqn_for_filtering", "override_metadata", "mark_deleted_tables", "mark_deleted_schemas",
+)
+FILTER_KEYS = (
+    "db_includes", "db_excludes", "schema_includes", "schema_excludes", "table_includes", "table_excludes",
+)
+SCHEDULE_KEYS = ("window_minutes", "slot_minutes", "max_concurrency")
+
+
+def load_manifest(path: str) -> List[DesiredState]:
+    """
+    Читает манифест и строит желаемое состояние для каждого сервиса.
+    Параметры, которых нет ни в сервисе, ни в [defaults], берутся из cfg.
+    """
+    with open(path, "rb") as manifest_file:
+        manifest = tomllib.load(manifest_file)
+
+    defaults = manifest.get("defaults", {})
+    schedule_options = manifest.get("schedule", {})
+    unknown = set(schedule_options) - set(SCHEDULE_KEYS)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры секции [schedule]: {', '.join(sorted(unknown))}")
+
+    services = []
+    names = set()
+    for service in manifest.get("services", []):
+        options: Dict[str, Any] = {**defaults, **service}
+        name = options.get("name")
+        if not name:
+            raise ValueError(f"Сервис без имени в манифесте {path}: {service}")
+        if name in names:
+            raise ValueError(f"Сервис {name} описан в манифесте {path} несколько раз")
+        names.add(name)
+
+        unknown = set(options) - set(SERVICE_KEYS) - set(PIPELINE_KEYS) - set(FILTER_KEYS) \
+            - {"password_env", "interval_minutes"}
+        if unknown:
+            raise ValueError(f"Неизвестные параметры сервиса {name}: {', '.join(sorted(unknown))}")
+
+        password_env = options.pop("password_env", None)
+        if password_env:
+            options["password"] = os.environ.get(password_env)
+            if options["password"] is None:
+                raise ValueError(f"Для сервиса {name} не задана переменная окружения {password_env}")
+        services.append(options)
+
+    # Смещения назначаются совместно для сервисов с одинаковым интервалом, чтобы соблюдать max_concurrency
+    schedules: Dict[str, Schedule] = {}
+    by_interval: Dict[int, List[str]] = defaultdict(list)
+    for options in services:
+        if "interval_minutes" in options and "schedule_interval" not in options:
+            by_interval[options["interval_minutes"]].append(options["name"])
+    for interval, service_names in by_interval.items():
+        schedules.update(assign_schedules(service_names, interval, **schedule_options))
+
+    states = []
+    for options in services:
+        name = options["name"]
+        options.pop("interval_minutes", None)
+        if name in schedules:
+            options["schedule_interval"] = schedules[name].cron()
+        else:
+            options.setdefault("schedule_interval", default_schedule_interval(name))
+
+        filters = create_filters(**{key: options[key] for key in FILTER_KEYS if key in options})
+        states.append(DesiredState(
+            service=build_payload(filters=filters, **{key: options[key] for key in SERVICE_KEYS if key in options}),
+            pipeline=build_pipeline_payload(
+                filters=filters, **{key: options[key] for key in PIPELINE_KEYS if key in options}
+            ),
+            schedule=schedules.get(name),
+            schedule_options=schedule_options if name in schedules else {},
+        ))
+    return states
+
+
+def provision(reconciler: Reconciler, states: List[DesiredState], max_workers: int) -> List[ReconcileResult]:
+    """
+    Приводит все сервисы к желаемому состоянию, не более max_workers одновременно.
+    """
+    states = reconciler.adapt_schedules(states, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(reconciler.reconcile, states))
+
+
+def print_summary(results: List[ReconcileResult], elapsed: float) -> None:
+    headers = ("service", "service state", "pipeline state", "deployed", "triggered", "error")
+    rows = [
+        (r.service_name, r.service, r.pipeline, str(r.deployed), str(r.triggered), r.error or "")
+        for r in results
+    ]
+    widths = [max(len(row[i]) for row in [headers, *rows]) for i in range(len(headers))]
+    for row in [headers, tuple("-" * width for width in widths), *rows]:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+    failed = sum(1 for r in results if r.error)
+    changed = sum(1 for r in results if not r.error and (r.service != "no-op" or r.pipeline != "no-op"))
+    print(f"\n{len(results)} services in {elapsed:.1f} s: {changed} changed, {failed} failed")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Настройка сервисов ClickHouse в OpenMetadata по манифесту")
+    parser.add_argument("manifest", help="Путь к TOML-манифесту")
+    parser.add_argument("--workers", type=int, default=8, help="Сколько сервисов обрабатывать одновременно")
+    parser.add_argument("--trigger", action="store_true", help="Запустить изменённые пайплайны")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать отличия")
+    parser.add_argument("--deploy-timeout", type=float, default=120)
+    parser.add_argument("--adaptive-schedule", action="store_true", default=SCHEDULE_ADAPTIVE,
+                        help="Подобрать интервал по истории запусков для сервисов с interval_minutes")
+    args = parser.parse_args()
+
+    states = load_manifest(args.manifest)
+    # Один клиент на все потоки, пул соединений по числу потоков
+    client = OpenMetadataClient(
+        OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN, pool_size=args.workers  # pyright: ignore [reportArgumentType]
+    )
+    reconciler = Reconciler(client, trigger=args.trigger, deploy_timeout=args.deploy_timeout, dry_run=args.dry_run,
+                            adaptive_schedule=args.adaptive_schedule)
+
+    started_at = time.perf_counter()
+    results = provision(reconciler, states, args.workers)
+    print_summary(results, time.perf_counter() - started_at)
+    if args.dry_run:
+        for result in results:
+            for action in result.actions:
+                print(f"{result.service_name}: {action}")
+    client.print_metrics()
+    if any(result.error for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Приведение сервисов и пайплайнов ингестии в OpenMetadata к желаемому состоянию.
+
+В отличие от create_ingestion.py пайплайн не удаляется и не создаётся заново: существующие сущности сравниваются
+с желаемыми, и отправляются только отличия. История запусков пайплайна сохраняется, DAG в Airflow
+передеплоивается только если поменялся пайплайн или подключение сервиса.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from cfg import OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN, CLICKHOUSE_SERVICE_NAME, SCHEDULE_ADAPTIVE
+from create_ingestion import build_pipeline_payload
+from create_service import build_payload
+from om_client import OpenMetadataClient, get_client
+from schedule import Schedule, adaptive_interval, assign_schedules, fetch_pipeline_history, schedule_from_cfg
+
+SERVICES_PATH = "/api/v1/services/databaseServices"
+PIPELINES_PATH = "/api/v1/services/ingestionPipelines"
+
+# Ключи конфигурации пайплайна, которые удаляются, если их нет в желаемом состоянии (например, убрали фильтр)
+FILTER_KEYS = ("databaseFilterPattern", "schemaFilterPattern", "tableFilterPattern")
+# Так OpenMetadata отдаёт секреты в ответах API
+MASKED_SECRET = "*********"
+
+NOOP = "no-op"
+CREATED = "created"
+UPDATED = "updated"
+
+
+@dataclass
+class DesiredState:
+    """
+    Желаемое состояние одного сервиса и его пайплайна метаданных.
+
+    Attributes:
+        service: Тело запроса на создание сервиса (create_service.build_payload).
+        pipeline: Тело запроса на создание пайплайна без ссылки на сервис (create_ingestion.build_pipeline_payload).
+        schedule: Разнесённое расписание пайплайна, если оно строится по интервалу. Нужно для адаптивного интервала.
+        schedule_options: Параметры разнесения (window_minutes, slot_minutes, max_concurrency), с которыми
+            строилось schedule.
+    """
+    service: Dict[str, Any]
+    pipeline: Dict[str, Any]
+    schedule: Optional[Schedule] = None
+    schedule_options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def service_name(self) -> str:
+        return self.service["name"]
+
+    @property
+    def pipeline_fqn(self) -> str:
+        return f"{self.service_name}.{self.pipeline['name']}"
+
+
+@dataclass
+class ReconcileResult:
+    service_name: str
+    service: str = NOOP
+    pipeline: str = NOOP
+    deployed: bool = False
+    triggered: bool = False
+    error: Optional[str] = None
+    actions: List[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        if self.error:
+            return f"{self.service_name}: error: {self.error}"
+        return (f"{self.service_name}: service {self.service}, pipeline {self.pipeline}, "
+                f"deployed: {self.deployed}, triggered: {self.triggered}")
+
+
+def desired_from_cfg() -> List[DesiredState]:
+    return [DesiredState(
+        service=build_payload(),
+        pipeline=build_pipeline_payload(),
+        schedule=schedule_from_cfg(CLICKHOUSE_SERVICE_NAME),
+    )]
+
+
+def diff_config(current: Dict[str, Any], desired: Dict[str, Any], prefix: str,
+                removable: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Строит JSON Patch, приводящий ключи current к desired. Ключи, которых нет в desired, не трогаются,
+    кроме перечисленных в removable - они удаляются.
+    """
+    operations = []
+    for key, value in desired.items():
+        if key not in current:
+            operations.append({"op": "add", "path": f"{prefix}/{key}", "value": value})
+        elif current[key] != value:
+            operations.append({"op": "replace", "path": f"{prefix}/{key}", "value": value})
+    for key in removable:
+        if key in current and key not in desired:
+            operations.append({"op": "remove", "path": f"{prefix}/{key}"})
+    return operations
+
+
+def connection_differs(current: Dict[str, Any], desired: Dict[str, Any]) -> bool:
+    """
+    Сравнивает подключение сервиса только по ключам желаемого состояния.
+    Замаскированные секреты считаются совпадающими: API не отдаёт их значения.
+    """
+    for key, value in desired.items():
+        current_value = current.get(key)
+        if current_value == MASKED_SECRET:
+            continue
+        if isinstance(value, dict) and isinstance(current_value, dict):
+            if connection_differs(current_value, value):
+                return True
+        elif current_value != value:
+            return True
+    return False
+
+
+def service_differs(current: Dict[str, Any], desired: Dict[str, Any]) -> bool:
+    return connection_differs(
+        current.get("connection", {}).get("config", {}), desired["connection"]["config"]
+    ) or current.get("description") != desired.get("description", current.get("description"))
+
+
+def with_schedule(state: DesiredState, schedule: Schedule) -> DesiredState:
+    """
+    Желаемое состояние с другим расписанием пайплайна.
+    """
+    airflow_config = {**state.pipeline["airflowConfig"], "scheduleInterval": schedule.cron()}
+    return replace(state, pipeline={**state.pipeline, "airflowConfig": airflow_config}, schedule=schedule)
+
+
+def restagger_schedules(states: List[DesiredState], intervals: Dict[str, int]) -> List[DesiredState]:
+    """
+    Заново разносит расписания всех сервисов с разнесённым расписанием, с подобранными интервалами
+    (имя сервиса -> интервал). Менять интервал каждому пайплайну отдельно нельзя: смещение, выбранное
+    для прежнего интервала, при новом может совпасть со смещениями других сервисов.
+    """
+    scheduled = [state for state in states if state.schedule]
+    if not scheduled:
+        return states
+    service_intervals = {
+        state.service_name: intervals.get(state.service_name, state.schedule.interval_minutes)  # pyright: ignore [reportOptionalMemberAccess]
+        for state in scheduled
+    }
+    try:
+        schedules = assign_schedules(
+            list(service_intervals), min(service_intervals.values()), intervals=service_intervals,
+            **scheduled[0].schedule_options,
+        )
+    except ValueError as error:
+        print(f"Adaptive schedule is not applied: {error}")
+        return states
+    return [with_schedule(state, schedules[state.service_name]) if state.schedule else state for state in states]
+
+
+def normalize_filter_patterns(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    sourceConfig пайплайна с фильтрами в одном виде. OpenMetadata отдаёт незаданные части фильтров
+    как "includes": [] и "excludes": [], а желаемое состояние их не содержит (create_filters.build_filter_pattern).
+    Пустые части и фильтры без шаблонов отбрасываются, чтобы такие значения по умолчанию не считались отличием.
+    """
+    normalized = dict(config)
+    for key in FILTER_KEYS:
+        pattern = {part: list(values) for part, values in (normalized.pop(key, None) or {}).items() if values}
+        if pattern:
+            normalized[key] = pattern
+    return normalized
+
+
+def pipeline_operations(current: Dict[str, Any], desired: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    JSON Patch, приводящий существующий пайплайн к желаемому.
+    """
+    operations = diff_config(
+        normalize_filter_patterns(current.get("sourceConfig", {}).get("config", {})),
+        normalize_filter_patterns(desired["sourceConfig"]["config"]),
+        "/sourceConfig/config", removable=FILTER_KEYS,
+    )
+    operations += diff_config(
+        current.get("airflowConfig", {}), desired["airflowConfig"], "/airflowConfig"
+    )
+    if current.get("raiseOnError") != desired.get("raiseOnError", current.get("raiseOnError")):
+        operations.append({"op": "replace", "path": "/raiseOnError", "value": desired["raiseOnError"]})
+    return operations
+
+
+def raise_for_status(response) -> None:
+    """
+    Ошибка с телом ответа OpenMetadata. Подходит и для ответов requests, и для httpx.
+    """
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f"OpenMetadata API returned {response.status_code} for {response.request.method} "
+            f"{response.url}: {response.text}"
+        )
+
+
+def check_deploy_response(response: Dict[str, Any], pipeline_id: str) -> None:
+    """
+    Деплой отвечает 200 и при ошибке в Airflow, сам результат - в поле code ответа.
+    """
+    code = response.get("code", 200)
+    if code != 200:
+        raise RuntimeError(f"Pipeline {pipeline_id} was not deployed: {code} {response.get('reason', '')}".rstrip())
+
+
+class Reconciler:
+    """
+    Приводит сервисы и пайплайны к желаемому состоянию: создаёт отсутствующие, обновляет отличающиеся,
+    не трогает совпадающие. После изменения пайплайна или подключения сервиса пайплайн передеплоивается
+    (см. _deploy).
+
+    Args:
+        client: Клиент OpenMetadata.
+        trigger: Запускать пайплайн после создания или изменения.
+        deploy_timeout: Сколько секунд ждать деплоя пайплайна.
+        dry_run: Только показать, что будет изменено.
+        adaptive_schedule: Подбирать интервал пайплайнов с разнесённым расписанием по истории запусков.
+    """
+
+    def __init__(self, client: OpenMetadataClient, trigger: bool = False, deploy_timeout: float = 120,
+                 dry_run: bool = False, adaptive_schedule: bool = False):
+        self.client = client
+        self.trigger = trigger
+        self.deploy_timeout = deploy_timeout
+        self.dry_run = dry_run
+        self.adaptive_schedule = adaptive_schedule
+
+    def reconcile_all(self, states: Iterable[DesiredState]) -> List[ReconcileResult]:
+        return [self.reconcile(state) for state in self.adapt_schedules(states)]
+
+    def adapt_schedules(self, states: Iterable[DesiredState], max_workers: int = 1) -> List[DesiredState]:
+        """
+        Подбирает интервалы пайплайнов с разнесённым расписанием по истории запусков и заново разносит
+        расписания всех сервисов (restagger_schedules). Без adaptive_schedule состояния не меняются.
+        """
+        states = list(states)
+        scheduled = [state for state in states if state.schedule]
+        if not (self.adaptive_schedule and scheduled):
+            return states
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            intervals = dict(zip(
+                (state.service_name for state in scheduled), executor.map(self._adaptive_interval, scheduled)
+            ))
+        return restagger_schedules(states, intervals)
+
+    def _adaptive_interval(self, state: DesiredState) -> int:
+        base_interval = state.schedule.interval_minutes  # pyright: ignore [reportOptionalMemberAccess]
+        try:
+            return adaptive_interval(fetch_pipeline_history(self.client, state.pipeline_fqn), base_interval)
+        except (requests.RequestException, RuntimeError) as error:
+            print(f"{state.service_name}: run history is unavailable, keeping {base_interval} min interval: {error}")
+            return base_interval
+
+    def reconcile(self, state: DesiredState) -> ReconcileResult:
+        result = ReconcileResult(state.service_name)
+        try:
+            service_id, result.service = self._reconcile_service(state, result)
+            pipeline_id, result.pipeline, was_deployed = self._reconcile_pipeline(state, service_id, result)
+            if self.dry_run or pipeline_id is None:
+                return result
+            if result.service != NOOP or result.pipeline != NOOP:
+                result.deployed = self._deploy(pipeline_id, was_deployed)
+                if self.trigger:
+                    self._post(f"{PIPELINES_PATH}/trigger/{pipeline_id}")
+                    result.triggered = True
+        except (requests.RequestException, RuntimeError) as error:
+            result.error = str(error)
+        return result
+
+    def _reconcile_service(self, state: DesiredState, result: ReconcileResult) -> tuple[Optional[str], str]:
+        current = self._get(f"{SERVICES_PATH}/name/{state.service_name}", params={"fields": "connection"})
+        if current is None:
+            result.actions.append(f"create service {state.service_name}")
+            return (None if self.dry_run else self._put_service(state)), CREATED
+
+        if not service_differs(current, state.service):
+            return current["id"], NOOP
+        result.actions.append(f"update service {state.service_name}")
+        if not self.dry_run:
+            self._put_service(state)
+        return current["id"], UPDATED
+
+    def _reconcile_pipeline(self, state: DesiredState, service_id: Optional[str],
+                            result: ReconcileResult) -> tuple[Optional[str], str, bool]:
+        """
+        Returns:
+            ID пайплайна, что с ним сделано и был ли он задеплоен до изменений.
+        """
+        desired = state.pipeline
+        current = self._get(f"{PIPELINES_PATH}/name/{state.pipeline_fqn}")
+        if current is None:
+            result.actions.append(f"create pipeline {state.pipeline_fqn}")
+            if self.dry_run:
+                return None, CREATED, False
+            payload = {**desired, "service": {"id": service_id, "type": "databaseService"}}
+            return self._post(PIPELINES_PATH, json=payload)["id"], CREATED, False
+        was_deployed = bool(current.get("deployed"))
+
+        operations = pipeline_operations(current, desired)
+        if not operations:
+            return current["id"], NOOP, was_deployed
+
+        result.actions.extend(f"{op['op']} {state.pipeline_fqn}{op['path']}" for op in operations)
+        if not self.dry_run:
+            response = self.client.patch(
+                f"{PIPELINES_PATH}/{current['id']}",
+                data=json.dumps(operations),
+                headers={"Content-Type": "application/json-patch+json"},
+            )
+            raise_for_status(response)
+        return current["id"], UPDATED, was_deployed
+
+    def _deploy(self, pipeline_id: str, was_deployed: bool) -> bool:
+        """
+        Деплоит пайплайн. Результат передеплоя виден только по ответу деплоя: у задеплоенного ранее пайплайна
+        поле deployed уже True и при передеплое не меняется. Поэтому deployed опрашивается с экспоненциальной
+        задержкой только для пайплайна, который ещё не был задеплоен.
+        """
+        check_deploy_response(self._post(f"{PIPELINES_PATH}/deploy/{pipeline_id}"), pipeline_id)
+        if was_deployed:
+            return True
+        delay = 0.5
+        deadline = time.monotonic() + self.deploy_timeout
+        while True:
+            pipeline = self._get(f"{PIPELINES_PATH}/{pipeline_id}")
+            if pipeline and pipeline.get("deployed"):
+                return True
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 10)
+
+    def _put_service(self, state: DesiredState) -> str:
+        response = self.client.put(SERVICES_PATH, json=state.service)
+        raise_for_status(response)
+        return response.json()["id"]
+
+    def _get(self, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+        response = self.client.get(path, **kwargs)
+        if response.status_code == 404:
+            return None
+        raise_for_status(response)
+        return response.json()
+
+    def _post(self, path: str, **kwargs) -> Dict[str, Any]:
+        response = self.client.post(path, **kwargs)
+        raise_for_status(response)
+        return response.json() if response.content else {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Приведение сервисов и пайплайнов OpenMetadata к желаемому состоянию")
+    parser.add_argument("--trigger", action="store_true", help="Запустить пайплайн после создания или изменения")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать отличия")
+    parser.add_argument("--deploy-timeout", type=float, default=120)
+    parser.add_argument("--adaptive-schedule", action="store_true", default=SCHEDULE_ADAPTIVE,
+                        help="Подобрать интервал по истории запусков (нужен SCHEDULE_INTERVAL_MINUTES)")
+    args = parser.parse_args()
+
+    client = get_client(OPENMETADATA_HOST_PORT, OPENMETADATA_API_TOKEN)  # pyright: ignore [reportArgumentType]
+    reconciler = Reconciler(client, trigger=args.trigger, deploy_timeout=args.deploy_timeout, dry_run=args.dry_run,
+                            adaptive_schedule=args.adaptive_schedule)
+    results = reconciler.reconcile_all(desired_from_cfg())
+    for result in results:
+        print(result)
+        for action in result.actions:
+            print(f"  {action}")
+    client.print_metrics()
+    if any(result.error for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Расписания пайплайнов ингестии с разнесением запусков во времени.
+
+Если все пайплайны запускаются по "0 * * * *", в начале часа ClickHouse, Google API и сервер OpenMetadata
+получают нагрузку от всех сервисов сразу. Здесь каждому сервису назначается детерминированное смещение
+по хешу имени, не более max_concurrency запусков на слот, а интервал может подстраиваться
+под длительность прошлых запусков и частоту изменений в источнике.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from cfg import SCHEDULE_INTERVAL, SCHEDULE_INTERVAL_MINUTES, SCHEDULE_WINDOW_MINUTES, SCHEDULE_SLOT_MINUTES, \
+    SCHEDULE_MAX_CONCURRENCY, SCHEDULE_MIN_INTERVAL_MINUTES, SCHEDULE_MAX_INTERVAL_MINUTES
+
+# Интервалы, которые делят сутки нацело и поэтому выражаются одним cron-выражением
+INTERVALS = (5, 10, 15, 20, 30, 60, 120, 180, 240, 360, 480, 720, 1440)
+# Для адаптивного интервала нужно хотя бы столько завершённых запусков
+MIN_RUNS_FOR_ADAPTIVE = 3
+FINISHED_STATES = ("success", "partialSuccess", "failed")
+
+if SCHEDULE_INTERVAL_MINUTES and SCHEDULE_INTERVAL_MINUTES not in INTERVALS:
+    # Проверяется при загрузке модуля, а не в Schedule: иначе неверная настройка всплывёт посреди создания пайплайна
+    raise ValueError(
+        f"SCHEDULE_INTERVAL_MINUTES={SCHEDULE_INTERVAL_MINUTES} не поддерживается: допустимые значения {INTERVALS} "
+        f"или 0, чтобы использовать SCHEDULE_INTERVAL"
+    )
+
+
+def name_hash(name: str) -> int:
+    # hash() в python рандомизирован между процессами, а смещение должно быть одним и тем же при каждом запуске
+    return int(hashlib.sha1(name.encode("utf-8")).hexdigest(), 16)
+
+
+@dataclass(frozen=True)
+class Schedule:
+    """
+    Запуск каждые interval_minutes минут со смещением offset_minutes от начала суток.
+    """
+    interval_minutes: int
+    offset_minutes: int
+
+    def __post_init__(self):
+        if self.interval_minutes not in INTERVALS:
+            raise ValueError(f"Интервал {self.interval_minutes} мин. должен быть одним из {INTERVALS}")
+
+    def cron(self) -> str:
+        interval = self.interval_minutes
+        offset = self.offset_minutes % interval
+        if interval < 60:
+            return f"{offset}-59/{interval} * * * *"
+        hours = interval // 60
+        minute, hour = offset % 60, offset // 60
+        if hours == 1:
+            return f"{minute} * * * *"
+        if hours == 24:
+            return f"{minute} {hour} * * *"
+        return f"{minute} {hour}-23/{hours} * * *"
+
+
+def assign_schedules(
+    service_names: Iterable[str],
+    interval_minutes: int,
+    window_minutes: int = SCHEDULE_WINDOW_MINUTES,
+    slot_minutes: int = SCHEDULE_SLOT_MINUTES,
+    max_concurrency: int = SCHEDULE_MAX_CONCURRENCY,
+    intervals: Optional[Mapping[str, int]] = None,
+) -> Dict[str, Schedule]:
+    """
+    Разносит запуски сервисов по окну window_minutes, разбитому на слоты по slot_minutes
+    (примерная длительность запуска). Слот выбирается по хешу имени, если в нём уже max_concurrency
+    сервисов - берётся следующий свободный. Так добавление сервиса не сдвигает расписания остальных,
+    пока слоты не переполнены. max_concurrency = 0 - без ограничения.
+
+    intervals задаёт свои интервалы отдельным сервисам (например, адаптивные). Окно тогда не больше
+    наименьшего из интервалов: смещения меньше него, и запуски из разных слотов не совпадают,
+    если интервалы кратны друг другу (как все интервалы от часа и больше).
+    """
+    intervals = intervals or {}
+    names = sorted(set(service_names), key=name_hash)
+    window = min(window_minutes, min((intervals.get(name, interval_minutes) for name in names), default=interval_minutes))
+    slots = max(1, window // slot_minutes)
+    if max_concurrency and len(names) > slots * max_concurrency:
+        raise ValueError(
+            f"{len(names)} сервисов не помещаются в {slots} слотов по {max_concurrency} запусков, "
+            f"увеличьте окно или max_concurrency"
+        )
+
+    load = [0] * slots
+    schedules = {}
+    for name in names:
+        slot = name_hash(name) % slots
+        while max_concurrency and load[slot] >= max_concurrency:
+            slot = (slot + 1) % slots
+        load[slot] += 1
+        schedules[name] = Schedule(intervals.get(name, interval_minutes), slot * slot_minutes)
+    return schedules
+
+
+def default_schedule_interval(service_name: Optional[str]) -> str:
+    """
+    Расписание из cfg: со смещением по имени сервиса, если задан SCHEDULE_INTERVAL_MINUTES, иначе SCHEDULE_INTERVAL.
+    """
+    schedule = schedule_from_cfg(service_name)
+    return schedule.cron() if schedule else SCHEDULE_INTERVAL
+
+
+def schedule_from_cfg(service_name: Optional[str]) -> Optional[Schedule]:
+    if not SCHEDULE_INTERVAL_MINUTES or not service_name:
+        return None
+    return assign_schedules([service_name], SCHEDULE_INTERVAL_MINUTES)[service_name]
+
+
+def fetch_pipeline_history(client, pipeline_fqn: str, days: int = 7) -> List[Dict[str, Any]]:
+    """
+    Статусы запусков пайплайна за последние days дней.
+    """
+    end_ts = int(time.time() * 1000)
+    response = client.get(
+        f"/api/v1/services/ingestionPipelines/{pipeline_fqn}/pipelineStatus",
+        params={"startTs": end_ts - days * 24 * 3600 * 1000, "endTs": end_ts},
+    )
+    if response.status_code == 404:
+        return []
+    response.raise_for_status()
+    return response.json().get("data", [])
+
+
+def adaptive_interval(
+    history: List[Dict[str, Any]],
+    base_interval_minutes: int,
+    min_interval_minutes: int = SCHEDULE_MIN_INTERVAL_MINUTES,
+    max_interval_minutes: int = SCHEDULE_MAX_INTERVAL_MINUTES,
+) -> int:
+    """
+    Подбирает интервал по истории запусков:
+      - интервал не меньше удвоенной p90 длительности запуска, чтобы запуски не накладывались;
+      - если изменения (updated_records в шагах) были меньше чем в 20% запусков, интервал растёт в 4 раза,
+        меньше чем в 50% - в 2 раза, больше чем в 80% - уменьшается в 2 раза.
+    Результат округляется вверх до ближайшего интервала из INTERVALS, но не больше наибольшего
+    интервала из INTERVALS, который не превышает max.
+    """
+    runs = [
+        run for run in history
+        if run.get("pipelineState") in FINISHED_STATES
+        and run.get("startDate") is not None and run.get("endDate") is not None
+    ]
+    if len(runs) < MIN_RUNS_FOR_ADAPTIVE:
+        return base_interval_minutes
+
+    durations = sorted((run["endDate"] - run["startDate"]) / 60000 for run in runs)
+    p90_duration = durations[min(len(durations) - 1, int(len(durations) * 0.9))]
+    changed = sum(
+        1 for run in runs
+        if any(step.get("updated_records") for step in run.get("status") or [])
+    )
+    change_rate = changed / len(runs)
+
+    interval = float(base_interval_minutes)
+    if change_rate < 0.2:
+        interval *= 4
+    elif change_rate < 0.5:
+        interval *= 2
+    elif change_rate > 0.8:
+        interval /= 2
+    interval = max(interval, 2 * p90_duration, min_interval_minutes)
+    ceiling = max((value for value in INTERVALS if value <= max_interval_minutes), default=INTERVALS[0])
+    return min(next((value for value in INTERVALS if value >= interval), INTERVALS[-1]), ceiling)
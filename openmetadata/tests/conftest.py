@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Скрипты openmetadata/ импортируют друг друга по имени модуля (from cfg import ...), как при запуске из каталога
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
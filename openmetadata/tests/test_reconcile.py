@@ -0,0 +1,113 @@
+import pytest
+
+from reconcile import (
+    DesiredState, MASKED_SECRET, check_deploy_response, connection_differs, diff_config, normalize_filter_patterns,
+    pipeline_operations, restagger_schedules, service_differs,
+)
+from schedule import Schedule, assign_schedules
+
+
+def pipeline(config=None, schedule='0 * * * *'):
+    return {
+        'name': 'metadata',
+        'sourceConfig': {'config': {'type': 'DatabaseMetadata', **(config or {})}},
+        'airflowConfig': {'scheduleInterval': schedule},
+        'raiseOnError': True,
+    }
+
+
+def test_diff_config():
+    current = {'a': 1, 'b': 2, 'tableFilterPattern': {'includes': ['x']}, 'untouched': 3}
+    desired = {'a': 1, 'b': 5, 'c': 6}
+
+    assert diff_config(current, desired, '/cfg', removable=['tableFilterPattern', 'missing']) == [
+        {'op': 'replace', 'path': '/cfg/b', 'value': 5},
+        {'op': 'add', 'path': '/cfg/c', 'value': 6},
+        {'op': 'remove', 'path': '/cfg/tableFilterPattern'},
+    ]
+
+
+def test_connection_differs_ignores_masked_secrets_and_extra_keys():
+    current = {'hostPort': 'ch:8123', 'password': MASKED_SECRET, 'options': {'a': '1', 'b': '2'}, 'extra': True}
+
+    assert not connection_differs(current, {'hostPort': 'ch:8123', 'password': 'secret', 'options': {'a': '1'}})
+    assert connection_differs(current, {'hostPort': 'ch:9000'})
+    assert connection_differs(current, {'options': {'a': '2'}})
+
+
+def test_service_differs_by_description_only_when_desired():
+    current = {'description': 'old', 'connection': {'config': {'hostPort': 'ch:8123'}}}
+
+    assert not service_differs(current, {'connection': {'config': {'hostPort': 'ch:8123'}}})
+    assert service_differs(current, {'description': 'new', 'connection': {'config': {'hostPort': 'ch:8123'}}})
+
+
+def test_normalize_filter_patterns_drops_empty_parts():
+    config = {
+        'markDeletedTables': True,
+        'schemaFilterPattern': {'includes': [], 'excludes': []},
+        'tableFilterPattern': {'includes': ['events'], 'excludes': []},
+    }
+
+    assert normalize_filter_patterns(config) == {
+        'markDeletedTables': True,
+        'tableFilterPattern': {'includes': ['events']},
+    }
+    assert 'schemaFilterPattern' in config
+
+
+def test_pipeline_operations_ignore_server_defaults():
+    current = pipeline({'schemaFilterPattern': {'includes': [], 'excludes': []}})
+
+    assert pipeline_operations(current, pipeline()) == []
+
+
+def test_pipeline_operations():
+    current = pipeline({'tableFilterPattern': {'includes': ['old'], 'excludes': []}})
+    desired = pipeline({'markDeletedTables': True}, schedule='5 * * * *')
+    desired['raiseOnError'] = False
+
+    assert pipeline_operations(current, desired) == [
+        {'op': 'add', 'path': '/sourceConfig/config/markDeletedTables', 'value': True},
+        {'op': 'remove', 'path': '/sourceConfig/config/tableFilterPattern'},
+        {'op': 'replace', 'path': '/airflowConfig/scheduleInterval', 'value': '5 * * * *'},
+        {'op': 'replace', 'path': '/raiseOnError', 'value': False},
+    ]
+
+
+def test_restagger_schedules_applies_adapted_intervals():
+    options = {'window_minutes': 60, 'slot_minutes': 5, 'max_concurrency': 0}
+    names = ['clickhouse_a', 'clickhouse_b', 'clickhouse_c']
+    schedules = assign_schedules(names, 60, **options)
+    states = [
+        DesiredState(service={'name': name}, pipeline=pipeline(schedule=schedules[name].cron()),
+                     schedule=schedules[name], schedule_options=options)
+        for name in names
+    ] + [DesiredState(service={'name': 'manual'}, pipeline=pipeline())]
+
+    restaggered = restagger_schedules(states, {'clickhouse_a': 240})
+
+    expected = assign_schedules(names, 60, intervals={'clickhouse_a': 240, 'clickhouse_b': 60, 'clickhouse_c': 60},
+                                **options)
+    for state in restaggered[:3]:
+        assert state.schedule == expected[state.service_name]
+        assert state.pipeline['airflowConfig']['scheduleInterval'] == expected[state.service_name].cron()
+    assert restaggered[0].schedule.interval_minutes == 240
+    assert restaggered[3] is states[3]
+
+
+def test_restagger_schedules_keeps_states_that_do_not_fit():
+    options = {'window_minutes': 5, 'slot_minutes': 5, 'max_concurrency': 1}
+    states = [
+        DesiredState(service={'name': name}, pipeline=pipeline(), schedule=Schedule(60, 0), schedule_options=options)
+        for name in ('clickhouse_a', 'clickhouse_b')
+    ]
+
+    assert restagger_schedules(states, {}) == states
+
+
+def test_check_deploy_response():
+    check_deploy_response({'code': 200}, 'id')
+    check_deploy_response({}, 'id')
+    with pytest.raises(RuntimeError, match='400 Airflow error'):
+        check_deploy_response({'code': 400, 'reason': 'Airflow error'}, 'id')
@@ -0,0 +1,86 @@
+import pytest
+
+from schedule import INTERVALS, Schedule, adaptive_interval, assign_schedules
+
+SERVICES = [f'clickhouse_{i}' for i in range(12)]
+
+
+def history(runs: int, duration_minutes: float, changed_runs: int):
+    return [
+        {
+            'pipelineState': 'success',
+            'startDate': 0,
+            'endDate': int(duration_minutes * 60000),
+            'status': [{'updated_records': 1 if run < changed_runs else 0}],
+        }
+        for run in range(runs)
+    ]
+
+
+@pytest.mark.parametrize('schedule, cron', [
+    (Schedule(15, 5), '5-59/15 * * * *'),
+    (Schedule(15, 20), '5-59/15 * * * *'),
+    (Schedule(60, 25), '25 * * * *'),
+    (Schedule(180, 25), '25 0-23/3 * * *'),
+    (Schedule(1440, 150), '30 2 * * *'),
+])
+def test_cron(schedule, cron):
+    assert schedule.cron() == cron
+
+
+def test_unsupported_interval_is_rejected():
+    with pytest.raises(ValueError):
+        Schedule(45, 0)
+
+
+def test_assign_schedules_is_deterministic():
+    schedules = assign_schedules(SERVICES, 60, window_minutes=60, slot_minutes=5, max_concurrency=0)
+
+    assert schedules == assign_schedules(reversed(SERVICES), 60, window_minutes=60, slot_minutes=5, max_concurrency=0)
+    assert all(schedule.interval_minutes == 60 for schedule in schedules.values())
+    assert all(schedule.offset_minutes % 5 == 0 and schedule.offset_minutes < 60 for schedule in schedules.values())
+
+
+def test_assign_schedules_respects_max_concurrency():
+    schedules = assign_schedules(SERVICES, 60, window_minutes=30, slot_minutes=5, max_concurrency=2)
+
+    offsets = [schedule.offset_minutes for schedule in schedules.values()]
+    assert max(offsets.count(offset) for offset in offsets) <= 2
+
+    with pytest.raises(ValueError):
+        assign_schedules(SERVICES, 60, window_minutes=10, slot_minutes=5, max_concurrency=2)
+
+
+def test_new_service_does_not_move_others():
+    before = assign_schedules(SERVICES, 60, window_minutes=60, slot_minutes=5, max_concurrency=0)
+    after = assign_schedules(SERVICES + ['clickhouse_new'], 60, window_minutes=60, slot_minutes=5, max_concurrency=0)
+
+    assert {name: after[name] for name in SERVICES} == before
+
+
+def test_window_is_limited_by_smallest_interval():
+    intervals = {name: 15 if name == SERVICES[0] else 120 for name in SERVICES}
+    schedules = assign_schedules(SERVICES, 120, window_minutes=60, slot_minutes=5, max_concurrency=0, intervals=intervals)
+
+    assert schedules[SERVICES[0]].interval_minutes == 15
+    assert all(schedule.offset_minutes < 15 for schedule in schedules.values())
+
+
+def test_adaptive_interval_needs_history():
+    assert adaptive_interval(history(2, 1, 0), 60) == 60
+
+
+@pytest.mark.parametrize('runs, base, expected', [
+    (history(10, 1, 0), 60, 240),
+    (history(10, 1, 3), 60, 120),
+    (history(10, 1, 9), 60, 30),
+    # Не меньше удвоенной p90 длительности, с округлением вверх до INTERVALS
+    (history(10, 50, 9), 60, 120),
+])
+def test_adaptive_interval(runs, base, expected):
+    assert adaptive_interval(runs, base, min_interval_minutes=15, max_interval_minutes=1440) == expected
+
+
+@pytest.mark.parametrize('max_interval, expected', [(100, 60), (240, 240), (3, INTERVALS[0])])
+def test_adaptive_interval_does_not_exceed_max(max_interval, expected):
+    assert adaptive_interval(history(10, 1, 0), 60, min_interval_minutes=15, max_interval_minutes=max_interval) == expected
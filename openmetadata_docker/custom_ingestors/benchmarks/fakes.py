@@ -0,0 +1,233 @@
+"""
+Локальные заменители внешних систем для бенчмарков: Sheets/Drive API, ClickHouse и sink OpenMetadata.
+
+Все заменители считают обращения к себе в общий счётчик calls, по которому бенчмарк отчитывается
+о количестве API-вызовов.
+"""
+import os
+import re
+import threading
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from itertools import zip_longest
+from typing import Any, Iterable, Optional
+
+from custom_ingestors.gs_integration.google_api import BaseGoogleApi
+
+BENCHMARK_TOKEN_PATH = 'benchmark-token.json'
+
+CatalogRow = namedtuple('CatalogRow', [
+    'database', 'table', 'name', 'type', 'default_kind', 'default_expression', 'comment', 'is_in_primary_key',
+    'table_comment', 'metadata_modification_time',
+])
+DatabaseRow = namedtuple('DatabaseRow', ['name'])
+
+
+class CallCounter:
+    def __init__(self):
+        self._calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name: str) -> None:
+        with self._lock:
+            self._calls[name] += 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._calls)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+
+
+class FakeRequest:
+    def __init__(self, calls: CallCounter, name: str, response: Any):
+        self._calls = calls
+        self._name = name
+        self._response = response
+
+    def execute(self, http=None, num_retries: int = 0) -> Any:
+        self._calls.add(self._name)
+        return self._response() if callable(self._response) else self._response
+
+
+class FakeSheetsService:
+    """
+    Заменитель клиента Sheets API v4 поверх записанных значений листов {название листа: строки}.
+    """
+
+    def __init__(self, sheets: dict[str, list[list]], calls: CallCounter):
+        self.sheets = sheets
+        self.calls = calls
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId: str, range: Optional[str] = None, fields: Optional[str] = None,
+            majorDimension: str = 'ROWS', **kwargs):
+        if range is not None:
+            return FakeRequest(self.calls, 'sheets.values.get', lambda: {'values': self._select(range, majorDimension)})
+        return FakeRequest(self.calls, 'sheets.get', lambda: {
+            'properties': {'title': 'benchmark'},
+            'sheets': [
+                {'properties': {
+                    'title': title,
+                    'sheetId': index,
+                    'gridProperties': {
+                        'rowCount': len(rows),
+                        'columnCount': max((len(row) for row in rows), default=0),
+                    },
+                }}
+                for index, (title, rows) in enumerate(self.sheets.items())
+            ],
+        })
+
+    def batchGet(self, spreadsheetId: str, ranges: list[str], majorDimension: str = 'ROWS', **kwargs):
+        return FakeRequest(self.calls, 'sheets.values.batchGet', lambda: {
+            'valueRanges': [{'values': self._select(range, majorDimension)} for range in ranges]
+        })
+
+    def _select(self, range: str, major_dimension: str) -> list[list]:
+        """
+        Значения A1-диапазона: лист целиком, строки ('Лист'!1:5000) или колонка ('Лист'!C2:C).
+        Пустые строки и ячейки в конце обрезаются, как это делает Sheets API.
+        """
+        if range.startswith("'"):
+            sheet, cells = range[1:range.rindex("'")].replace("''", "'"), range[range.rindex("'") + 1:].lstrip('!')
+        else:
+            sheet, _, cells = range.partition('!')
+        values = self.sheets[sheet]
+        if cells:
+            start_column, start_row, end_column, end_row = re.fullmatch(r'([A-Z]*)(\d*):([A-Z]*)(\d*)', cells).groups()
+            values = values[int(start_row or 1) - 1:int(end_row) if end_row else None]
+            if start_column:
+                values = [row[_column_index(start_column):_column_index(end_column) + 1] for row in values]
+        if major_dimension == 'COLUMNS':
+            values = [list(column) for column in zip_longest(*values, fillvalue='')]
+        values = [_trim(row) for row in values]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _trim(row: list) -> list:
+    row = list(row)
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+
+class FakeDriveService:
+    """
+    Заменитель клиента Drive API v3: метаданные файла и одна ревизия.
+    """
+
+    def __init__(self, calls: CallCounter, version: str = '1'):
+        self.calls = calls
+        self.version = version
+
+    def files(self):
+        return self
+
+    def revisions(self):
+        return self
+
+    def get(self, fileId: str, fields: Optional[str] = None, **kwargs):
+        return FakeRequest(self.calls, 'drive.files.get', {'modifiedTime': '2024-01-01T00:00:00Z', 'version': self.version})
+
+    def list(self, fileId: str, **kwargs):
+        return FakeRequest(self.calls, 'drive.revisions.list', {'revisions': [{'id': self.version}]})
+
+
+class FakeCredentials:
+    expiry = None
+    valid = True
+    refresh_token = None
+
+
+@contextmanager
+def fake_google_api(sheets: dict[str, list[list]], calls: CallCounter):
+    """
+    Подкладывает заменители в общие на процесс кэши BaseGoogleApi, так что GoogleSheetsCollector
+    и ClickhouseGSInfo работают с ними через свой обычный код.
+    """
+    previous_token_path = os.environ.get('GS_TOKEN_PATH')
+    os.environ['GS_TOKEN_PATH'] = BENCHMARK_TOKEN_PATH
+    with BaseGoogleApi._clients_lock:
+        BaseGoogleApi._credentials_cache[BENCHMARK_TOKEN_PATH] = FakeCredentials()  # pyright: ignore [reportArgumentType]
+        BaseGoogleApi._services_cache[(BENCHMARK_TOKEN_PATH, 'sheets', 'v4')] = FakeSheetsService(sheets, calls)
+        BaseGoogleApi._services_cache[(BENCHMARK_TOKEN_PATH, 'drive', 'v3')] = FakeDriveService(calls)
+    try:
+        yield
+    finally:
+        with BaseGoogleApi._clients_lock:
+            BaseGoogleApi._credentials_cache.pop(BENCHMARK_TOKEN_PATH, None)
+            for key in [key for key in BaseGoogleApi._services_cache if key[0] == BENCHMARK_TOKEN_PATH]:
+                del BaseGoogleApi._services_cache[key]
+        if previous_token_path is None:
+            os.environ.pop('GS_TOKEN_PATH', None)
+        else:
+            os.environ['GS_TOKEN_PATH'] = previous_token_path
+
+
+class FakeConnection:
+    def __init__(self, engine: 'FakeEngine'):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execution_options(self, **options):
+        return self
+
+    def execute(self, statement, parameters: Optional[dict] = None):
+        self.engine.calls.add('clickhouse.query')
+        parameters = parameters or {}
+        if 'databases' in parameters:
+            databases = set(parameters['databases'])
+            return (row for row in self.engine.rows if row.database in databases)
+        return [DatabaseRow(name) for name in dict.fromkeys(row.database for row in self.engine.rows)]
+
+
+class FakeEngine:
+    """
+    Заменитель SQLAlchemy Engine для ClickhouseCatalogSnapshot: отдаёт синтетические строки system.columns.
+    """
+
+    def __init__(self, rows: list[CatalogRow], calls: CallCounter):
+        self.rows = rows
+        self.calls = calls
+
+    def connect(self) -> FakeConnection:
+        return FakeConnection(self)
+
+
+class FakeOpenMetadataSink:
+    """
+    Заменитель sink OpenMetadata: сериализует запросы так же, как при отправке, и считает их.
+    """
+
+    def __init__(self, calls: CallCounter):
+        self.calls = calls
+        self.requests = 0
+        self.bytes = 0
+
+    def write(self, records: Iterable[Any]) -> None:
+        for record in records:
+            self.calls.add('openmetadata.put_table')
+            self.requests += 1
+            self.bytes += len(record.model_dump_json())
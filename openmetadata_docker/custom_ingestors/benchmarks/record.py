@@ -0,0 +1,26 @@
+"""
+Записывает значения всех листов google таблицы в json-фикстуру для бенчмарков.
+
+    python -m benchmarks.record --file-id <id> --output fixtures/descriptions.json
+"""
+import argparse
+import json
+
+from custom_ingestors.gs_integration.gs_collector import GoogleSheetsCollector
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Запись google таблицы в фикстуру для бенчмарков')
+    parser.add_argument('--file-id', default='1W_WLS0chOvaxl_Cejt8pgF6cnUm8-4QkUdlYWPn1KGA')
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    collector = GoogleSheetsCollector(args.file_id)
+    sheets = collector.get_values_from_many_sources(collector.existing_sheets)
+    with open(args.output, 'w', encoding='utf-8') as fixture_file:
+        json.dump({'file_id': args.file_id, 'sheets': sheets}, fixture_file, ensure_ascii=False)
+    print(f'Записано {len(sheets)} листов в {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Бенчмарк пути ингестии без внешних систем: ClickhouseGSInfo и GoogleSheetsCollector поверх заменителей
+Sheets/Drive API, снимок каталога по синтетическому system.columns и обработка таблиц
+ClickhouseCustomIngestor (описания из GS, отпечатки таблиц) с отправкой в заменитель sink OpenMetadata.
+
+Каждая нагрузка прогоняется в отдельном процессе, чтобы пиковый RSS относился только к ней.
+
+    python -m benchmarks.run --tables 10 1000 10000 100000 --output results.json
+    python -m benchmarks.run --fixture fixtures/descriptions.json
+    python -m benchmarks.run --baseline results.json --max-regression 0.2
+
+С --baseline бенчмарк завершается с кодом 1, если пропускная способность упала или пиковый RSS вырос
+больше чем на max-regression относительно сохранённых результатов.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Optional
+
+BENCHMARK_FILE_ID = 'benchmark'
+BENCHMARK_SERVICE = 'benchmark_clickhouse'
+BENCHMARK_DATABASE = 'default'
+
+
+def percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0.0
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss в Linux - в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def timed(stages: dict[str, float], name: str):
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = time.perf_counter() - started_at
+
+
+def make_ingestor(description_index, catalog_snapshot, fingerprints_dir: str):
+    """
+    ClickhouseCustomIngestor без подключения к ClickHouse и OpenMetadata: только состояние,
+    которое нужно для обработки таблицы в yield_table.
+    """
+    from custom_ingestors.clickhouse import ClickhouseCustomIngestor
+    from custom_ingestors.table_fingerprints import TableFingerprintStore
+
+    ingestor = object.__new__(ClickhouseCustomIngestor)
+    # FQN таблиц строятся без обращения к OpenMetadata (skip_es_search)
+    ingestor.metadata = None
+    ingestor._description_index = description_index
+    ingestor._description_index_lock = threading.Lock()
+    ingestor.catalog_snapshot = catalog_snapshot
+    ingestor.table_fingerprints = TableFingerprintStore(BENCHMARK_SERVICE, fingerprints_dir)
+    ingestor.source_config = SimpleNamespace(overrideMetadata=False)
+    # sourceHash таблиц на сервере, как его заполняет раннер OpenMetadata
+    ingestor.cache = defaultdict(dict)
+    state = SimpleNamespace(database_service=BENCHMARK_SERVICE, database=BENCHMARK_DATABASE, database_schema=None)
+    ingestor.context = SimpleNamespace(get=lambda: state)
+    return ingestor
+
+
+def process_tables(ingestor, catalog_snapshot, sink) -> list[float]:
+    """
+    Обрабатывает все таблицы снимка так же, как yield_table: колонки с описаниями из GS,
+    CreateTableRequest, проверка отпечатка и отправка изменившихся таблиц в sink.
+
+    Returns:
+        Время обработки каждой таблицы в секундах.
+    """
+    from metadata.generated.schema.api.data.createTable import CreateTableRequest
+    from metadata.generated.schema.entity.data.table import Column, DataType, Table, TableType
+    from metadata.utils.source_hash import generate_source_hash
+
+    latencies = []
+    for (schema, table_name), table in catalog_snapshot.tables.items():
+        started_at = time.perf_counter()
+        ingestor.context.get().database_schema = schema
+        columns = [
+            Column(name=column.name, dataType=DataType.STRING, dataTypeDisplay=column.type,
+                   description=column.comment or None)
+            for column in table.columns
+        ]
+        for column in columns:
+            ingestor._description(table_name, column)
+        request = CreateTableRequest(
+            name=table_name,
+            tableType=TableType.Regular,
+            columns=columns,
+            databaseSchema=f'{BENCHMARK_SERVICE}.{BENCHMARK_DATABASE}.{schema}',
+        )
+        table_fqn = ingestor._table_fqn(table_name)
+        if not ingestor._is_table_unchanged(table_fqn, table_name, request):
+            # Как раннер OpenMetadata: запрос получает sourceHash, sink сохраняет его на сервере
+            request.sourceHash = generate_source_hash(request)
+            sink.write([request])
+            ingestor.cache[Table][table_fqn] = request.sourceHash
+            ingestor.table_fingerprints.confirm(table_fqn, request.sourceHash)
+        latencies.append(time.perf_counter() - started_at)
+    return latencies
+
+
+def run_workload(spec: dict[str, Any]) -> dict[str, Any]:
+    from custom_ingestors.catalog import ClickhouseCatalogSnapshot
+    from custom_ingestors.description_index import DescriptionIndex
+    from custom_ingestors.gs_integration.cache import SheetsCache
+    from custom_ingestors.gs_integration.main import ClickhouseGSInfo
+    from custom_ingestors.table_fingerprints import TableFingerprintStore
+
+    from .fakes import CallCounter, FakeEngine, FakeOpenMetadataSink, fake_google_api
+    from .workloads import generate, load_fixture
+
+    if spec.get('fixture'):
+        workload = load_fixture(spec['fixture'])
+    else:
+        workload = generate(spec['tables'], spec['columns_per_table'])
+    rss_after_workload = peak_rss_mb()
+
+    calls = CallCounter()
+    stages: dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, fake_google_api(workload.sheets, calls):
+        cache = SheetsCache(cache_dir=tmp_dir)
+        with timed(stages, 'gs_load'):
+            tables_data = ClickhouseGSInfo(BENCHMARK_FILE_ID, cache=cache).get_info_about_tables_in_gs()
+        with timed(stages, 'gs_load_cached'):
+            ClickhouseGSInfo(BENCHMARK_FILE_ID, cache=cache).get_info_about_tables_in_gs()
+        with timed(stages, 'description_index'):
+            description_index = DescriptionIndex(tables_data)
+
+        engine = FakeEngine(workload.catalog, calls)
+        with timed(stages, 'catalog_snapshot'):
+            snapshot = ClickhouseCatalogSnapshot.load(engine, ClickhouseCatalogSnapshot.get_database_names(engine))
+
+        sink = FakeOpenMetadataSink(calls)
+        ingestor = make_ingestor(description_index, snapshot, tmp_dir)
+        with timed(stages, 'tables'):
+            latencies = process_tables(ingestor, snapshot, sink)
+        ingestor.table_fingerprints.save()
+
+        # Второй прогон: ничего не менялось, таблицы отсекаются по отпечаткам
+        ingestor.table_fingerprints = TableFingerprintStore(BENCHMARK_SERVICE, tmp_dir)
+        with timed(stages, 'tables_unchanged'):
+            unchanged_latencies = process_tables(ingestor, snapshot, sink)
+
+    return {
+        'workload': workload.name,
+        'tables': workload.tables,
+        'columns': workload.columns,
+        'throughput_tables_per_s': len(latencies) / stages['tables'] if stages['tables'] else 0.0,
+        'table_p50_ms': percentile(latencies, 0.5) * 1000,
+        'table_p99_ms': percentile(latencies, 0.99) * 1000,
+        'unchanged_table_p50_ms': percentile(unchanged_latencies, 0.5) * 1000,
+        'stages_s': stages,
+        'api_calls': calls.snapshot(),
+        'sink_bytes': sink.bytes,
+        'rss_after_workload_mb': rss_after_workload,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(spec: dict[str, Any]) -> dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(run_workload, spec).result()
+
+
+def print_report(results: list[dict[str, Any]]) -> None:
+    for result in results:
+        stages = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in result['stages_s'].items())
+        calls = ', '.join(f'{name}: {count}' for name, count in sorted(result['api_calls'].items()))
+        print(
+            f"{result['workload']}: {result['tables']} tables, {result['columns']} columns\n"
+            f"  throughput {result['throughput_tables_per_s']:.0f} tables/s, "
+            f"p50 {result['table_p50_ms']:.3f} ms, p99 {result['table_p99_ms']:.3f} ms, "
+            f"unchanged p50 {result['unchanged_table_p50_ms']:.3f} ms\n"
+            f"  peak RSS {result['peak_rss_mb']:.0f} MB (workload alone {result['rss_after_workload_mb']:.0f} MB)\n"
+            f"  stages: {stages}\n"
+            f"  API calls: {calls}"
+        )
+
+
+def find_regressions(results: list[dict[str, Any]], baseline: list[dict[str, Any]], max_regression: float) -> list[str]:
+    baseline_by_name = {result['workload']: result for result in baseline}
+    regressions = []
+    for result in results:
+        previous: Optional[dict[str, Any]] = baseline_by_name.get(result['workload'])
+        if previous is None:
+            continue
+        if result['throughput_tables_per_s'] < previous['throughput_tables_per_s'] * (1 - max_regression):
+            regressions.append(
+                f"{result['workload']}: throughput {result['throughput_tables_per_s']:.0f} tables/s, "
+                f"baseline {previous['throughput_tables_per_s']:.0f}"
+            )
+        if result['peak_rss_mb'] > previous['peak_rss_mb'] * (1 + max_regression):
+            regressions.append(
+                f"{result['workload']}: peak RSS {result['peak_rss_mb']:.0f} MB, baseline {previous['peak_rss_mb']:.0f}"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Бенчмарк пути ингестии ClickHouse + Google Sheets')
+    parser.add_argument('--tables', type=int, nargs='*', default=[10, 1000, 10000, 100000])
+    parser.add_argument('--columns-per-table', type=int, default=10)
+    parser.add_argument('--fixture', action='append', default=[], help='Записанная google таблица (benchmarks.record)')
+    parser.add_argument('--output', help='Сохранить результаты в json')
+    parser.add_argument('--baseline', help='Сравнить с сохранёнными результатами')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    specs = [{'tables': tables, 'columns_per_table': args.columns_per_table} for tables in args.tables]
+    specs += [{'fixture': fixture} for fixture in args.fixture]
+    results = [run_isolated(spec) for spec in specs]
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.max_regression)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Нагрузки для бенчмарков: синтетические или из записанной google таблицы.
+
+Нагрузка - значения листов google таблицы в том виде, в каком их отдаёт Sheets API,
+и строки system.columns для тех же таблиц.
+"""
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+from .fakes import CatalogRow
+
+TABLES_SHEET = 'Список таблиц'
+CLICKHOUSE_TYPES = ('String', 'UInt64', 'Int32', 'DateTime', 'Date', 'Float64', 'Nullable(String)', 'LowCardinality(String)')
+
+
+@dataclass
+class Workload:
+    name: str
+    sheets: dict[str, list[list]]
+    catalog: list[CatalogRow]
+
+    @property
+    def tables(self) -> int:
+        return len({(row.database, row.table) for row in self.catalog})
+
+    @property
+    def columns(self) -> int:
+        return len(self.catalog)
+
+
+def generate(
+    tables: int,
+    columns_per_table: int = 10,
+    described_ratio: float = 0.8,
+    schemas: int = 10,
+    seed: int = 0,
+) -> Workload:
+    """
+    Синтетическая нагрузка: tables таблиц по columns_per_table колонок, разложенных по schemas базам.
+    Описания в google таблице есть у described_ratio колонок, у части таблиц листа нет вовсе.
+    """
+    rng = random.Random(seed)
+    sheets: dict[str, list[list]] = {TABLES_SHEET: [['Таблица']]}
+    catalog = []
+    for table_index in range(tables):
+        schema = f'schema_{table_index % schemas}'
+        table = f'table_{table_index}'
+        columns = [f'column_{column_index}' for column_index in range(columns_per_table)]
+        if rng.random() < 0.95:
+            sheets[TABLES_SHEET].append([table])
+            sheet = sheets[table] = [[table, 'Описание']]
+            for column in columns:
+                if rng.random() < described_ratio:
+                    sheet.append([column, f'Описание колонки {column} таблицы {table}'])
+        for position, column in enumerate(columns):
+            catalog.append(CatalogRow(
+                database=schema,
+                table=table,
+                name=column,
+                type=rng.choice(CLICKHOUSE_TYPES),
+                default_kind='',
+                default_expression='',
+                comment=f'Комментарий {column}' if rng.random() < 0.3 else '',
+                is_in_primary_key=position == 0,
+                table_comment='',
+                metadata_modification_time='2024-01-01 00:00:00',
+            ))
+    return Workload(f'synthetic-{tables}x{columns_per_table}', sheets, catalog)
+
+
+def load_fixture(path: str, schema: str = 'default') -> Workload:
+    """
+    Нагрузка из записанной google таблицы (см. benchmarks.record). Каталог ClickHouse строится
+    по листам: колонки таблицы - значения первой колонки её листа.
+    """
+    with open(path, encoding='utf-8') as fixture_file:
+        sheets = json.load(fixture_file)['sheets']
+
+    catalog = []
+    for (table,) in (row[:1] for row in sheets.get(TABLES_SHEET, [])[1:] if row):
+        for position, row in enumerate(sheets.get(table, [])[1:]):
+            if not row or not row[0]:
+                continue
+            catalog.append(CatalogRow(
+                database=schema, table=table, name=row[0], type='String', default_kind='', default_expression='',
+                comment='', is_in_primary_key=position == 0, table_comment='',
+                metadata_modification_time='2024-01-01 00:00:00',
+            ))
+    return Workload(Path(path).stem, sheets, catalog)
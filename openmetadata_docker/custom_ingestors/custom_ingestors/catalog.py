@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+
+from metadata.utils.logger import ingestion_logger
+
+logger = ingestion_logger()
+
+SYSTEM_DATABASES = ('system', 'INFORMATION_SCHEMA', 'information_schema')
+
+DATABASES_QUERY = text("SELECT name FROM system.databases WHERE name NOT IN :system_databases").bindparams(
+    bindparam('system_databases', expanding=True)
+)
+
+CATALOG_QUERY = text("""
+    SELECT
+        c.database AS database,
+        c.table AS table,
+        c.name AS name,
+        c.type AS type,
+        c.default_kind AS default_kind,
+        c.default_expression AS default_expression,
+        c.comment AS comment,
+        c.is_in_primary_key AS is_in_primary_key,
+        t.comment AS table_comment,
+        toString(t.metadata_modification_time) AS metadata_modification_time
+    FROM system.columns AS c
+    INNER JOIN system.tables AS t ON c.database = t.database AND c.table = t.name
+    WHERE c.database IN :databases
+    ORDER BY c.database, c.table, c.position
+""").bindparams(bindparam('databases', expanding=True))
+
+
+@dataclass
+class CatalogColumn:
+    name: str
+    type: str
+    default_kind: str
+    default_expression: str
+    comment: str
+    is_in_primary_key: bool
+
+
+@dataclass
+class CatalogTable:
+    comment: str
+    metadata_modification_time: str
+    columns: list[CatalogColumn] = field(default_factory=list)
+
+
+class ClickhouseCatalogSnapshot:
+    """
+    Снимок system.columns и system.tables для всех нужных баз ClickHouse, загруженный одним запросом.
+
+    После install() диалект SQLAlchemy отдаёт колонки, комментарии таблиц и первичные ключи из снимка,
+    поэтому рефлексия таблиц в ClickhouseSource не ходит в ClickHouse отдельно за каждой таблицей.
+    Таблицы, которых нет в снимке (например, созданные после его загрузки), рефлексируются как обычно.
+    """
+
+    def __init__(self, tables: dict[tuple[str, str], CatalogTable]):
+        self.tables = tables
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    @classmethod
+    def get_database_names(cls, engine: Engine) -> list[str]:
+        with engine.connect() as connection:
+            rows = connection.execute(DATABASES_QUERY, {'system_databases': list(SYSTEM_DATABASES)})
+            return [row.name for row in rows]
+
+    @classmethod
+    def load(
+        cls,
+        engine: Engine,
+        databases: Iterable[str],
+        table_filter: Optional[Callable[[str, str], bool]] = None,
+    ) -> 'ClickhouseCatalogSnapshot':
+        """
+        Загружает снимок каталога для переданных баз ClickHouse одним потоковым запросом.
+
+        Args:
+            table_filter: Функция (база, таблица) -> True, если таблицу нужно пропустить.
+        """
+        databases = list(databases)
+        tables: dict[tuple[str, str], CatalogTable] = {}
+        filtered: set[tuple[str, str]] = set()
+        if not databases:
+            return cls(tables)
+
+        with engine.connect() as connection:
+            rows = connection.execution_options(stream_results=True).execute(CATALOG_QUERY, {'databases': databases})
+            for row in rows:
+                key = (row.database, row.table)
+                table = tables.get(key)
+                if table is None:
+                    if key in filtered:
+                        continue
+                    if table_filter is not None and table_filter(row.database, row.table):
+                        filtered.add(key)
+                        continue
+                    table = tables[key] = CatalogTable(
+                        comment=row.table_comment,
+                        metadata_modification_time=row.metadata_modification_time,
+                    )
+                table.columns.append(CatalogColumn(
+                    name=row.name,
+                    type=row.type,
+                    default_kind=row.default_kind,
+                    default_expression=row.default_expression,
+                    comment=row.comment,
+                    is_in_primary_key=bool(row.is_in_primary_key),
+                ))
+        return cls(tables)
+
+    def get_table(self, schema: Optional[str], table_name: str) -> Optional[CatalogTable]:
+        return self.tables.get((schema, table_name))
+
+    def install(self, dialect: Any) -> None:
+        """
+        Подменяет у экземпляра диалекта методы рефлексии на чтение из снимка.
+        """
+        if not hasattr(dialect, '_get_column_info'):
+            logger.warning("ClickHouse dialect has no _get_column_info, catalog snapshot is not used for reflection")
+            return
+
+        dialect.get_columns = self._wrap(dialect.get_columns, lambda table: [
+            dialect._get_column_info(
+                column.name, column.type, column.default_kind, column.default_expression, column.comment
+            )
+            for column in table.columns
+        ])
+        dialect.get_table_comment = self._wrap(dialect.get_table_comment, lambda table: {
+            'text': table.comment or None
+        })
+        dialect.get_pk_constraint = self._wrap(dialect.get_pk_constraint, lambda table: {
+            'constrained_columns': [column.name for column in table.columns if column.is_in_primary_key],
+            'name': None,
+        })
+
+    def _wrap(self, original: Callable, from_snapshot: Callable[[CatalogTable], Any]) -> Callable:
+        # Если метод уже подменён предыдущим снимком, оборачиваем исходный метод диалекта
+        original = getattr(original, '__wrapped__', original)
+
+        def reflect(connection, table_name, schema=None, **kw):
+            table = self.get_table(schema, table_name)
+            if table is None:
+                return original(connection, table_name, schema=schema, **kw)
+            return from_snapshot(table)
+
+        reflect.__wrapped__ = original
+        return reflect
@@ -1,8 +1,14 @@
 import copy
-from typing import Iterable, Tuple
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Iterable, Optional, Tuple
 
 from metadata.generated.schema.api.data.createTable import CreateTableRequest
-from metadata.generated.schema.entity.data.table import Column, TableType
+from metadata.generated.schema.entity.data.table import Column, Table, TableType
 from metadata.generated.schema.entity.services.connections.database.clickhouseConnection import (
     ClickhouseConnection, ClickhouseType, ClickhouseScheme,
 )
@@ -10,29 +16,164 @@ from metadata.generated.schema.entity.services.connections.database.customDataba
     CustomDatabaseConnection
 from metadata.generated.schema.type import basic
 from metadata.ingestion.api.models import Either
+from metadata.ingestion.ometa.utils import model_str
 from metadata.ingestion.source.database.clickhouse.metadata import ClickhouseSource
-from metadata.utils.execution_time_tracker import calculate_execution_time_generator
+from metadata.utils import fqn
+from metadata.utils.execution_time_tracker import ExecutionTimeTrackerContextMap, calculate_execution_time_generator
 from metadata.utils.logger import ingestion_logger
 
+from .catalog import ClickhouseCatalogSnapshot
+from .description_index import DEFAULT_COMMENT, DescriptionIndex, format_description
+from .filters import FilterSet
+from .instrumentation import metrics, timed
 from .gs_integration.main import ClickhouseGSInfo
+from .gs_integration.snapshot import DescriptionsSnapshot
+from .table_fingerprints import TableFingerprintStore
 
 logger = ingestion_logger()
 
+# Описание колонки, у которой нет комментария ни в БД, ни в GS - одно на все такие колонки
+EMPTY_DESCRIPTION = basic.Markdown(format_description(DEFAULT_COMMENT, DEFAULT_COMMENT))
+
+# Опция в connectionOptions сервиса, включающая параллельную обработку таблиц
+INGESTION_THREADS_OPTION = "ingestionThreads"
+
 
 class ClickhouseCustomIngestor(ClickhouseSource):
 
+    # Сколько ждать загрузки Google Sheets с момента создания источника, после - только комментарии из БД
+    GS_LOAD_TIMEOUT_SECONDS = float(os.environ.get('GS_LOAD_TIMEOUT_SECONDS', 600))
+    # Файл со снимком описаний (python -m custom_ingestors.gs_integration.snapshot export), вместо Google Sheets
+    GS_SNAPSHOT_PATH = os.environ.get('GS_SNAPSHOT_PATH')
+
     def __init__(self, config, metadata,):
+        # Google Sheets грузятся в фоне, параллельно с подключением к ClickHouse и обходом схем
+        self._gs_load_deadline = time.monotonic() + self.GS_LOAD_TIMEOUT_SECONDS
+        self._description_index: Optional[DescriptionIndex] = None
+        self._description_index_lock = threading.Lock()
+        self._description_index_future: Future = Future()
+        # Описания из GS не дождались или не загрузили - в запуске только комментарии из БД
+        self._description_index_fallback = False
+        # Открытый снимок описаний: индекс читает из него колонки по мере обработки таблиц
+        self._descriptions_snapshot: Optional[DescriptionsSnapshot] = None
+        threading.Thread(target=self._load_description_index, name='gs-loader', daemon=True).start()
+
         super().__init__(config, metadata)
-        self.gs_info = ClickhouseGSInfo('1W_WLS0chOvaxl_Cejt8pgF6cnUm8-4QkUdlYWPn1KGA')
-        self.get_info_about_tables_in_gs()
+        self.table_fingerprints = TableFingerprintStore(self.config.serviceName)
+        # ingestionThreads: сколько таблиц схемы готовится параллельно, 1 - по очереди в потоке раннера
+        self.ingestion_threads = 1
+        self._table_pool: Optional[ThreadPoolExecutor] = None
+        # (схема, таблица) -> подготовленные заранее запросы таблицы
+        self._prepared_tables: dict[tuple[str, Tuple[str, TableType]], Future] = {}
+
+    @property
+    def description_index(self) -> DescriptionIndex:
+        """
+        Индекс описаний из Google Sheets. При первом обращении ждёт фоновую загрузку,
+        но не дольше GS_LOAD_TIMEOUT_SECONDS с момента создания источника.
+        """
+        with self._description_index_lock:
+            if self._description_index is None:
+                timeout = max(0.0, self._gs_load_deadline - time.monotonic())
+                try:
+                    self._description_index = self._description_index_future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    logger.warning(f"Google Sheets were not loaded in {self.GS_LOAD_TIMEOUT_SECONDS}s, "
+                                   f"falling back to database comments only")
+                    self._description_index = DescriptionIndex({})
+                    self._description_index_fallback = True
+                except Exception as exc:
+                    logger.debug(traceback.format_exc())
+                    logger.warning(f"Failed to load Google Sheets, falling back to database comments only: {exc}")
+                    self._description_index = DescriptionIndex({})
+                    self._description_index_fallback = True
+            return self._description_index
+
+    def _load_description_index(self) -> None:
+        try:
+            tables_data = self._load_descriptions_snapshot()
+            if tables_data is None:
+                with timed('gs.init'):
+                    self.gs_info = ClickhouseGSInfo('1W_WLS0chOvaxl_Cejt8pgF6cnUm8-4QkUdlYWPn1KGA', consumer='ingestion')
+                tables_data = self.get_info_about_tables_in_gs() or {}
+            with timed('gs.description_index'):
+                description_index = DescriptionIndex(tables_data)
+            logger.info(f"Description index: {len(description_index)} tables, "
+                        f"{description_index.memory_footprint()} bytes loaded")
+            self._description_index_future.set_result(description_index)
+        except Exception as exc:
+            self._description_index_future.set_exception(exc)
     
+    def _load_descriptions_snapshot(self) -> Optional[DescriptionsSnapshot]:
+        """
+        Описания из снимка GS_SNAPSHOT_PATH (gs_integration.snapshot export), если он задан и читается.
+        Со снимком Google API во время ингестии не вызывается.
+        """
+        if not self.GS_SNAPSHOT_PATH:
+            return None
+        try:
+            with timed('gs.snapshot'):
+                snapshot = DescriptionsSnapshot(self.GS_SNAPSHOT_PATH)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Failed to open descriptions snapshot {self.GS_SNAPSHOT_PATH}, "
+                           f"loading Google Sheets instead: {exc}")
+            return None
+        logger.info(f"Descriptions snapshot {self.GS_SNAPSHOT_PATH}: {len(snapshot)} tables, "
+                    f"created {time.time() - snapshot.created_at:.0f}s ago")
+        self._descriptions_snapshot = snapshot
+        return snapshot
+
     def get_info_about_tables_in_gs(self) -> dict[str, dict[str, str]] | None:
+        # Проверка одинакова для данных из кэша и из Google: metadata_need_update берёт время изменения
+        # из метаданных файла, которые запрашиваются в любом случае, чтобы выбрать запись кэша
         if not self.gs_info.metadata_need_update:
             return None
-        
+
+        # Сначала версия файла: если ингестия её уже обработала, листы берутся из кэша без запросов к Sheets API
+        changed_tables = self.gs_info.get_changed_tables_info()
         tables_data = self.gs_info.get_info_about_tables_in_gs()
+        logger.info(f"Google Sheets: {len(changed_tables)} sheets changed since the last ingestion, "
+                    f"cache {self.gs_info.cache_stats}")
         return tables_data or None
 
+    def set_inspector(self, database_name: str) -> None:
+        super().set_inspector(database_name)
+        with timed('clickhouse.catalog_snapshot'):
+            self.catalog_snapshot = self._load_catalog_snapshot(database_name)
+        self.catalog_snapshot.install(self.engine.dialect)
+
+    @property
+    def filters(self) -> FilterSet:
+        """
+        Фильтры баз, схем и таблиц из sourceConfig, скомпилированные один раз на источник.
+        """
+        if getattr(self, '_filters', None) is None:
+            self._filters = FilterSet.from_config(self.source_config)
+        return self._filters
+
+    def _load_catalog_snapshot(self, database_name: str) -> ClickhouseCatalogSnapshot:
+        """
+        Загружает колонки и комментарии всех таблиц из подходящих под фильтры баз ClickHouse
+        одним запросом к system.columns, вместо рефлексии каждой таблицы отдельно.
+        Отфильтрованные базы и таблицы в снимок не попадают.
+        """
+        service_name = self.context.get().database_service
+        schemas = [
+            schema_name
+            for schema_name in ClickhouseCatalogSnapshot.get_database_names(self.engine)
+            if not self.filters.filter_schema(service_name, database_name, schema_name)
+        ]
+
+        snapshot = ClickhouseCatalogSnapshot.load(
+            self.engine,
+            schemas,
+            table_filter=lambda schema_name, table_name: self.filters.filter_table(
+                service_name, database_name, schema_name, table_name
+            ),
+        )
+        logger.info(f"ClickHouse catalog snapshot: {len(snapshot)} tables in {len(schemas)} schemas")
+        return snapshot
+
     @classmethod
     def create(cls, config_dict, metadata, pipeline_name=None):
 
@@ -41,6 +182,10 @@ class ClickhouseCustomIngestor(ClickhouseSource):
         custom_conn = CustomDatabaseConnection.model_validate(cfg["serviceConnection"]["config"])
         raw_config = cfg["serviceConnection"]["config"]
 
+        # ingestionThreads - наша опция, в драйвер ClickHouse её передавать нельзя
+        connection_options = dict(raw_config.get('connectionOptions') or {})
+        ingestion_threads = connection_options.pop(INGESTION_THREADS_OPTION, None)
+
         click_conn = ClickhouseConnection.model_validate({
             "type": ClickhouseType.Clickhouse,
             "scheme": ClickhouseScheme.clickhouse_http,
@@ -49,7 +194,7 @@ class ClickhouseCustomIngestor(ClickhouseSource):
             "password": custom_conn.password, # pyright: ignore[reportAttributeAccessIssue]
             "databaseName": custom_conn.databaseName, # pyright: ignore[reportAttributeAccessIssue]
             "databaseSchema": None,
-            "connectionOptions": raw_config['connectionOptions'],
+            "connectionOptions": connection_options,
             "schemaFilterPattern": custom_conn.schemaFilterPattern,
             "tableFilterPattern": custom_conn.tableFilterPattern,
             "databaseFilterPattern": custom_conn.databaseFilterPattern,
@@ -57,28 +202,160 @@ class ClickhouseCustomIngestor(ClickhouseSource):
         })
 
         cfg["serviceConnection"]["config"] = click_conn.model_dump(mode="json")
-        return super().create(cfg, metadata, pipeline_name)
+        source = super().create(cfg, metadata, pipeline_name)
+        if ingestion_threads:
+            # Таблицы готовит свой пул (get_tables_name_and_type), а не потоки топологии OpenMetadata:
+            # те выдают схемы в порядке готовности, а нам нужен стабильный порядок
+            source.ingestion_threads = int(ingestion_threads)
+        return source
     
     def _description(self, table_name: str, column: Column) -> None:
-        base_comment = column.description.root if column.description else "Комментарий отсутствует"
-        gs_comment = self.gs_info.tables_data.get(table_name, {}).get(column.name.root, "Комментарий отсутствует")
-        column.description = basic.Markdown(f"Описание из БД:\n"
-                                            f"{base_comment}\n\n"
-                                            f"Описание из GS:\n"
-                                            f"{gs_comment}")
+        gs_comment = self.description_index.lookup(table_name, column.name.root)
+        if not column.description and gs_comment is DEFAULT_COMMENT:
+            column.description = EMPTY_DESCRIPTION
+            return
+        base_comment = column.description.root if column.description else DEFAULT_COMMENT
+        column.description = basic.Markdown(format_description(base_comment, gs_comment))
     
+    def get_tables_name_and_type(self) -> Optional[Iterable[Tuple[str, TableType]]]:
+        """
+        Таблицы схемы. При ingestionThreads > 1 запросы таблиц (рефлексия, описания из GS, отпечатки) готовятся
+        заранее пулом из ingestionThreads потоков, у каждого потока своё подключение к ClickHouse. Вперёд
+        готовится не больше ingestionThreads таблиц, а раннер получает их в том же порядке, что и без пула.
+        """
+        tables = super().get_tables_name_and_type() or []
+        if self.ingestion_threads <= 1:
+            yield from tables
+            return
+
+        if self._table_pool is None:
+            self._table_pool = ThreadPoolExecutor(max_workers=self.ingestion_threads, thread_name_prefix='table')
+        schema_name = self.context.get().database_schema
+        parent_thread_id = self.context.get_current_thread_id()
+        window = deque()
+        try:
+            for table_name_and_type in tables:
+                self._prepared_tables[(schema_name, table_name_and_type)] = self._table_pool.submit(
+                    self._prepare_table, table_name_and_type, parent_thread_id
+                )
+                window.append(table_name_and_type)
+                if len(window) > self.ingestion_threads:
+                    yield window.popleft()
+            while window:
+                yield window.popleft()
+        finally:
+            # Раннер прервал обход схемы - подготовленные таблицы больше не нужны
+            for table_name_and_type in window:
+                self._prepared_tables.pop((schema_name, table_name_and_type)).cancel()
+
+    def _prepare_table(
+        self, table_name_and_type: Tuple[str, TableType], parent_thread_id: int
+    ) -> list[tuple[Either[CreateTableRequest], Optional[str]]]:
+        # Контекст раннера (сервис, база, схема) копируется на каждую таблицу: поток пула переходит между схемами
+        self.context.copy_from(parent_thread_id)
+        ExecutionTimeTrackerContextMap().copy_from_parent(parent_thread_id)
+        try:
+            return list(self._table_requests(table_name_and_type))
+        finally:
+            self.context.pop()
+
     @calculate_execution_time_generator()
     def yield_table(
         self, table_name_and_type: Tuple[str, TableType]
     ) -> Iterable[Either[CreateTableRequest]]:
-        
+
+        prepared = self._prepared_tables.pop((self.context.get().database_schema, table_name_and_type), None)
+        table_requests = prepared.result() if prepared is not None else self._table_requests(table_name_and_type)
+        for either, table_fqn in table_requests:
+            table_request = either.right
+            yield either
+            if table_fqn is not None:
+                # Раннер вернул управление без ошибки и проставил запросу sourceHash. Дошла ли запись до сервера,
+                # проверит следующий запуск: отпечаток годится, только если сервер хранит тот же sourceHash
+                source_hash = table_request.sourceHash
+                self.table_fingerprints.confirm(table_fqn, model_str(source_hash) if source_hash else None)
+
+    def _table_requests(
+        self, table_name_and_type: Tuple[str, TableType]
+    ) -> Iterable[tuple[Either[CreateTableRequest], Optional[str]]]:
+        """
+        Запросы таблицы с описаниями из GS вместе с её FQN. Неизменившиеся таблицы пропускаются,
+        ошибки ClickhouseSource отдаются как есть (без FQN).
+        """
         table_name = table_name_and_type[0]
-        
+
         for either in super().yield_table(table_name_and_type):
 
             right = either.right
-            assert right
-            for column in right.columns or []:
-                self._description(table_name, column)
+            if right is None:
+                yield either, None
+                continue
+            with timed('ingestor.merge_descriptions'):
+                for column in right.columns or []:
+                    self._description(table_name, column)
             either.right = right
-            yield either
\ No newline at end of file
+            table_fqn = self._table_fqn(table_name)
+            with timed('ingestor.fingerprint'):
+                unchanged = self._is_table_unchanged(table_fqn, table_name, right)
+            if unchanged:
+                # Генератор ClickhouseSource всё равно дочитывается: после yield он регистрирует таблицу
+                # для markDeletedTables, поэтому пропущенная таблица не будет помечена удалённой
+                logger.debug(f"Table {table_name} has not changed since the last run, skipping")
+                continue
+            yield either, table_fqn
+
+    def _table_fqn(self, table_name: str) -> str:
+        context = self.context.get()
+        return fqn.build(
+            self.metadata,
+            entity_type=Table,
+            service_name=context.database_service,
+            database_name=context.database,
+            schema_name=context.database_schema,
+            table_name=table_name,
+            skip_es_search=True,
+        )
+
+    def _is_table_unchanged(self, table_fqn: str, table_name: str, table_request: CreateTableRequest) -> bool:
+        schema_name = self.context.get().database_schema
+        catalog_table = self.catalog_snapshot.get_table(schema_name, table_name)
+        fingerprint = TableFingerprintStore.compute(
+            table_request.model_dump_json(),
+            catalog_table.metadata_modification_time if catalog_table else None,
+        )
+        # self.cache раннер заполняет sourceHash таблиц с сервера перед обработкой схемы
+        server_source_hash = self.cache[Table].get(table_fqn)
+        unchanged = self.table_fingerprints.is_unchanged(
+            table_fqn, fingerprint, model_str(server_source_hash) if server_source_hash else None
+        )
+        # overrideMetadata (CLICKHOUSE_OVERRIDE_METADATA) - полная пересинхронизация всех таблиц
+        return unchanged and not self.source_config.overrideMetadata
+
+    def close(self):
+        if self._table_pool is not None:
+            self._table_pool.shutdown(cancel_futures=True)
+        self._save_fingerprints()
+        if self._descriptions_snapshot is not None:
+            self._descriptions_snapshot.close()
+        metrics.log_summary(logger)
+        try:
+            metrics.export_textfile()
+        except OSError as exc:
+            logger.warning(f"Failed to write ingestion metrics textfile: {exc}")
+        super().close()
+
+    def _save_fingerprints(self) -> None:
+        """
+        Сохраняет отпечатки таблиц и листов GS, только если описания были взяты из GS. Иначе следующий запуск
+        отправит таблицы заново, а не пропустит их как уже записанные.
+        """
+        if self._description_index_fallback:
+            logger.warning("Descriptions fell back to database comments only, fingerprints are not saved")
+            return
+        if self.table_fingerprints.unconfirmed:
+            logger.info(f"{self.table_fingerprints.unconfirmed} tables were not confirmed by the runner "
+                        f"and will be sent again on the next run")
+        self.table_fingerprints.save()
+        if getattr(self, 'gs_info', None) is not None and self._description_index is not None:
+            # Листы, описания с которых попали в этот запуск, отмечаются обработанными
+            self.gs_info.commit_fingerprints()
@@ -0,0 +1,142 @@
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Optional
+
+DEFAULT_COMMENT = "Комментарий отсутствует"
+
+_DB_HEADER = "Описание из БД:\n"
+_GS_HEADER = "\n\nОписание из GS:\n"
+
+
+def format_description(base_comment: str, gs_comment: str) -> str:
+    """
+    Собирает описание колонки из комментария в БД и описания из GS.
+    """
+    return f"{_DB_HEADER}{base_comment}{_GS_HEADER}{gs_comment}"
+
+
+def extract_base_comment(description: Optional[str]) -> str:
+    """
+    Достаёт комментарий из БД из описания, собранного format_description.
+    Если описание собрано не нами, оно целиком считается комментарием из БД.
+    """
+    if not description:
+        return DEFAULT_COMMENT
+    if description.startswith(_DB_HEADER) and _GS_HEADER in description:
+        return description[len(_DB_HEADER):description.index(_GS_HEADER)]
+    return description
+
+
+class DescriptionIndex:
+    """
+    Индекс описаний колонок из google таблицы, строится один раз при создании источника.
+
+    При создании разбираются только имена таблиц: tables_data может быть снимком описаний на mmap
+    (gs_integration.snapshot), и колонки таблицы читаются из него при первом поиске по этой таблице.
+    Описания таблицы лежат в словаре колонок из интернированных строк, одинаковые тексты описаний
+    хранятся в одном экземпляре. Поиск:
+      - сначала по точному имени колонки, затем без учёта регистра;
+      - таблицу можно передать как имя или как FQN (service.db.schema.table) - подходит самый длинный суффикс,
+        который есть в таблице описаний;
+      - для колонок без описания возвращается общий DEFAULT_COMMENT без новых аллокаций.
+    Поиск потокобезопасен: колонки таблицы и кэш разрешения имён таблиц пополняются под блокировкой
+    (таблицы обрабатываются параллельно при ingestionThreads), готовые словари не меняются.
+    """
+
+    def __init__(self, tables_data: Mapping[str, Mapping[str, str]]):
+        self._tables_data = tables_data
+        self._tables_casefold: dict[str, str] = {}
+        # Описания загруженных таблиц: (по точному имени колонки, по имени без учёта регистра)
+        self._columns: dict[str, tuple[dict[str, str], dict[str, str]]] = {}
+        # Кэш разрешения имени таблицы из запроса в ключ индекса (None - таблицы нет в описаниях)
+        self._table_aliases: dict[str, Optional[str]] = {}
+        self._texts: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        for table in tables_data:
+            table_key = sys.intern(str(table))
+            self._tables_casefold.setdefault(table_key.casefold(), table_key)
+
+    def __len__(self) -> int:
+        return len(self._tables_casefold)
+
+    def lookup(self, table: str, column: str) -> str:
+        """
+        Возвращает описание колонки или DEFAULT_COMMENT, если описания нет.
+
+        Args:
+            table: Имя таблицы или её FQN.
+            column: Имя колонки.
+        """
+        table_key = self._resolve_table(table)
+        if table_key is None:
+            return DEFAULT_COMMENT
+
+        descriptions, descriptions_casefold = self._table_columns(table_key)
+        description = descriptions.get(column)
+        if description is None:
+            description = descriptions_casefold.get(column.casefold(), DEFAULT_COMMENT)
+        return description
+
+    def memory_footprint(self) -> int:
+        """
+        Примерный объём памяти, занятый индексом, в байтах: словари, ключи и уникальные строки
+        загруженных к этому моменту таблиц.
+        """
+        with self._lock:
+            columns = dict(self._columns)
+            table_aliases = dict(self._table_aliases)
+        strings = {}
+        size = sys.getsizeof(columns)
+        for table, mappings in columns.items():
+            strings[id(table)] = table
+            for mapping in mappings:
+                size += sys.getsizeof(mapping)
+                for column, description in mapping.items():
+                    strings[id(column)] = column
+                    strings[id(description)] = description
+        for mapping in (self._tables_casefold, table_aliases):
+            size += sys.getsizeof(mapping)
+            for key, value in mapping.items():
+                strings[id(key)] = key
+                if value is not None:
+                    strings[id(value)] = value
+        return size + sum(sys.getsizeof(string) for string in strings.values())
+
+    def _table_columns(self, table_key: str) -> tuple[dict[str, str], dict[str, str]]:
+        columns = self._columns.get(table_key)
+        if columns is not None:
+            return columns
+
+        with self._lock:
+            columns = self._columns.get(table_key)
+            if columns is None:
+                descriptions: dict[str, str] = {}
+                descriptions_casefold: dict[str, str] = {}
+                for column, description in self._tables_data[table_key].items():
+                    if description in ('', None):
+                        continue
+                    column_key = sys.intern(str(column))
+                    description = str(description)
+                    description = self._texts.setdefault(description, description)
+                    descriptions[column_key] = description
+                    descriptions_casefold.setdefault(sys.intern(column_key.casefold()), description)
+                columns = self._columns[table_key] = (descriptions, descriptions_casefold)
+            return columns
+
+    def _resolve_table(self, table: str) -> Optional[str]:
+        try:
+            return self._table_aliases[table]
+        except KeyError:
+            pass
+
+        # service.db.schema.table -> db.schema.table -> schema.table -> table
+        table_key = None
+        parts = table.split('.')
+        for start in range(len(parts)):
+            table_key = self._tables_casefold.get('.'.join(parts[start:]).casefold())
+            if table_key is not None:
+                break
+        with self._lock:
+            return self._table_aliases.setdefault(table, table_key)
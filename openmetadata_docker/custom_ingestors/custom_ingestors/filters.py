@@ -0,0 +1,110 @@
+import re
+from typing import Any, Iterable, Optional
+
+# Обратные ссылки по номеру ломаются, если склеить шаблоны в одно регулярное выражение
+_BACKREFERENCE_RE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+class CompiledPattern:
+    """
+    Фильтр одного уровня (база, схема или таблица) с заранее скомпилированными шаблонами.
+
+    Шаблоны includes и excludes склеиваются в одно регулярное выражение-альтернативу на список, поэтому
+    проверка имени - один вызов match вместо цикла по шаблонам. Семантика та же, что у фильтров OpenMetadata
+    (metadata.utils.filters): re.match без учёта регистра, если заданы includes - excludes не учитываются.
+    """
+
+    def __init__(self, includes: Optional[Iterable[str]] = None, excludes: Optional[Iterable[str]] = None):
+        self.includes = list(includes or [])
+        self.excludes = list(excludes or [])
+        self._includes = self._compile(self.includes)
+        self._excludes = self._compile(self.excludes)
+
+    @classmethod
+    def from_pattern(cls, pattern: Any) -> 'CompiledPattern':
+        """
+        Args:
+            pattern: FilterPattern OpenMetadata, словарь {"includes": [...], "excludes": [...]} или None.
+        """
+        if pattern is None:
+            return cls()
+        if isinstance(pattern, dict):
+            return cls(pattern.get('includes'), pattern.get('excludes'))
+        return cls(getattr(pattern, 'includes', None), getattr(pattern, 'excludes', None))
+
+    def __bool__(self) -> bool:
+        return bool(self.includes or self.excludes)
+
+    def is_filtered(self, name: str) -> bool:
+        """
+        True, если имя отфильтровано и объект нужно пропустить.
+        """
+        if self._includes is not None:
+            return not self._match(self._includes, name)
+        if self._excludes is not None:
+            return self._match(self._excludes, name)
+        return False
+
+    @staticmethod
+    def _compile(patterns: list[str]) -> Optional[list[re.Pattern]]:
+        if not patterns:
+            return None
+        if not any(_BACKREFERENCE_RE.search(pattern) for pattern in patterns):
+            try:
+                return [re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)]
+            except re.error:
+                # Например, глобальный флаг (?i) не в начале выражения - проверяем шаблоны по одному
+                pass
+        return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+    @staticmethod
+    def _match(compiled: list[re.Pattern], name: str) -> bool:
+        return any(pattern.match(name) for pattern in compiled)
+
+
+class FilterSet:
+    """
+    Скомпилированные фильтры баз, схем и таблиц сервиса.
+
+    С use_fqn шаблоны проверяются по FQN (service.database.schema.table), как при useFqnForFiltering
+    (CLICKHOUSE_USE_FQN_FILTERS), иначе - по имени объекта.
+    """
+
+    def __init__(
+        self,
+        database: Optional[CompiledPattern] = None,
+        schema: Optional[CompiledPattern] = None,
+        table: Optional[CompiledPattern] = None,
+        use_fqn: bool = False,
+    ):
+        self.database = database or CompiledPattern()
+        self.schema = schema or CompiledPattern()
+        self.table = table or CompiledPattern()
+        self.use_fqn = use_fqn
+
+    @classmethod
+    def from_config(cls, config: Any, use_fqn: Optional[bool] = None) -> 'FilterSet':
+        """
+        Args:
+            config: sourceConfig пайплайна (объект или словарь) с databaseFilterPattern, schemaFilterPattern,
+                tableFilterPattern и useFqnForFiltering.
+            use_fqn: Переопределяет useFqnForFiltering из config.
+        """
+        def get(key):
+            return config.get(key) if isinstance(config, dict) else getattr(config, key, None)
+
+        return cls(
+            database=CompiledPattern.from_pattern(get('databaseFilterPattern')),
+            schema=CompiledPattern.from_pattern(get('schemaFilterPattern')),
+            table=CompiledPattern.from_pattern(get('tableFilterPattern')),
+            use_fqn=bool(get('useFqnForFiltering')) if use_fqn is None else use_fqn,
+        )
+
+    def filter_database(self, service: str, database: str) -> bool:
+        return self.database.is_filtered(f'{service}.{database}' if self.use_fqn else database)
+
+    def filter_schema(self, service: str, database: str, schema: str) -> bool:
+        return self.schema.is_filtered(f'{service}.{database}.{schema}' if self.use_fqn else schema)
+
+    def filter_table(self, service: str, database: str, schema: str, table: str) -> bool:
+        return self.table.is_filtered(f'{service}.{database}.{schema}.{table}' if self.use_fqn else table)
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+
+class SheetsCache:
+    """
+    Локальный кэш содержимого google таблицы на диске.
+
+    Каждая запись - json-файл в cache_dir, ключ записи строится из ID таблицы и метаданных файла из Google Drive
+    (modifiedTime и version). Пока таблица не менялась, данные отдаются с диска без обращения к Sheets API.
+    Записи вытесняются по TTL и по суммарному размеру каталога (сначала самые старые).
+
+    Настройки по умолчанию берутся из переменных окружения:
+      - GS_CACHE_DIR - каталог кэша, по умолчанию /tmp/gs_cache. В docker-compose каталог вынесен на отдельный
+        volume ingestion-volume-gs-cache, иначе кэш пропадает при пересоздании контейнера;
+      - GS_CACHE_TTL_SECONDS - время жизни записи, по умолчанию 7 дней;
+      - GS_CACHE_MAX_SIZE_MB - максимальный размер каталога, по умолчанию 100 Мб.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        max_size_bytes: Optional[int] = None,
+    ):
+        self.cache_dir = Path(cache_dir or os.environ.get('GS_CACHE_DIR', '/tmp/gs_cache'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(
+            os.environ.get('GS_CACHE_TTL_SECONDS', 7 * 24 * 60 * 60)
+        )
+        self.max_size_bytes = max_size_bytes if max_size_bytes is not None else int(
+            os.environ.get('GS_CACHE_MAX_SIZE_MB', 100)
+        ) * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        Счётчики попаданий и промахов кэша за время жизни объекта.
+        """
+        return {'hits': self.hits, 'misses': self.misses}
+
+    @staticmethod
+    def build_key(spreadsheet_id: str, file_info: dict[str, Any]) -> str:
+        """
+        Строит ключ записи из ID таблицы и ревизии файла в Google Drive.
+        """
+        revision = f"{file_info.get('modifiedTime', '')}:{file_info.get('version', '')}"
+        return f"{spreadsheet_id}-{hashlib.sha1(revision.encode('utf-8')).hexdigest()}"
+
+    def get(self, spreadsheet_id: str, file_info: Optional[dict[str, Any]]) -> Optional[dict[str, Any]]:
+        """
+        Возвращает закэшированные данные для текущей ревизии таблицы или None.
+
+        Args:
+            spreadsheet_id: ID google таблицы.
+            file_info: Метаданные файла из Google Drive. Если их не удалось получить, кэш не используется.
+        """
+        if not file_info:
+            self.misses += 1
+            return None
+
+        path = self._path(self.build_key(spreadsheet_id, file_info))
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                self.misses += 1
+                return None
+            with open(path, encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def set(self, spreadsheet_id: str, file_info: Optional[dict[str, Any]], data: dict[str, Any]) -> None:
+        """
+        Сохраняет данные для текущей ревизии таблицы. Записи по прошлым ревизиям этой таблицы удаляются.
+        """
+        if not file_info:
+            return
+
+        key = self.build_key(spreadsheet_id, file_info)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for stale_path in self.cache_dir.glob(f'{spreadsheet_id}-*.json'):
+                if stale_path.stem != key:
+                    stale_path.unlink(missing_ok=True)
+
+            # Пишем во временный файл и подменяем, чтобы параллельный запуск не прочитал половину записи
+            path = self._path(key)
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(data, cache_file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f'Не удалось сохранить кэш таблицы {spreadsheet_id}: {e}')
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Удаляет просроченные записи, затем самые старые, пока каталог не уложится в max_size_bytes.
+        """
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= self.max_size_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}.json'
+
+
+class SheetFingerprints:
+    """
+    Отпечатки листов google таблицы с прошлой синхронизации: ID обработанной ревизии файла в Google Drive,
+    хеш содержимого каждого листа и листы этой ревизии, изменения которых применить не удалось (pending).
+    Хранятся в json-файле в каталоге кэша и не вытесняются вместе с ним, у каждого потребителя изменений
+    (consumer) свой файл.
+    """
+
+    def __init__(self, spreadsheet_id: str, cache_dir: Optional[str] = None, consumer: Optional[str] = None):
+        cache_dir = Path(cache_dir or os.environ.get('GS_CACHE_DIR', '/tmp/gs_cache'))
+        self.path = cache_dir / (f'{spreadsheet_id}.{consumer}.fingerprints' if consumer else f'{spreadsheet_id}.fingerprints')
+        self.revision_id: Optional[str] = None
+        self.sheets: dict[str, str] = {}
+        self.pending: set[str] = set()
+        self._load()
+
+    @staticmethod
+    def hash_content(content: Any) -> str:
+        """
+        Стабильный хеш содержимого листа.
+        """
+        serialized = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+    def changed(self, contents: dict[str, Any]) -> set[str]:
+        """
+        Возвращает листы, содержимое которых отличается от сохранённого, а также удалённые листы.
+
+        Args:
+            contents: Текущее содержимое листов {название листа: данные}.
+        """
+        changed_sheets = {
+            sheet_name for sheet_name, content in contents.items()
+            if self.sheets.get(sheet_name) != self.hash_content(content)
+        }
+        return changed_sheets | (self.sheets.keys() - contents.keys())
+
+    def save(self, revision_id: Optional[str], contents: dict[str, Any], pending: Iterable[str] = ()) -> None:
+        """
+        Запоминает ревизию файла и хеши листов как обработанные.
+
+        Args:
+            pending: Листы, изменения которых применить не удалось. Ревизия всё равно считается обработанной,
+                а эти листы повторяются отдельно, без чтения остальной книги.
+        """
+        self.revision_id = revision_id
+        self.sheets = {sheet_name: self.hash_content(content) for sheet_name, content in contents.items()}
+        self.pending = set(pending)
+        self._write()
+
+    def save_pending(self, contents: dict[str, Any], pending: Iterable[str] = ()) -> None:
+        """
+        Запоминает результат повтора отложенных листов: их хеши берутся из contents (лист, которого там нет,
+        удалён из таблицы и забывается), в отложенных остаются только pending. Ревизия файла не меняется.
+        """
+        for sheet_name in self.pending:
+            if sheet_name in contents:
+                self.sheets[sheet_name] = self.hash_content(contents[sheet_name])
+            else:
+                self.sheets.pop(sheet_name, None)
+        self.pending = set(pending)
+        self._write()
+
+    def _write(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as fingerprints_file:
+                json.dump(
+                    {'revision_id': self.revision_id, 'sheets': self.sheets, 'pending': sorted(self.pending)},
+                    fingerprints_file,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'Не удалось сохранить отпечатки листов в {self.path}: {e}')
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as fingerprints_file:
+                data = json.load(fingerprints_file)
+        except (OSError, ValueError):
+            return
+        self.revision_id = data.get('revision_id')
+        self.sheets = data.get('sheets', {})
+        self.pending = set(data.get('pending', ()))
@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from ..description_index import DescriptionIndex, extract_base_comment, format_description
+from ..instrumentation import instrument_client, metrics
+from ..om_client import OpenMetadataClient, get_client
+from .main import ClickhouseGSInfo
+from .table_resolver import TableResolver
+
+PATCHED = 'patched'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+MISSING = 'missing'
+
+
+@dataclass
+class SyncReport:
+    patched: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    missing: int = 0
+    errors: dict[str, str] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        return (f'patched: {self.patched}, unchanged: {self.unchanged}, '
+                f'failed: {self.failed}, missing in OpenMetadata: {self.missing}')
+
+
+class DescriptionSync:
+    """
+    Синхронизация описаний колонок из google таблицы в OpenMetadata без запуска ингестии.
+
+    Для каждой таблицы текущие описания колонок в OpenMetadata сравниваются с описаниями из GS и отправляется
+    только JSON Patch с изменившимися колонками. Таблицы обрабатываются параллельно пулом из max_workers потоков.
+    Описание собирается так же, как в ClickhouseCustomIngestor: комментарий из БД сохраняется, меняется часть из GS.
+    """
+
+    def __init__(
+        self,
+        gs_info: ClickhouseGSInfo,
+        client: OpenMetadataClient,
+        service_name: str,
+        database_name: str,
+        schema_name: str,
+        max_workers: int = 8,
+    ):
+        self.gs_info = gs_info
+        self.client = client
+        self.resolver = TableResolver(client)
+        self.schema_fqn = f'{service_name}.{database_name}.{schema_name}'
+        self.max_workers = max_workers
+
+    def run(self, only_changed: bool = True) -> SyncReport:
+        """
+        Args:
+            only_changed: Синхронизировать только листы, изменившиеся с прошлой успешной синхронизации.
+        """
+        if only_changed:
+            tables_data = self.gs_info.get_changed_tables_info()
+        else:
+            tables_data = self.gs_info.get_info_about_tables_in_gs()
+        description_index = DescriptionIndex(tables_data)
+
+        report = SyncReport()
+        failed_tables = []
+        if tables_data:
+            # Все таблицы схемы вместе с колонками забираются несколькими постраничными запросами
+            self.resolver.load_schema(self.schema_fqn)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            tables = sorted(tables_data)
+            results = executor.map(lambda table: self._sync_table(table, description_index), tables)
+            for table_name, (result, error) in zip(tables, results):
+                setattr(report, result, getattr(report, result) + 1)
+                if error:
+                    report.errors[table_name] = error
+                if result == FAILED:
+                    failed_tables.append(table_name)
+
+        # Упавшие листы откладываются и повторяются без чтения остальной книги. Таблицы, которых ещё нет
+        # в OpenMetadata, считаются обработанными: описания им проставит ингестия, когда их создаст
+        self.gs_info.commit_fingerprints(failed_tables)
+        return report
+
+    def _sync_table(self, table_name: str, description_index: DescriptionIndex) -> tuple[str, Optional[str]]:
+        try:
+            table = self.resolver.get(f'{self.schema_fqn}.{table_name}')
+            if table is None:
+                return MISSING, None
+
+            operations = self.build_patch(table, description_index)
+            if not operations:
+                return UNCHANGED, None
+
+            response = self.client.patch(
+                f"/api/v1/tables/{table['id']}",
+                data=json.dumps(operations),
+                headers={'Content-Type': 'application/json-patch+json'},
+            )
+            response.raise_for_status()
+            return PATCHED, None
+        except Exception as e:
+            return FAILED, str(e)
+
+    @staticmethod
+    def build_patch(table: dict[str, Any], description_index: DescriptionIndex) -> list[dict[str, Any]]:
+        """
+        Строит минимальный JSON Patch: операции только для колонок, у которых поменялось описание.
+        """
+        operations = []
+        for position, column in enumerate(table.get('columns') or []):
+            current = column.get('description')
+            gs_comment = description_index.lookup(table['name'], column['name'])
+            desired = format_description(extract_base_comment(current), gs_comment)
+            if current == desired:
+                continue
+            operations.append({
+                'op': 'replace' if current is not None else 'add',
+                'path': f'/columns/{position}/description',
+                'value': desired,
+            })
+        return operations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Синхронизация описаний колонок из google таблицы в OpenMetadata')
+    parser.add_argument('--file-id', default='1W_WLS0chOvaxl_Cejt8pgF6cnUm8-4QkUdlYWPn1KGA')
+    parser.add_argument('--service', required=True, help='Имя сервиса ClickHouse в OpenMetadata')
+    parser.add_argument('--database', default='default', help='База данных сервиса в OpenMetadata')
+    parser.add_argument('--schema', required=True, help='Схема (база ClickHouse) в OpenMetadata')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--all', action='store_true', help='Синхронизировать все листы, а не только изменившиеся')
+    args = parser.parse_args()
+
+    client = get_client(
+        os.environ.get('OPENMETADATA_HOST_PORT', 'http://localhost:8585'),
+        os.environ.get('OPENMETADATA_API_TOKEN', ''),
+    )
+    instrument_client(client)
+    sync = DescriptionSync(ClickhouseGSInfo(args.file_id), client, args.service, args.database, args.schema, args.workers)
+    report = sync.run(only_changed=not args.all)
+    print(report)
+    for table_name, error in report.errors.items():
+        print(f'{table_name}: {error}')
+    client.print_metrics()
+    for line in metrics.summary():
+        print(line)
+    metrics.export_textfile()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,32 @@
 import datetime
-from typing import Optional
-
-import pandas as pd
-from googleapiclient.discovery import build
+from itertools import islice, zip_longest
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Sequence, Union
+from urllib.parse import quote
 
+from ..instrumentation import timed_execute
 from .google_api import BaseGoogleApi
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class GoogleSheetsCollector(BaseGoogleApi):
+    # Ограничения на один запрос values.batchGet: диапазоны передаются в query string GET-запроса,
+    # поэтому режем их и по количеству, и по суммарной длине URL.
+    BATCH_MAX_RANGES = 100
+    BATCH_MAX_URL_LENGTH = 8000
+    # Сколько строк листа запрашивать за раз при постраничном чтении
+    ROWS_PAGE_SIZE = 5000
+    # Маска полей spreadsheets.get: без неё приходят все свойства листов, именованные диапазоны, форматирование и т.д.
+    SPREADSHEET_INFO_FIELDS = "properties/title,sheets/properties(sheetId,title,index,gridProperties(rowCount,columnCount))"
+    # Значения без форматирования (короче форматированных строк), даты - строками, как они видны в таблице.
+    # В ответе оставляем только сами значения, без эха диапазона и majorDimension.
+    VALUES_OPTIONS = {
+        'majorDimension': 'ROWS',
+        'valueRenderOption': 'UNFORMATTED_VALUE',
+        'dateTimeRenderOption': 'FORMATTED_STRING',
+    }
+
     def __init__(self, google_sheet_id):
         """
         Args:
@@ -18,6 +37,8 @@ class GoogleSheetsCollector(BaseGoogleApi):
         self.service = self.authenticate()
         self._existing_sheets = None
         self._spreadsheet_info = None
+        self._file_info = None
+        self._latest_revision_id = None
 
     def authenticate(self):
         """
@@ -25,31 +46,40 @@ class GoogleSheetsCollector(BaseGoogleApi):
 
         Returns: Сервис для работы с Google Sheets API.
         """
-        creds = self.get_credentials()
-        return build('sheets', 'v4',  credentials=creds)
+        return self.get_service('sheets', 'v4')
 
     def get_spreadsheet_info(self) -> dict:
         """
-        Получает полную информацию о таблице.
+        Получает информацию о таблице: название и свойства листов (название, id, размеры).
+        Запрашиваются только эти поля, результат кэшируется - список листов и их размеры берутся отсюда же.
         """
         if self._spreadsheet_info is None:
-            self._spreadsheet_info = self.service.spreadsheets().get(
+            self._spreadsheet_info = timed_execute(self.service.spreadsheets().get(
                 spreadsheetId=self.google_sheet_id,
-                fields="properties,sheets.properties,revisionId"
-            ).execute()
+                fields=self.SPREADSHEET_INFO_FIELDS,
+            ), 'sheets.get')
         return self._spreadsheet_info
 
+    def get_file_info(self) -> dict:
+        """
+        Получает метаданные файла из Google Drive: время последнего изменения и версию.
+        Результат кэшируется, поэтому за запуск делается один запрос.
+        """
+        if self._file_info is None:
+            drive_service = self.get_service('drive', 'v3')
+            self._file_info = timed_execute(drive_service.files().get(
+                fileId=self.google_sheet_id,
+                fields="modifiedTime,version"
+            ), 'drive.files.get')
+        return self._file_info
+
     def get_last_modified_time(self) -> Optional[datetime.datetime]:
         """
         Возвращает время последнего изменения файла.
         """
         try:
             # Получаем информацию о драйве (через Google Drive API)
-            drive_service = build('drive', 'v3', credentials=self.get_credentials())
-            file_info = drive_service.files().get(
-                fileId=self.google_sheet_id,
-                fields="modifiedTime"
-            ).execute()
+            file_info = self.get_file_info()
 
             modified_time_str = file_info.get('modifiedTime')
             if modified_time_str:
@@ -59,21 +89,20 @@ class GoogleSheetsCollector(BaseGoogleApi):
 
         return None
 
-    def get_revision_history(self) -> list[dict]:
+    def get_latest_revision_id(self) -> Optional[str]:
         """
-        Получает историю ревизий файла через Google Drive API.
+        Возвращает идентификатор текущей версии файла - поле version из метаданных Drive, которое растёт
+        при каждом изменении файла. Берётся из закэшированного get_file_info, отдельного запроса
+        к Drive не делается.
         """
-        try:
-            drive_service = build('drive', 'v3', credentials=self.get_credentials())
-            revisions = drive_service.revisions().list(
-                fileId=self.google_sheet_id,
-                fields="revisions(id, modifiedTime, lastModifyingUser)"
-            ).execute()
-
-            return revisions.get('revisions', [])
-        except Exception as e:
-            print(f"Ошибка при получении истории ревизий: {e}")
-            return []
+        if self._latest_revision_id is None:
+            try:
+                version = self.get_file_info().get('version')
+            except Exception as e:
+                print(f"Ошибка при получении версии файла: {e}")
+                return None
+            self._latest_revision_id = str(version) if version is not None else None
+        return self._latest_revision_id
 
     @property
     def existing_sheets(self):
@@ -94,9 +123,37 @@ class GoogleSheetsCollector(BaseGoogleApi):
             raise ValueError("existing_sheets должно быть списком.")
         self._existing_sheets = value
 
-    def get_data_from_original_source(self, list_name: str, *args, **kwargs) -> pd.DataFrame:
+    def get_data_from_original_source(
+        self, list_name: str, *args, as_dataframe: bool = False, page_size: Optional[int] = None, **kwargs
+    ) -> Union[list[dict[str, Any]], Iterator[dict[str, Any]], 'pd.DataFrame']:
         """
-        Функция идёт в переданный лист текущей таблицы, возвращает Pandas data frame с данными.
+        Функция идёт в переданный лист текущей таблицы, возвращает строки листа в виде словарей {заголовок: значение}.
+        С as_dataframe=True возвращает Pandas data frame.
+        С page_size лист читается окнами по page_size строк (iter_paged_records) - для очень длинных листов,
+        которые не укладываются в таймаут одного запроса. Тогда строки отдаются итератором по мере чтения окон,
+        а не списком, чтобы лист целиком не держался в памяти.
+        """
+        if page_size:
+            records = self.iter_paged_records(list_name, page_size)
+            if as_dataframe:
+                import pandas as pd
+
+                return pd.DataFrame.from_records(records)
+            return records
+
+        values = self.get_values(list_name)
+        if as_dataframe:
+            return self._values_to_dataframe(values)
+        return list(self.iter_records(values))
+
+    def get_values(self, list_name: str, http=None) -> list[list]:
+        """
+        Возвращает сырые значения переданного листа текущей таблицы (список строк).
+
+        Args:
+            list_name: Название листа.
+            http: HTTP-транспорт для запроса. Нужен, если метод вызывается из нескольких потоков,
+                так как общий транспорт клиента не потокобезопасен.
         """
         if not list_name:
             raise ValueError("Missing required argument list_name.")
@@ -106,8 +163,290 @@ class GoogleSheetsCollector(BaseGoogleApi):
             raise KeyError(f'Лист {list_name} не найден в таблице {self.google_sheet_id}')
 
         # Получаем данные из переданного листа
-        data_from_given_list = self.service.spreadsheets().values().get(spreadsheetId=self.google_sheet_id, range=list_name).execute()
-        values = data_from_given_list.get('values', [])
+        data_from_given_list = timed_execute(self.service.spreadsheets().values().get(
+            spreadsheetId=self.google_sheet_id, range=self._quote_sheet_name(list_name), fields='values',
+            **self.VALUES_OPTIONS,
+        ), 'sheets.values.get', http=http)
+        return self._normalize_values(data_from_given_list.get('values', []))
+
+    def get_sheet_properties(self, list_name: str) -> dict:
+        """
+        Свойства листа из закэшированной информации о таблице, включая gridProperties (rowCount, columnCount).
+        """
+        for sheet in self.get_spreadsheet_info().get('sheets', []):
+            if sheet['properties']['title'] == list_name:
+                return sheet['properties']
+        raise KeyError(f'Лист {list_name} не найден в таблице {self.google_sheet_id}')
+
+    def needs_paging(self, list_name: str) -> bool:
+        """
+        Лист длиннее ROWS_PAGE_SIZE строк (по gridProperties.rowCount), его читают окнами через iter_values.
+        """
+        row_count = self.get_sheet_properties(list_name).get('gridProperties', {}).get('rowCount')
+        return row_count is not None and row_count > self.ROWS_PAGE_SIZE
+
+    def iter_values(
+        self,
+        list_name: str,
+        page_size: Optional[int] = None,
+        http=None,
+        run_request: Optional[Callable[[Callable[[], dict]], dict]] = None,
+    ) -> Iterator[list]:
+        """
+        Построчно отдаёт сырые значения листа, запрашивая их окнами по page_size строк (A1-диапазоны 'Лист'!1:5000).
+        В памяти одновременно держится не больше одного окна, поэтому длина листа не ограничена.
+        Граница листа берётся из gridProperties.rowCount. Пустые строки в середине листа отдаются пустыми
+        списками, хвостовые пустые строки не отдаются - как и при чтении листа целиком.
+
+        Args:
+            list_name: Название листа.
+            page_size: Размер окна в строках, по умолчанию ROWS_PAGE_SIZE.
+            http: HTTP-транспорт для запросов (см. get_values).
+            run_request: Чем выполнять запрос каждого окна, например с ограничением частоты и повторами
+                (ConcurrentSheetsLoader.run_request). По умолчанию запрос выполняется сразу.
+        """
+        if list_name not in self.existing_sheets:
+            raise KeyError(f'Лист {list_name} не найден в таблице {self.google_sheet_id}')
+
+        page_size = page_size or self.ROWS_PAGE_SIZE
+        row_count = self.get_sheet_properties(list_name).get('gridProperties', {}).get('rowCount')
+        quoted_name = self._quote_sheet_name(list_name)
+        start, blank_rows = 1, 0
+        while row_count is None or start <= row_count:
+            end = start + page_size - 1 if row_count is None else min(start + page_size - 1, row_count)
+            window_range = f'{quoted_name}!{start}:{end}'
+
+            def fetch_window() -> dict:
+                return timed_execute(self.service.spreadsheets().values().get(
+                    spreadsheetId=self.google_sheet_id, range=window_range,
+                    fields='values', **self.VALUES_OPTIONS,
+                ), 'sheets.values.get', http=http)
+
+            response = run_request(fetch_window) if run_request else fetch_window()
+            rows = self._normalize_values(response.get('values', []))
+            if not rows and row_count is None:
+                return
+            if rows:
+                # API обрезает пустые строки в конце окна; если дальше есть данные, это пустые строки листа
+                for _ in range(blank_rows):
+                    yield []
+                blank_rows = 0
+                yield from rows
+            blank_rows += end - start + 1 - len(rows)
+            start = end + 1
+
+    def iter_paged_records(self, list_name: str, page_size: Optional[int] = None) -> Iterator[dict[str, Any]]:
+        """
+        Построчно отдаёт строки листа в виде словарей {заголовок: значение}, читая лист окнами (см. iter_values).
+        Короткие строки дополняются пустыми значениями, ячейки за пределами заголовка получают
+        имена Column_<номер>, как в iter_records.
+        """
+        rows = self.iter_values(list_name, page_size)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        header = list(header)
+        for row in rows:
+            if len(row) > len(header):
+                header += [f"Column_{i}" for i in range(len(header), len(row))]
+            yield dict(zip(header, row + [''] * (len(header) - len(row))))
+
+    def get_data_from_many_sources(
+        self, list_names: Iterable[str], as_dataframe: bool = False
+    ) -> dict[str, Union[list[dict[str, Any]], 'pd.DataFrame']]:
+        """
+        Забирает данные сразу из нескольких листов текущей таблицы через values.batchGet.
+
+        Args:
+            list_names: Названия листов.
+            as_dataframe: Вернуть данные листов в виде Pandas data frame.
+
+        Returns:
+            Словарь {название листа: строки листа в виде словарей или Pandas data frame}.
+        """
+        convert = self._values_to_dataframe if as_dataframe else lambda values: list(self.iter_records(values))
+        return {
+            list_name: convert(values)
+            for list_name, values in self.get_values_from_many_sources(list_names).items()
+        }
+
+    def get_values_from_many_sources(self, list_names: Iterable[str]) -> dict[str, list[list]]:
+        """
+        Забирает сырые значения сразу из нескольких листов текущей таблицы через values.batchGet.
+        Листы запрашиваются пачками, чтобы не упереться в ограничения на размер запроса.
+
+        Args:
+            list_names: Названия листов.
+
+        Returns:
+            Словарь {название листа: список строк}.
+        """
+        list_names = list(dict.fromkeys(list_names))  # убираем дубли, сохраняя порядок
+        self._check_sheets_exist(list_names)
+        return self._batch_get({list_name: self._quote_sheet_name(list_name) for list_name in list_names})
+
+    def get_columns_from_many_sources(self, columns_by_sheet: dict[str, Sequence[str]]) -> dict[str, list[list]]:
+        """
+        Забирает из нескольких листов только нужные колонки, а не листы целиком: одним batchGet - заголовки
+        (первые строки) листов, вторым - сами колонки по A1-диапазонам вида 'Лист'!C2:C.
+
+        Args:
+            columns_by_sheet: {название листа: названия колонок из заголовка}.
+
+        Returns:
+            Сырые значения в том же виде, что и get_values_from_many_sources: первая строка - заголовок из
+            найденных колонок в запрошенном порядке, дальше строки. Колонок, которых нет в заголовке листа,
+            в результате нет, iter_columns сообщит о них KeyError. Для пустого листа - пустой список.
+        """
+        self._check_sheets_exist(columns_by_sheet)
+        headers = self._batch_get({
+            list_name: f'{self._quote_sheet_name(list_name)}!1:1' for list_name in columns_by_sheet
+        })
+
+        found_columns: dict[str, list[str]] = {}
+        column_ranges: dict[tuple[str, str], str] = {}
+        for list_name, columns in columns_by_sheet.items():
+            header = headers[list_name][0] if headers[list_name] else []
+            found_columns[list_name] = [column for column in dict.fromkeys(columns) if column in header]
+            for column in found_columns[list_name]:
+                letter = self._column_letter(header.index(column))
+                column_ranges[(list_name, column)] = f'{self._quote_sheet_name(list_name)}!{letter}2:{letter}'
+        values = self._batch_get(column_ranges, major_dimension='COLUMNS')
+
+        result = {}
+        for list_name, columns in found_columns.items():
+            if not headers[list_name]:
+                result[list_name] = []
+                continue
+            column_values = [values[(list_name, column)][0] if values[(list_name, column)] else [] for column in columns]
+            result[list_name] = [columns, *(list(row) for row in zip_longest(*column_values, fillvalue=''))]
+        return result
+
+    def _batch_get(self, ranges: dict[Any, str], major_dimension: str = 'ROWS') -> dict[Any, list[list]]:
+        """
+        Читает A1-диапазоны через values.batchGet пачками, укладывающимися в ограничения на размер запроса.
+
+        Args:
+            ranges: {ключ: A1-диапазон}.
+            major_dimension: ROWS - значения построчно, COLUMNS - по колонкам.
+
+        Returns:
+            {ключ: значения диапазона}.
+        """
+        result = {}
+        for chunk in self._chunk_ranges(list(ranges.items())):
+            response = timed_execute(self.service.spreadsheets().values().batchGet(
+                spreadsheetId=self.google_sheet_id,
+                ranges=[a1_range for _, a1_range in chunk],
+                fields='valueRanges/values',
+                **{**self.VALUES_OPTIONS, 'majorDimension': major_dimension},
+            ), 'sheets.values.batchGet')
+            # valueRanges возвращаются в том же порядке, в котором были переданы диапазоны
+            for (key, _), value_range in zip(chunk, response.get('valueRanges', [])):
+                result[key] = self._normalize_values(value_range.get('values', []))
+        return result
+
+    def _check_sheets_exist(self, list_names: Iterable[str]) -> None:
+        missing_sheets = [list_name for list_name in list_names if list_name not in self.existing_sheets]
+        if missing_sheets:
+            raise KeyError(f'Листы {missing_sheets} не найдены в таблице {self.google_sheet_id}')
+
+    @staticmethod
+    def iter_columns(values: Iterable[list], *columns: str) -> Iterator[tuple]:
+        """
+        Построчно отдаёт значения выбранных колонок листа, не строя промежуточных структур.
+        Строки можно передать генератором, например из iter_values.
+        Индексы колонок ищутся по заголовку (первая строка) один раз, недостающие ячейки в коротких строках
+        считаются пустыми.
+
+        Args:
+            values: Сырые значения листа (первая строка - заголовок).
+            columns: Названия колонок из заголовка.
+
+        Raises:
+            KeyError: В заголовке листа нет какой-то из колонок.
+        """
+        rows = iter(values)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        missing_columns = [column for column in columns if column not in header]
+        if missing_columns:
+            raise KeyError(f'На листе отсутствуют колонки {missing_columns}')
+
+        indexes = [header.index(column) for column in columns]
+        for row in rows:
+            row_length = len(row)
+            yield tuple(row[index] if index < row_length else '' for index in indexes)
+
+    @staticmethod
+    def iter_records(values: list[list]) -> Iterator[dict[str, Any]]:
+        """
+        Построчно отдаёт строки листа в виде словарей {заголовок: значение}.
+        Колонки без заголовка получают имена Column_<номер>, как и в Pandas data frame.
+        """
+        if not values:
+            return
+
+        max_columns = max(len(row) for row in values)
+        header = list(values[0]) + [f"Column_{i}" for i in range(len(values[0]), max_columns)]
+        for row in islice(values, 1, None):
+            yield dict(zip(header, row + [''] * (max_columns - len(row))))
+
+    @staticmethod
+    def _normalize_values(values: list[list]) -> list[list[str]]:
+        """
+        Приводит неформатированные значения (числа, булевы) к строкам, как они выглядели бы в таблице:
+        1.0 -> '1', True -> 'TRUE'. Строки не копируются, если в них только строки.
+        """
+        for row_index, row in enumerate(values):
+            if any(not isinstance(value, str) for value in row):
+                values[row_index] = [_value_to_str(value) for value in row]
+        return values
+
+    def _chunk_ranges(self, ranges: list[tuple[Any, str]]) -> Iterator[list[tuple[Any, str]]]:
+        """
+        Делит диапазоны (ключ, A1-диапазон) на пачки, укладывающиеся в BATCH_MAX_RANGES и BATCH_MAX_URL_LENGTH.
+        """
+        chunk, chunk_length = [], 0
+        for key, a1_range in ranges:
+            range_length = len('&ranges=') + len(quote(a1_range, safe=''))
+            if chunk and (len(chunk) >= self.BATCH_MAX_RANGES or chunk_length + range_length > self.BATCH_MAX_URL_LENGTH):
+                yield chunk
+                chunk, chunk_length = [], 0
+            chunk.append((key, a1_range))
+            chunk_length += range_length
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _column_letter(index: int) -> str:
+        """
+        Буквенное обозначение колонки в A1-нотации по индексу с нуля: 0 -> A, 26 -> AA.
+        """
+        letters = ''
+        index += 1
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(ord('A') + remainder) + letters
+        return letters
+
+    @staticmethod
+    def _quote_sheet_name(list_name: str) -> str:
+        """
+        Экранирует название листа для A1-нотации: 'Лист с пробелами', апострофы удваиваются.
+        """
+        return "'" + list_name.replace("'", "''") + "'"
+
+    @staticmethod
+    def _values_to_dataframe(values: list[list]) -> 'pd.DataFrame':
+        """
+        Превращает сырые значения листа (первая строка - заголовок) в Pandas data frame.
+        """
+        import pandas as pd  # pandas нужен только в этом режиме, не тратим время на импорт при старте
+
         if not values:
             return pd.DataFrame()  # Пустой DataFrame, если нет значений
 
@@ -126,8 +465,16 @@ class GoogleSheetsCollector(BaseGoogleApi):
 
     def get_sheets_names_from_table(self):
         """
-        Функция возвращает список названий всех листов таблицы.
+        Функция возвращает список названий всех листов таблицы (из закэшированной get_spreadsheet_info).
         """
-        table = self.service.spreadsheets().get(spreadsheetId=self.google_sheet_id).execute()
-        sheets_names = [sheet['properties']['title'] for sheet in table['sheets']]
-        return sheets_names
+        return [sheet['properties']['title'] for sheet in self.get_spreadsheet_info().get('sheets', [])]
+
+
+def _value_to_str(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
@@ -0,0 +1,145 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+
+import google_auth_httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+
+if TYPE_CHECKING:
+    from .gs_collector import GoogleSheetsCollector
+
+# Статусы, при которых Google API имеет смысл повторить запрос
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты запросов по алгоритму token bucket.
+
+    Args:
+        rate_per_minute: Сколько запросов в минуту разрешено в среднем.
+        capacity: Размер корзины - сколько запросов можно сделать подряд без ожидания.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[int] = None):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = capacity or max(1, int(rate_per_minute // 6))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Забирает один токен, при необходимости ждёт его появления.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate_per_second
+            time.sleep(wait_seconds)
+
+
+def call_with_retry(
+    func: Callable[[], Any],
+    max_attempts: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 32.0,
+) -> Any:
+    """
+    Вызывает func, повторяя его с экспоненциальной задержкой и джиттером при ответах 429/5xx от Google API.
+    Если Google прислал заголовок Retry-After, ждём не меньше указанного времени.
+    """
+    for attempt in range(max_attempts):
+        try:
+            return func()
+        except HttpError as e:
+            if e.resp.status not in RETRYABLE_STATUSES or attempt == max_attempts - 1:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) + random.uniform(0, base_delay)
+            retry_after = e.resp.get('retry-after')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            print(f'Google API ответил {e.resp.status}, повтор через {delay:.1f} с')
+            time.sleep(delay)
+
+
+class ConcurrentSheetsLoader:
+    """
+    Загружает листы google таблицы параллельно, по запросу на лист.
+    Используется, когда прочитать книгу через values.batchGet не получается (например, листы слишком большие).
+
+    Количество потоков ограничено max_workers, частота запросов - TokenBucket, настроенным под поминутную квоту
+    Sheets API (по умолчанию 60 запросов на чтение в минуту на пользователя). Настройки по умолчанию
+    берутся из переменных окружения GS_LOADER_WORKERS и GS_REQUESTS_PER_MINUTE.
+    """
+
+    def __init__(
+        self,
+        collector: 'GoogleSheetsCollector',
+        max_workers: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        max_attempts: int = 5,
+    ):
+        self._collector = collector
+        self.max_workers = max_workers or int(os.environ.get('GS_LOADER_WORKERS', 8))
+        self._rate_limiter = TokenBucket(requests_per_minute or float(os.environ.get('GS_REQUESTS_PER_MINUTE', 60)))
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+    def load(self, list_names: Iterable[str]) -> dict[str, Iterable[list]]:
+        """
+        Возвращает сырые значения листов {название листа: строки} в том же порядке, что и list_names.
+        Длинные листы (GoogleSheetsCollector.needs_paging) в пул не попадают: для них возвращается итератор
+        iter_values, который читает лист окнами в потоке вызывающего по мере обхода строк
+        (каждое окно - с тем же ограничением частоты и повторами, см. run_request).
+        """
+        list_names = list(dict.fromkeys(list_names))
+        # Список листов загружаем заранее, чтобы потоки не запрашивали его одновременно
+        self._collector.existing_sheets
+        paged_names = {list_name for list_name in list_names if self._collector.needs_paging(list_name)}
+        pooled_names = [list_name for list_name in list_names if list_name not in paged_names]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            values = dict(zip(pooled_names, executor.map(self._load_one, pooled_names)))
+        return {
+            list_name: self.iter_values(list_name) if list_name in paged_names else values[list_name]
+            for list_name in list_names
+        }
+
+    def iter_values(self, list_name: str) -> Iterable[list]:
+        """
+        Читает длинный лист окнами (GoogleSheetsCollector.iter_values), запрос каждого окна - через run_request.
+        """
+        return self._collector.iter_values(list_name, run_request=self.run_request)
+
+    def run_request(self, request: Callable[[], Any]) -> Any:
+        """
+        Выполняет запрос к Sheets API с ограничением частоты и повторами при 429/5xx.
+        """
+        def fetch():
+            self._rate_limiter.acquire()
+            return request()
+
+        return call_with_retry(fetch, max_attempts=self.max_attempts)
+
+    def _load_one(self, list_name: str) -> list[list]:
+        return self.run_request(lambda: self._collector.get_values(list_name, http=self._get_http()))
+
+    def _get_http(self):
+        """
+        Возвращает HTTP-транспорт текущего потока: httplib2 не потокобезопасен, поэтому у каждого потока свой.
+        """
+        if not hasattr(self._local, 'http'):
+            self._local.http = google_auth_httplib2.AuthorizedHttp(
+                self._collector.get_credentials(), http=build_http()
+            )
+        return self._local.http
@@ -1,10 +1,15 @@
 import datetime
-from typing import Any
+import os
+from typing import Any, Iterable, Optional
 from zoneinfo import ZoneInfo
 
-import requests
+from googleapiclient.errors import HttpError
 
+from ..instrumentation import instrument_client, timed
+from ..om_client import get_client
+from .cache import SheetFingerprints, SheetsCache
 from .gs_collector import GoogleSheetsCollector
+from .loader import ConcurrentSheetsLoader
 
 
 
@@ -13,11 +18,107 @@ class ClickhouseGSInfo:
     MAX_LAST_UPDATE_DAYS = 0
     
     
-    def __init__(self, file_id: str):
+    def __init__(self, file_id: str, cache: Optional[SheetsCache] = None, consumer: Optional[str] = None):
+        """
+        Args:
+            file_id: ID google таблицы.
+            cache: Кэш листов на диске.
+            consumer: Кто применяет изменения листов (description_sync, ingestion). У каждого свои отпечатки,
+                чтобы одни и те же изменения получили все, а не только тот, кто успел первым.
+        """
         self._collector = GoogleSheetsCollector(file_id)
+        self._cache = cache if cache is not None else SheetsCache()
+        self._file_info = self._get_file_info()
+        self._fingerprints = SheetFingerprints(file_id, self._cache.cache_dir, consumer)
 
-        self.tables = self.get_all_tables()
         self.tables_data = {}
+        self._tables: Optional[list[str]] = None
+        self.loaded_from_cache = False
+        self._tables_data_loaded = False
+        # Описания отложенных листов, прочитанные без остальной книги (версия файла уже обработана)
+        self._pending_data: Optional[dict[str, dict[str, str]]] = None
+        cached = self._cache.get(file_id, self._file_info)
+        if cached is not None:
+            # Таблица не менялась с прошлого запуска - список таблиц и описания берём с диска
+            self._tables = cached['tables']
+            self.tables_data = cached['tables_data']
+            self.loaded_from_cache = True
+            self._tables_data_loaded = True
+
+    @property
+    def tables(self) -> list[str]:
+        """
+        Список таблиц с листа "Список таблиц". Читается при первом обращении, чтобы проверка ревизии
+        в get_changed_tables_info обходилась без запросов к Sheets API.
+        """
+        if self._tables is None:
+            self._tables = self.get_all_tables()
+        return self._tables
+
+    @property
+    def cache_stats(self) -> dict[str, int]:
+        return self._cache.stats
+
+    @property
+    def changed_tables(self) -> set[str]:
+        """
+        Листы, описания на которых изменились (или пропали) с последнего commit_fingerprints.
+        """
+        return self._fingerprints.changed(self.tables_data)
+
+    @property
+    def revision_processed(self) -> bool:
+        """
+        Текущая версия файла в Google Drive уже обработана (commit_fingerprints) - листы не менялись.
+        """
+        processed_revision_id = self._fingerprints.revision_id
+        return bool(processed_revision_id) and processed_revision_id == self._collector.get_latest_revision_id()
+
+    def get_changed_tables_info(self) -> dict[str, dict[str, str]]:
+        """
+        Возвращает описания только тех листов, которые изменились с прошлой синхронизации.
+        Для удалённых листов возвращается пустой словарь.
+
+        Сначала сравнивается версия файла из метаданных Drive (один запрос files.get, он же нужен кэшу):
+        если она уже обработана, к Sheets API не обращаемся вовсе. Иначе читаются не листы целиком,
+        а только колонки с названиями полей и описаниями, и по их хешам выбираются изменившиеся листы.
+        Узнать изменившиеся листы без чтения нельзя: ревизии Drive относятся ко всему файлу,
+        а Sheets API не отдаёт время изменения отдельного листа.
+
+        Листы, которые прошлой синхронизации применить не удалось, возвращаются всегда. Если версия файла
+        уже обработана, читаются только они.
+        """
+        pending = self._fingerprints.pending
+        if self.revision_processed:
+            if not pending:
+                return {}
+            self._pending_data = self._read_tables(sorted(pending))
+            return {table: self._pending_data.get(table, {}) for table in sorted(pending)}
+
+        tables_data = self.get_info_about_tables_in_gs()
+        return {table: tables_data.get(table, {}) for table in sorted(self.changed_tables | pending)}
+
+    def commit_fingerprints(self, failed: Iterable[str] = ()) -> None:
+        """
+        Отмечает текущие описания и ревизию файла как обработанные.
+        Вызывается после того, как изменения применены. Если листы в этом запуске не читались
+        (версия файла уже была обработана и отложенных листов нет), отпечатки не трогаются.
+
+        Args:
+            failed: Листы, изменения которых применить не удалось. Они откладываются и повторяются
+                следующими синхронизациями без чтения остальной книги, пока не будут применены.
+        """
+        if self._tables_data_loaded:
+            self._fingerprints.save(self._collector.get_latest_revision_id(), self.tables_data, failed)
+        elif self._pending_data is not None:
+            self._fingerprints.save_pending(self._pending_data, failed)
+
+    def _get_file_info(self) -> Optional[dict[str, Any]]:
+        try:
+            return self._collector.get_file_info()
+        except Exception as e:
+            print(f'Не удалось получить метаданные файла, кэш не используется: {e}')
+            return None
 
     
     @property
@@ -27,17 +128,20 @@ class ClickhouseGSInfo:
             return False
         return True
     
+    @timed('gs.get_all_tables')
     def get_all_tables(self) -> list[str]:
         try:
-            list_with_tables = self._collector.get_data_from_original_source(list_name='Список таблиц')
-            if list_with_tables.empty:
+            # С листа нужна только колонка "Таблица"
+            list_with_tables = self._collector.get_columns_from_many_sources(
+                {'Список таблиц': ('Таблица',)}
+            )['Список таблиц']
+            if len(list_with_tables) < 2:
                 print('Лист с таблицами пуст. Завершаем работу')
                 return []
-            if 'Таблица' not in list_with_tables.columns:
+            if 'Таблица' not in list_with_tables[0]:
                 print('На листе с названиями таблиц отсутствует колонка "Таблица"')
                 return []
-            tables = list_with_tables['Таблица']
-            return list(tables)
+            return [table for table, in self._collector.iter_columns(list_with_tables, 'Таблица')]
         except KeyError:
             print('Лист "Список таблиц" отсутствует в ресурсе. Завершаем работу.')
             return []
@@ -47,31 +151,91 @@ class ClickhouseGSInfo:
     @staticmethod
     def update_info_about_table_in_metadata(table: dict[str, Any]):
         
-        url = f"http://localhost:8585/api/v1/tables/{table['id']}"
-        headers = {
-            "Authorization": "Bearer ваш_токен",
-            "Content-Type": "application/json"
-        }
-    
-        response = requests.put(url, headers=headers, json=table)
+        client = get_client(
+            os.environ.get('OPENMETADATA_HOST_PORT', 'http://localhost:8585'),
+            os.environ.get('OPENMETADATA_API_TOKEN', ''),
+        )
+        instrument_client(client)
+        response = client.put(f"/api/v1/tables/{table['id']}", json=table)
         response.raise_for_status()
     
         return response.json()
 
     
-    def get_info_about_tables_in_gs(self):
-        for table_name in self.tables:
+    def get_info_about_tables_in_gs(self, concurrent: bool = False):
+        """
+        Загружает описания колонок со всех листов из списка таблиц в tables_data.
+
+        Args:
+            concurrent: Читать листы параллельно по одному вместо values.batchGet.
+                Если batchGet завершился ошибкой, параллельная загрузка используется автоматически.
+        """
+        if self._tables_data_loaded:
+            return self.tables_data
+
+        self.tables_data = self._read_tables(self.tables, concurrent)
+        self._tables_data_loaded = True
+        self._cache.set(
+            self._collector.google_sheet_id,
+            self._file_info,
+            {'tables': self.tables, 'tables_data': self.tables_data},
+        )
+        return self.tables_data
+
+    def _load_tables(self, table_names: list[str], concurrent: bool) -> dict[str, Iterable[list]]:
+        """
+        Сырые значения листов. Длинные листы (больше ROWS_PAGE_SIZE строк по gridProperties.rowCount)
+        отдаются итератором ConcurrentSheetsLoader.iter_values: они читаются окнами при разборе, целиком в памяти
+        не лежат, а запросы окон идут через ограничитель частоты и повторы загрузчика.
+        """
+        loader = ConcurrentSheetsLoader(self._collector)
+        if not concurrent:
+            paged_tables = {table_name for table_name in table_names if self._collector.needs_paging(table_name)}
             try:
-                table_df = self._collector.get_data_from_original_source(table_name)
-            except KeyError:
+                # Вся книга забирается несколькими запросами batchGet вместо запроса на каждый лист,
+                # и с каждого листа - только колонка с названиями полей (называется как лист) и описания
+                tables_values = self._collector.get_columns_from_many_sources(
+                    {table_name: (table_name, 'Описание') for table_name in table_names if table_name not in paged_tables}
+                )
+            except HttpError as e:
+                print(f'Не удалось прочитать листы через batchGet ({e}), загружаем их параллельно по одному')
+            else:
+                return {
+                    table_name: loader.iter_values(table_name) if table_name in paged_tables
+                    else tables_values[table_name]
+                    for table_name in table_names
+                }
+
+        return loader.load(table_names)
+
+    def _read_tables(self, table_names: list[str], concurrent: bool = False) -> dict[str, dict[str, str]]:
+        """
+        Описания колонок с листов table_names. Отсутствующие и пустые листы в результат не попадают.
+        """
+        existing_tables = []
+        for table_name in table_names:
+            if table_name not in self._collector.existing_sheets:
                 print(f'Отсутствует лист "{table_name}", хотя он был в списке таблиц, продолжаем обработку')
                 continue
-            if table_df.empty:
-                continue
-                
-            self.tables_data[table_name] = {row[table_name]: row['Описание'] for _, row in table_df.iterrows()}
-        self.tables_data = {k: v for k, v in self.tables_data.items() if v}
-        return self.tables_data
+            existing_tables.append(table_name)
+
+        tables_data = {}
+        with timed('gs.load_tables'):
+            tables_values = self._load_tables(existing_tables, concurrent)
+        with timed('gs.parse_descriptions'):
+            for table_name, table_values in tables_values.items():
+                descriptions = self._parse_table_descriptions(table_name, table_values)
+                if descriptions:
+                    tables_data[table_name] = descriptions
+        return tables_data
+
+    def _parse_table_descriptions(self, table_name: str, table_values: Iterable[list]) -> Optional[dict[str, str]]:
+        try:
+            # Колонка с названиями полей называется так же, как лист
+            return dict(self._collector.iter_columns(table_values, table_name, 'Описание'))
+        except KeyError as e:
+            print(f'Пропускаем лист "{table_name}": {e}')
+            return None
 
 def get_all_info_for_ch_tables() -> ClickhouseGSInfo:
     gs_info = ClickhouseGSInfo('1W_WLS0chOvaxl_Cejt8pgF6cnUm8-4QkUdlYWPn1KGA')
@@ -0,0 +1,163 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import Optional
+
+MAGIC = b'GSSNAP\x00\x01'
+# string_count, table_count, entry_count, created_at
+HEADER = struct.Struct('<IIIQ')
+# Смещение строки в блоке строк; строк на одну больше, последнее смещение - конец блока
+OFFSET = struct.Struct('<I')
+# Таблица: индекс имени, первая запись, количество записей
+TABLE = struct.Struct('<III')
+# Запись: индекс имени колонки, индекс описания
+ENTRY = struct.Struct('<II')
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+def write_snapshot(tables_data: dict[str, dict[str, str]], path: str) -> int:
+    """
+    Записывает описания колонок {таблица: {колонка: описание}} в компактный бинарный файл.
+
+    Формат (little-endian): MAGIC, заголовок HEADER, таблица смещений строк, записи таблиц TABLE,
+    записи колонок ENTRY, блок строк в UTF-8. Каждая уникальная строка хранится один раз,
+    таблицы и колонки ссылаются на неё по индексу. Файл заменяется атомарно.
+
+    Returns:
+        Размер файла в байтах.
+    """
+    strings: dict[str, int] = {}
+
+    def string_index(value: str) -> int:
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    tables = []
+    entries = []
+    for table, columns in tables_data.items():
+        first_entry = len(entries)
+        for column, description in columns.items():
+            entries.append((string_index(str(column)), string_index(str(description))))
+        tables.append((string_index(str(table)), first_entry, len(entries) - first_entry))
+
+    blob = bytearray()
+    offsets = []
+    for value in strings:
+        offsets.append(len(blob))
+        blob += value.encode('utf-8')
+    offsets.append(len(blob))
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_suffix(target.suffix + '.tmp')
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(MAGIC)
+        snapshot_file.write(HEADER.pack(len(strings), len(tables), len(entries), int(time.time())))
+        snapshot_file.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+        snapshot_file.write(b''.join(TABLE.pack(*table) for table in tables))
+        snapshot_file.write(b''.join(ENTRY.pack(*entry) for entry in entries))
+        snapshot_file.write(blob)
+    os.replace(tmp_path, target)
+    return target.stat().st_size
+
+
+class DescriptionsSnapshot(Mapping):
+    """
+    Описания колонок из файла write_snapshot, открытого через mmap: {таблица: {колонка: описание}}.
+
+    Файл не читается целиком: при открытии разбирается только список таблиц, колонки таблицы
+    декодируются при обращении к ней и не кэшируются - их держит тот, кто читает (DescriptionIndex).
+    Строки декодируются один раз и переиспользуются, поэтому одинаковые описания в памяти - один объект.
+    После close() снимок читать нельзя.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise SnapshotFormatError(f'{path} is not a descriptions snapshot')
+        string_count, table_count, entry_count, self.created_at = HEADER.unpack_from(self._mmap, len(MAGIC))
+
+        self._offsets_start = len(MAGIC) + HEADER.size
+        self._tables_start = self._offsets_start + (string_count + 1) * OFFSET.size
+        self._entries_start = self._tables_start + table_count * TABLE.size
+        self._strings_start = self._entries_start + entry_count * ENTRY.size
+        self._strings: list[Optional[str]] = [None] * string_count
+        if self._strings_start + self._offset(string_count) != len(self._mmap):
+            raise SnapshotFormatError(f'{path} is truncated or corrupted')
+
+        self._tables: dict[str, tuple[int, int]] = {}
+        for table_index in range(table_count):
+            name_index, first_entry, count = TABLE.unpack_from(self._mmap, self._tables_start + table_index * TABLE.size)
+            self._tables[self._string(name_index)] = (first_entry, count)
+        self.entry_count = entry_count
+
+    def __getitem__(self, table: str) -> dict[str, str]:
+        first_entry, count = self._tables[table]
+        return {
+            self._string(column_index): self._string(description_index)
+            for column_index, description_index in ENTRY.iter_unpack(
+                self._mmap[self._entries_start + first_entry * ENTRY.size:
+                           self._entries_start + (first_entry + count) * ENTRY.size]
+            )
+        }
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def _offset(self, string_index: int) -> int:
+        return OFFSET.unpack_from(self._mmap, self._offsets_start + string_index * OFFSET.size)[0]
+
+    def _string(self, string_index: int) -> str:
+        value = self._strings[string_index]
+        if value is None:
+            start = self._strings_start + self._offset(string_index)
+            end = self._strings_start + self._offset(string_index + 1)
+            value = self._strings[string_index] = self._mmap[start:end].decode('utf-8')
+        return value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Снимок описаний колонок из google таблицы')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Выгрузить описания из google таблицы в файл')
+    export_parser.add_argument('--file-id', default='1W_WLS0chOvaxl_Cejt8pgF6cnUm8-4QkUdlYWPn1KGA')
+    export_parser.add_argument('--output', default=os.environ.get('GS_SNAPSHOT_PATH'), required=not os.environ.get('GS_SNAPSHOT_PATH'))
+    inspect_parser = subparsers.add_parser('inspect', help='Показать содержимое снимка')
+    inspect_parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        from .main import ClickhouseGSInfo
+
+        started_at = time.perf_counter()
+        tables_data = ClickhouseGSInfo(args.file_id).get_info_about_tables_in_gs()
+        size = write_snapshot(tables_data, args.output)
+        columns = sum(len(columns) for columns in tables_data.values())
+        print(f'Выгружено {len(tables_data)} таблиц, {columns} колонок в {args.output} '
+              f'({size} байт) за {time.perf_counter() - started_at:.1f} с')
+    else:
+        snapshot = DescriptionsSnapshot(args.path)
+        print(f'{args.path}: {len(snapshot)} таблиц, {snapshot.entry_count} колонок, '
+              f'создан {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.created_at))}')
+
+
+if __name__ == '__main__':
+    main()
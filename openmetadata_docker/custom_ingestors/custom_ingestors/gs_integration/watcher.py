@@ -0,0 +1,224 @@
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from ..instrumentation import instrument_client, metrics, timed_execute
+from ..om_client import OpenMetadataClient, get_client
+from .google_api import BaseGoogleApi
+
+PIPELINES_PATH = '/api/v1/services/ingestionPipelines'
+
+
+class DriveChangesWatcher(BaseGoogleApi):
+    """
+    Следит за изменениями google таблицы через ленту изменений Google Drive (changes.list) без вебхуков.
+
+    Токен страницы ленты хранится в файле и переживает перезапуски: после перезапуска обрабатываются
+    изменения, накопившиеся за время простоя. Правки в таблице обычно идут сериями, поэтому on_change
+    вызывается, когда файл изменился и за следующий опрос новых правок не было. Токен сохраняется только
+    после успешного on_change, так что при ошибке (исключении из on_change) изменение будет обработано повторно -
+    с экспоненциально растущей паузой (от poll_seconds до max_retry_seconds), чтобы постоянная ошибка
+    не превращалась в запросы к Sheets API и OpenMetadata на каждом опросе.
+    Пока таблица не меняется, кроме запроса к ленте Drive никаких обращений к Sheets API и OpenMetadata нет.
+
+    Args:
+        file_id: ID google таблицы.
+        on_change: Что делать при изменении таблицы.
+        state_path: Файл с токеном ленты, по умолчанию GS_WATCHER_STATE или <GS_CACHE_DIR>/<file_id>.changes_token.
+        poll_seconds: Интервал опроса ленты, по умолчанию GS_WATCHER_POLL_SECONDS или 30 секунд.
+        max_delay_seconds: Сколько максимум ждать конца серии правок, по умолчанию GS_WATCHER_MAX_DELAY_SECONDS или 300.
+        max_retry_seconds: Наибольшая пауза перед повтором упавшего on_change, по умолчанию
+            GS_WATCHER_MAX_RETRY_SECONDS или 3600.
+    """
+
+    CHANGES_FIELDS = 'nextPageToken,newStartPageToken,changes(fileId,removed)'
+
+    def __init__(
+        self,
+        file_id: str,
+        on_change: Callable[[], None],
+        state_path: Optional[str] = None,
+        poll_seconds: Optional[float] = None,
+        max_delay_seconds: Optional[float] = None,
+        max_retry_seconds: Optional[float] = None,
+    ):
+        super().__init__()
+        self.file_id = file_id
+        self.on_change = on_change
+        self.state_path = Path(
+            state_path or os.environ.get('GS_WATCHER_STATE')
+            or Path(os.environ.get('GS_CACHE_DIR', '/tmp/gs_cache')) / f'{file_id}.changes_token'
+        )
+        self.poll_seconds = poll_seconds if poll_seconds is not None else float(
+            os.environ.get('GS_WATCHER_POLL_SECONDS', 30)
+        )
+        # Если таблицу правят непрерывно, on_change всё равно вызывается не реже, чем раз в max_delay_seconds
+        self.max_delay_seconds = max_delay_seconds if max_delay_seconds is not None else float(
+            os.environ.get('GS_WATCHER_MAX_DELAY_SECONDS', 300)
+        )
+        self.max_retry_seconds = max_retry_seconds if max_retry_seconds is not None else float(
+            os.environ.get('GS_WATCHER_MAX_RETRY_SECONDS', 3600)
+        )
+        self._page_token: Optional[str] = None
+        self._saved_page_token: Optional[str] = None
+        self._pending_since: Optional[float] = None
+        self._retry_delay = 0.0
+        self._retry_at: Optional[float] = None
+
+    def run(self) -> None:
+        print(f'Слежу за изменениями google таблицы {self.file_id}, опрос раз в {self.poll_seconds:g} с')
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f'Ошибка при обработке изменений google таблицы: {e}')
+            time.sleep(self.poll_seconds)
+
+    def poll(self) -> bool:
+        """
+        Один опрос ленты изменений.
+
+        Returns:
+            True, если был вызван on_change.
+        """
+        token = self._page_token or self._load_page_token()
+        if token is None:
+            # Первый запуск: начинаем с текущего момента, прошлые изменения не нужны
+            self._page_token = self._get_start_page_token()
+            self._save_page_token(self._page_token)
+            return False
+
+        changed, self._page_token = self._read_changes(token)
+        now = time.monotonic()
+        if changed and self._pending_since is None:
+            self._pending_since = now
+        if self._pending_since is None:
+            self._save_page_token(self._page_token)
+            return False
+        if changed and now - self._pending_since < self.max_delay_seconds:
+            # Серия правок ещё идёт. Сохранённый токен остаётся до её начала,
+            # чтобы после перезапуска изменение не потерялось
+            return False
+        if self._retry_at is not None and now < self._retry_at:
+            return False
+
+        try:
+            self.on_change()
+        except Exception:
+            self._retry_delay = min(max(self._retry_delay * 2, self.poll_seconds), self.max_retry_seconds)
+            self._retry_at = now + self._retry_delay
+            raise
+        self._pending_since = None
+        self._retry_delay = 0.0
+        self._retry_at = None
+        self._save_page_token(self._page_token)
+        return True
+
+    def _read_changes(self, token: str) -> tuple[bool, str]:
+        drive_service = self.get_service('drive', 'v3')
+        changed = False
+        while True:
+            response = timed_execute(drive_service.changes().list(
+                pageToken=token,
+                pageSize=1000,
+                spaces='drive',
+                includeRemoved=True,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                fields=self.CHANGES_FIELDS,
+            ), 'drive.changes.list')
+            changed = changed or any(change.get('fileId') == self.file_id for change in response.get('changes', []))
+            if 'newStartPageToken' in response:
+                return changed, response['newStartPageToken']
+            token = response['nextPageToken']
+
+    def _get_start_page_token(self) -> str:
+        drive_service = self.get_service('drive', 'v3')
+        response = timed_execute(
+            drive_service.changes().getStartPageToken(supportsAllDrives=True, fields='startPageToken'),
+            'drive.changes.getStartPageToken',
+        )
+        return response['startPageToken']
+
+    def _load_page_token(self) -> Optional[str]:
+        try:
+            self._saved_page_token = self.state_path.read_text(encoding='utf-8').strip() or None
+        except OSError:
+            self._saved_page_token = None
+        return self._saved_page_token
+
+    def _save_page_token(self, token: str) -> None:
+        if token == self._saved_page_token:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        tmp_path.write_text(token, encoding='utf-8')
+        os.replace(tmp_path, self.state_path)
+        self._saved_page_token = token
+
+
+def trigger_pipeline(client: OpenMetadataClient, pipeline_fqn: str) -> None:
+    """
+    Запускает пайплайн ингестии OpenMetadata по FQN (service.pipeline), как create_ingestion.main.
+    """
+    response = client.get(f'{PIPELINES_PATH}/name/{pipeline_fqn}', params={'fields': 'id'})
+    response.raise_for_status()
+    response = client.post(f"{PIPELINES_PATH}/trigger/{response.json()['id']}")
+    response.raise_for_status()
+    print(f'Пайплайн {pipeline_fqn} запущен')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Следит за google таблицей описаний и при изменении синхронизирует описания или запускает ингестию'
+    )
+    parser.add_argument('--file-id', default='1W_WLS0chOvaxl_Cejt8pgF6cnUm8-4QkUdlYWPn1KGA')
+    parser.add_argument('--once', action='store_true', help='Один опрос ленты изменений и выход')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+    sync_parser = subparsers.add_parser('sync', help='Синхронизировать только описания (description_sync)')
+    sync_parser.add_argument('--service', required=True, help='Имя сервиса ClickHouse в OpenMetadata')
+    sync_parser.add_argument('--database', default='default', help='База данных сервиса в OpenMetadata')
+    sync_parser.add_argument('--schema', required=True, help='Схема (база ClickHouse) в OpenMetadata')
+    sync_parser.add_argument('--workers', type=int, default=8)
+    pipeline_parser = subparsers.add_parser('pipeline', help='Запустить пайплайн ингестии OpenMetadata')
+    pipeline_parser.add_argument('--pipeline', required=True, help='FQN пайплайна: <сервис>.<пайплайн>')
+    args = parser.parse_args()
+
+    client = get_client(
+        os.environ.get('OPENMETADATA_HOST_PORT', 'http://localhost:8585'),
+        os.environ.get('OPENMETADATA_API_TOKEN', ''),
+    )
+    instrument_client(client)
+
+    if args.action == 'sync':
+        from .description_sync import DescriptionSync
+        from .main import ClickhouseGSInfo
+
+        def on_change() -> None:
+            sync = DescriptionSync(ClickhouseGSInfo(args.file_id), client, args.service, args.database,
+                                   args.schema, args.workers)
+            report = sync.run(only_changed=True)
+            print(report)
+            for table_name, error in report.errors.items():
+                print(f'{table_name}: {error}')
+            metrics.export_textfile()
+            if report.failed:
+                # Токен ленты не сохраняется: упавшие листы отложены в отпечатках и повторятся после паузы.
+                # Таблицы, которых нет в OpenMetadata, не повторяются - описания им проставит ингестия
+                raise RuntimeError(f'Описания синхронизированы не для всех таблиц: {report}')
+    else:
+        def on_change() -> None:
+            trigger_pipeline(client, args.pipeline)
+            metrics.export_textfile()
+
+    watcher = DriveChangesWatcher(args.file_id, on_change)
+    if args.once:
+        watcher.poll()
+    else:
+        watcher.run()
+
+
+if __name__ == '__main__':
+    main()
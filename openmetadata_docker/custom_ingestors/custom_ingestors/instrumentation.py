@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ContextDecorator
+from pathlib import Path
+from typing import Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry не входит в зависимости, спаны пишутся только если он установлен
+    otel_trace = None
+
+
+class StageStats:
+    __slots__ = ('count', 'errors', 'total', 'max', 'latencies')
+
+    # Для перцентилей храним не больше стольких последних замеров на этап
+    MAX_SAMPLES = 10000
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.latencies: list[float] = []
+
+    def add(self, elapsed: float, failed: bool = False) -> None:
+        self.count += 1
+        self.errors += failed
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        if len(self.latencies) >= self.MAX_SAMPLES:
+            self.latencies[self.count % self.MAX_SAMPLES] = elapsed
+        else:
+            self.latencies.append(elapsed)
+
+    def percentile(self, share: float) -> float:
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * share))] if latencies else 0.0
+
+
+class Instrumentation:
+    """
+    Время этапов ингестии и счётчики исходящих HTTP-запросов на процесс.
+
+    Этапы замеряются через timed() - контекстный менеджер или декоратор. HTTP-запросы учитываются
+    через record_http() с разбивкой по сервису (google, openmetadata), эндпоинту и статусу.
+    Итоги пишутся в лог ингестии (log_summary) и, если задана переменная окружения
+    INGESTION_METRICS_TEXTFILE, в текстовый файл для textfile collector Prometheus (export_textfile).
+    Если установлен OpenTelemetry и задана INGESTION_OTEL_SPANS, каждый этап дополнительно пишется спаном.
+    """
+
+    def __init__(self):
+        self.stages: dict[str, StageStats] = defaultdict(StageStats)
+        self.http_calls: dict[tuple[str, str, int], StageStats] = defaultdict(StageStats)
+        self._lock = threading.Lock()
+        self.tracer = None
+        if otel_trace is not None and os.environ.get('INGESTION_OTEL_SPANS'):
+            self.tracer = otel_trace.get_tracer('custom_ingestors')
+
+    def timed(self, stage: str) -> 'StageTimer':
+        return StageTimer(stage, self)
+
+    def record_stage(self, stage: str, elapsed: float, failed: bool = False) -> None:
+        with self._lock:
+            self.stages[stage].add(elapsed, failed)
+
+    def record_http(self, service: str, endpoint: str, status: int, elapsed: float) -> None:
+        """
+        Args:
+            service: Внешний сервис: google, openmetadata.
+            endpoint: Шаблон эндпоинта без id, например sheets.values.batchGet или GET /api/v1/tables/{id}.
+            status: HTTP-статус ответа, 0 - ответа не было (ошибка соединения).
+        """
+        with self._lock:
+            self.http_calls[(service, endpoint, status)].add(elapsed, status == 0 or status >= 400)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages.clear()
+            self.http_calls.clear()
+
+    def summary(self) -> list[str]:
+        with self._lock:
+            lines = [
+                f'stage {stage}: {stats.count} calls, total {stats.total:.2f}s, p50 {stats.percentile(0.5) * 1000:.1f} ms, '
+                f'p99 {stats.percentile(0.99) * 1000:.1f} ms, max {stats.max * 1000:.1f} ms, errors {stats.errors}'
+                for stage, stats in sorted(self.stages.items())
+            ]
+            lines += [
+                f'http {service} {endpoint} {status}: {stats.count} calls, total {stats.total:.2f}s, '
+                f'p99 {stats.percentile(0.99) * 1000:.1f} ms'
+                for (service, endpoint, status), stats in sorted(self.http_calls.items())
+            ]
+        return lines
+
+    def log_summary(self, logger) -> None:
+        for line in self.summary():
+            logger.info(f'Instrumentation: {line}')
+
+    def export_textfile(self, path: Optional[str] = None) -> Optional[Path]:
+        """
+        Пишет метрики в формате Prometheus text exposition. Файл заменяется атомарно, чтобы
+        textfile collector не прочитал его наполовину записанным.
+        """
+        path = path or os.environ.get('INGESTION_METRICS_TEXTFILE')
+        if not path:
+            return None
+
+        lines = [
+            '# HELP custom_ingestors_stage_seconds_total Time spent in ingestion stage.',
+            '# TYPE custom_ingestors_stage_seconds_total counter',
+        ]
+        with self._lock:
+            stages = sorted(self.stages.items())
+            http_calls = sorted(self.http_calls.items())
+        for stage, stats in stages:
+            lines.append(f'custom_ingestors_stage_seconds_total{{stage="{stage}"}} {stats.total:.6f}')
+        lines += [
+            '# HELP custom_ingestors_stage_calls_total Number of ingestion stage executions.',
+            '# TYPE custom_ingestors_stage_calls_total counter',
+        ]
+        for stage, stats in stages:
+            lines.append(f'custom_ingestors_stage_calls_total{{stage="{stage}"}} {stats.count}')
+        lines += [
+            '# HELP custom_ingestors_http_requests_total Outbound HTTP requests.',
+            '# TYPE custom_ingestors_http_requests_total counter',
+        ]
+        for (service, endpoint, status), stats in http_calls:
+            labels = f'service="{service}",endpoint="{_escape(endpoint)}",status="{status}"'
+            lines.append(f'custom_ingestors_http_requests_total{{{labels}}} {stats.count}')
+        lines += [
+            '# HELP custom_ingestors_http_request_seconds_total Time spent in outbound HTTP requests.',
+            '# TYPE custom_ingestors_http_request_seconds_total counter',
+        ]
+        for (service, endpoint, status), stats in http_calls:
+            labels = f'service="{service}",endpoint="{_escape(endpoint)}",status="{status}"'
+            lines.append(f'custom_ingestors_http_request_seconds_total{{{labels}}} {stats.total:.6f}')
+
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_suffix(target.suffix + '.tmp')
+        tmp_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        os.replace(tmp_path, target)
+        return target
+
+
+class StageTimer(ContextDecorator):
+    """
+    Замер этапа. Исключение внутри этапа учитывается как ошибка и пробрасывается дальше.
+    """
+
+    def __init__(self, stage: str, instrumentation: Optional[Instrumentation] = None):
+        self.stage = stage
+        self.instrumentation = instrumentation
+        self._local = threading.local()
+
+    def __enter__(self):
+        instrumentation = self.instrumentation or metrics
+        span = None
+        if instrumentation.tracer is not None:
+            span = instrumentation.tracer.start_as_current_span(self.stage)
+            span.__enter__()
+        # Один объект timed может использоваться как декоратор из нескольких потоков и рекурсивно
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append((time.perf_counter(), span))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        started_at, span = self._local.stack.pop()
+        (self.instrumentation or metrics).record_stage(
+            self.stage, time.perf_counter() - started_at, failed=exc_type is not None
+        )
+        if span is not None:
+            span.__exit__(exc_type, exc_value, traceback)
+        return False
+
+
+def timed(stage: str) -> StageTimer:
+    """
+    Замер этапа в общих метриках: `with timed('gs.get_all_tables'):` или декоратор `@timed('gs.get_all_tables')`.
+    """
+    return StageTimer(stage)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def timed_execute(request, endpoint: str, **kwargs):
+    """
+    Выполняет запрос googleapiclient и учитывает его в метриках HTTP с реальным статусом ответа.
+    """
+    started_at = time.perf_counter()
+    try:
+        response = request.execute(**kwargs)
+    except Exception as exc:
+        status = getattr(getattr(exc, 'resp', None), 'status', 0)
+        metrics.record_http('google', endpoint, int(status or 0), time.perf_counter() - started_at)
+        raise
+    metrics.record_http('google', endpoint, 200, time.perf_counter() - started_at)
+    return response
+
+
+def instrument_client(client) -> None:
+    """
+    Подписывает метрики на запросы клиента OpenMetadata (om_client.OpenMetadataClient).
+    """
+    if record_openmetadata_request not in client.metrics.listeners:
+        client.metrics.listeners.append(record_openmetadata_request)
+
+
+def record_openmetadata_request(method: str, endpoint: str, status: int, elapsed: float) -> None:
+    metrics.record_http('openmetadata', f'{method} {endpoint}', status, elapsed)
+
+
+# Общие метрики процесса ингестии
+metrics = Instrumentation()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from metadata.utils.logger import ingestion_logger
+
+logger = ingestion_logger()
+
+
+class TableFingerprintStore:
+    """
+    Отпечатки таблиц, отправленных в OpenMetadata на прошлых запусках, по одному json-файлу на сервис.
+
+    Отпечаток - хеш итогового CreateTableRequest (колонки, типы, описания из БД и GS) вместе с
+    metadata_modification_time таблицы в ClickHouse. Если отпечаток не изменился, таблицу можно не отправлять.
+
+    Вместе с отпечатком хранится sourceHash, который раннер OpenMetadata посчитал для отправленного запроса.
+    Таблица считается неизменной, только если и отпечаток совпал, и сервер хранит тот же sourceHash:
+    если запись в sink не удалась, на сервере остался прежний хеш, и таблица отправится снова.
+    Отпечаток отправленной таблицы сохраняется только после confirm - когда раннер обработал запрос.
+    Каталог задаётся переменной окружения TABLE_FINGERPRINTS_DIR (по умолчанию /tmp/table_fingerprints).
+    """
+
+    def __init__(self, service_name: str, fingerprints_dir: Optional[str] = None):
+        fingerprints_dir = Path(fingerprints_dir or os.environ.get('TABLE_FINGERPRINTS_DIR', '/tmp/table_fingerprints'))
+        self.path = fingerprints_dir / f'{service_name}.json'
+        # FQN таблицы -> (отпечаток, sourceHash на сервере)
+        self._previous: dict[str, tuple[str, str]] = self._load()
+        self._current: dict[str, tuple[str, str]] = {}
+        self._pending: dict[str, str] = {}
+        # Таблицы проверяются и подтверждаются из потоков раннера
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def compute(table_request_json: str, metadata_modification_time: Optional[str]) -> str:
+        payload = f'{metadata_modification_time or ""}\n{table_request_json}'
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def is_unchanged(self, table_fqn: str, fingerprint: str, server_source_hash: Optional[str]) -> bool:
+        """
+        Сообщает, совпадает ли отпечаток таблицы с прошлым, а sourceHash таблицы на сервере - с записанным
+        прошлым запуском. Неизменная таблица сохраняется за текущий запуск, остальные ждут confirm.
+        """
+        with self._lock:
+            previous = self._previous.get(table_fqn)
+            if server_source_hash is not None and previous == (fingerprint, server_source_hash):
+                self._current[table_fqn] = previous
+                return True
+            self._pending[table_fqn] = fingerprint
+            return False
+
+    def confirm(self, table_fqn: str, source_hash: Optional[str]) -> None:
+        """
+        Отмечает, что раннер обработал запрос таблицы с sourceHash source_hash: её отпечаток будет сохранён.
+        """
+        with self._lock:
+            fingerprint = self._pending.pop(table_fqn, None)
+            if fingerprint is not None and source_hash is not None:
+                self._current[table_fqn] = (fingerprint, source_hash)
+
+    @property
+    def unconfirmed(self) -> int:
+        """
+        Сколько отправленных таблиц раннер так и не подтвердил.
+        """
+        with self._lock:
+            return len(self._pending)
+
+    def save(self) -> None:
+        """
+        Сохраняет отпечатки таблиц, встреченных в текущем запуске и не требующих повторной отправки.
+        Таблицы, которых больше нет, и неподтверждённые забываются.
+        """
+        with self._lock:
+            current = dict(self._current)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as fingerprints_file:
+                json.dump(current, fingerprints_file)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            logger.warning(f"Failed to save table fingerprints to {self.path}: {exc}")
+
+    def _load(self) -> dict[str, tuple[str, str]]:
+        try:
+            with open(self.path, encoding='utf-8') as fingerprints_file:
+                data = json.load(fingerprints_file)
+        except (OSError, ValueError):
+            return {}
+        # Файл прошлого формата (только отпечатки, без sourceHash) не подходит: такие таблицы отправятся заново
+        return {table_fqn: tuple(entry) for table_fqn, entry in data.items() if isinstance(entry, list) and len(entry) == 2}
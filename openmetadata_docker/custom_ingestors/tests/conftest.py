@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Пакет custom_ingestors импортируется из исходников, без установки (pip install -e .)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
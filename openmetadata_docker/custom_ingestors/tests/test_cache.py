@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+from custom_ingestors.gs_integration.cache import SheetFingerprints, SheetsCache
+
+FILE_INFO = {'modifiedTime': '2024-01-01T00:00:00Z', 'version': '10'}
+
+
+def test_build_key_depends_on_revision():
+    key = SheetsCache.build_key('sheet', FILE_INFO)
+
+    assert key.startswith('sheet-')
+    assert key == SheetsCache.build_key('sheet', dict(FILE_INFO))
+    assert key != SheetsCache.build_key('sheet', {**FILE_INFO, 'version': '11'})
+    assert key != SheetsCache.build_key('sheet', {**FILE_INFO, 'modifiedTime': '2024-01-02T00:00:00Z'})
+    assert key != SheetsCache.build_key('other', FILE_INFO)
+
+
+def test_get_returns_data_for_current_revision_only(tmp_path):
+    cache = SheetsCache(cache_dir=str(tmp_path))
+    cache.set('sheet', FILE_INFO, {'tables': ['a']})
+
+    assert cache.get('sheet', FILE_INFO) == {'tables': ['a']}
+    assert cache.get('sheet', {**FILE_INFO, 'version': '11'}) is None
+    assert cache.get('sheet', None) is None
+    assert cache.stats == {'hits': 1, 'misses': 2}
+
+
+def test_set_replaces_previous_revision(tmp_path):
+    cache = SheetsCache(cache_dir=str(tmp_path))
+    cache.set('sheet', FILE_INFO, {'tables': ['a']})
+    cache.set('sheet', {**FILE_INFO, 'version': '11'}, {'tables': ['b']})
+    cache.set('other', FILE_INFO, {'tables': ['c']})
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([
+        f"{SheetsCache.build_key('sheet', {**FILE_INFO, 'version': '11'})}.json",
+        f"{SheetsCache.build_key('other', FILE_INFO)}.json",
+    ])
+
+
+def test_get_drops_expired_entry(tmp_path):
+    cache = SheetsCache(cache_dir=str(tmp_path), ttl_seconds=60)
+    cache.set('sheet', FILE_INFO, {'tables': ['a']})
+    path = tmp_path / f"{SheetsCache.build_key('sheet', FILE_INFO)}.json"
+    expired = time.time() - 120
+    os.utime(path, (expired, expired))
+
+    assert cache.get('sheet', FILE_INFO) is None
+    assert not path.exists()
+
+
+def test_evict_removes_oldest_entries_over_size_limit(tmp_path):
+    cache = SheetsCache(cache_dir=str(tmp_path), max_size_bytes=10 ** 6)
+    now = time.time()
+    for age, name in enumerate(['newest', 'middle', 'oldest']):
+        cache.set(name, FILE_INFO, {'payload': 'x' * 1000})
+        path = tmp_path / f"{SheetsCache.build_key(name, FILE_INFO)}.json"
+        os.utime(path, (now - age * 10, now - age * 10))
+
+    cache.max_size_bytes = 2500
+    cache.evict()
+
+    assert cache.get('oldest', FILE_INFO) is None
+    assert cache.get('middle', FILE_INFO) is not None
+    assert cache.get('newest', FILE_INFO) is not None
+
+
+def test_fingerprints_report_changed_and_deleted_sheets(tmp_path):
+    fingerprints = SheetFingerprints('sheet', str(tmp_path))
+    fingerprints.save('1', {'a': {'x': '1'}, 'b': {'y': '2'}, 'c': {'z': '3'}})
+
+    assert fingerprints.changed({'a': {'x': '1'}, 'b': {'y': 'changed'}, 'd': {}}) == {'b', 'c', 'd'}
+    # Порядок ключей не влияет на хеш
+    assert SheetFingerprints.hash_content({'x': 1, 'y': 2}) == SheetFingerprints.hash_content({'y': 2, 'x': 1})
+
+
+def test_fingerprints_keep_pending_sheets_with_revision(tmp_path):
+    fingerprints = SheetFingerprints('sheet', str(tmp_path), consumer='sync')
+    fingerprints.save('1', {'a': {'x': '1'}, 'b': {'y': '2'}}, pending=['b'])
+
+    loaded = SheetFingerprints('sheet', str(tmp_path), consumer='sync')
+    assert loaded.revision_id == '1'
+    assert loaded.pending == {'b'}
+    assert SheetFingerprints('sheet', str(tmp_path)).revision_id is None
+
+    loaded.save_pending({'b': {'y': '3'}})
+    loaded = SheetFingerprints('sheet', str(tmp_path), consumer='sync')
+    assert loaded.revision_id == '1'
+    assert loaded.pending == set()
+    assert loaded.changed({'a': {'x': '1'}, 'b': {'y': '3'}}) == set()
+
+
+def test_fingerprints_forget_deleted_pending_sheet(tmp_path):
+    fingerprints = SheetFingerprints('sheet', str(tmp_path))
+    fingerprints.save('1', {'a': {'x': '1'}, 'b': {'y': '2'}}, pending=['b'])
+
+    fingerprints.save_pending({}, pending=[])
+
+    with open(fingerprints.path, encoding='utf-8') as fingerprints_file:
+        assert json.load(fingerprints_file)['sheets'].keys() == {'a'}
+    assert [path.name for path in tmp_path.iterdir()] == ['sheet.fingerprints']
@@ -0,0 +1,76 @@
+import random
+import threading
+import time
+
+from metadata.generated.schema.entity.data.table import TableType
+from metadata.ingestion.api.models import Either
+from metadata.ingestion.models.topology import TopologyContextManager
+from metadata.ingestion.source.database.clickhouse.metadata import ClickhouseSource
+from metadata.ingestion.source.database.database_service import DatabaseServiceTopology
+
+from custom_ingestors.clickhouse import ClickhouseCustomIngestor
+
+TABLES = [(f'table_{i:02d}', TableType.Regular) for i in range(40)]
+
+
+class PreparedTablesIngestor(ClickhouseCustomIngestor):
+    """
+    Источник без ClickHouse и OpenMetadata: таблица готовится случайное время, запрос - её имя и поток.
+    """
+
+    def __init__(self, ingestion_threads: int):
+        self.ingestion_threads = ingestion_threads
+        self._table_pool = None
+        self._prepared_tables = {}
+        self.context = TopologyContextManager(DatabaseServiceTopology())
+        self.context.get().database_schema = 'events'
+        self.prepared_in: dict[str, str] = {}
+
+    def _table_requests(self, table_name_and_type):
+        time.sleep(random.uniform(0, 0.01))
+        table_name = table_name_and_type[0]
+        assert self.context.get().database_schema == 'events'
+        self.prepared_in[table_name] = threading.current_thread().name
+        yield Either(right=table_name), None
+
+
+def run_schema(ingestor: PreparedTablesIngestor) -> list[str]:
+    # Как раннер OpenMetadata: следующее имя таблицы запрашивается после обработки предыдущей
+    emitted = []
+    for table_name_and_type in ingestor.get_tables_name_and_type():
+        emitted.extend(either.right for either in ingestor.yield_table(table_name_and_type))
+    return emitted
+
+
+def test_parallel_tables_keep_sequential_order(monkeypatch):
+    monkeypatch.setattr(ClickhouseSource, 'get_tables_name_and_type', lambda self: iter(TABLES))
+
+    sequential = PreparedTablesIngestor(ingestion_threads=1)
+    parallel = PreparedTablesIngestor(ingestion_threads=4)
+    try:
+        expected = run_schema(sequential)
+        assert expected == [table_name for table_name, _ in TABLES]
+        for _ in range(3):
+            assert run_schema(parallel) == expected
+    finally:
+        if parallel._table_pool is not None:
+            parallel._table_pool.shutdown()
+
+    assert set(sequential.prepared_in.values()) == {threading.main_thread().name}
+    assert all(thread_name.startswith('table') for thread_name in parallel.prepared_in.values())
+    assert not parallel._prepared_tables
+
+
+def test_interrupted_schema_drops_prepared_tables(monkeypatch):
+    monkeypatch.setattr(ClickhouseSource, 'get_tables_name_and_type', lambda self: iter(TABLES))
+
+    ingestor = PreparedTablesIngestor(ingestion_threads=4)
+    tables = ingestor.get_tables_name_and_type()
+    try:
+        first = next(tables)
+        assert [either.right for either in ingestor.yield_table(first)] == [first[0]]
+        tables.close()
+    finally:
+        ingestor._table_pool.shutdown()
+
+    assert not ingestor._prepared_tables
@@ -0,0 +1,37 @@
+from custom_ingestors.description_index import DEFAULT_COMMENT, DescriptionIndex, format_description
+from custom_ingestors.gs_integration.description_sync import DescriptionSync
+
+INDEX = DescriptionIndex({'hits': {'user_id': 'ID пользователя', 'url': 'Адрес страницы'}})
+
+
+def test_build_patch_touches_only_changed_columns():
+    table = {
+        'name': 'hits',
+        'columns': [
+            {'name': 'user_id', 'description': format_description('user id', 'ID пользователя')},
+            {'name': 'url', 'description': format_description('page url', 'Старое описание')},
+            {'name': 'ts'},
+        ],
+    }
+
+    assert DescriptionSync.build_patch(table, INDEX) == [
+        {'op': 'replace', 'path': '/columns/1/description', 'value': format_description('page url', 'Адрес страницы')},
+        {'op': 'add', 'path': '/columns/2/description', 'value': format_description(DEFAULT_COMMENT, DEFAULT_COMMENT)},
+    ]
+
+
+def test_build_patch_keeps_foreign_description_as_database_comment():
+    table = {'name': 'HITS', 'columns': [{'name': 'URL', 'description': 'Комментарий из ClickHouse'}]}
+
+    assert DescriptionSync.build_patch(table, INDEX) == [{
+        'op': 'replace',
+        'path': '/columns/0/description',
+        'value': format_description('Комментарий из ClickHouse', 'Адрес страницы'),
+    }]
+
+
+def test_build_patch_is_empty_for_synced_table():
+    table = {'name': 'hits', 'columns': [{'name': 'user_id', 'description': format_description('x', 'ID пользователя')}]}
+
+    assert DescriptionSync.build_patch(table, INDEX) == []
+    assert DescriptionSync.build_patch({'name': 'hits', 'columns': None}, INDEX) == []
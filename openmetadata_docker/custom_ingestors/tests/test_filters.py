@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+from custom_ingestors.filters import CompiledPattern, FilterSet
+
+
+def test_patterns_are_combined_into_one_expression():
+    pattern = CompiledPattern(includes=['^events$', 'logs_.*'])
+
+    assert len(pattern._includes) == 1
+    assert not pattern.is_filtered('events')
+    assert not pattern.is_filtered('LOGS_2024')
+    assert pattern.is_filtered('events_old')
+    assert pattern.is_filtered('metrics')
+
+
+@pytest.mark.parametrize('patterns, name, matches', [
+    # Номера групп сдвигаются при склейке шаблонов
+    ([r'(a)\1', r'(b)\1'], 'bb', True),
+    ([r'(?P<x>a)(?P=x)', 'c'], 'aa', True),
+    # Глобальный флаг допустим только в начале выражения
+    (['x', '(?i)tmp_.*'], 'TMP_table', True),
+    (['x', '(?i)tmp_.*'], 'table', False),
+])
+def test_patterns_fall_back_to_one_by_one(patterns, name, matches):
+    pattern = CompiledPattern(excludes=patterns)
+
+    assert len(pattern._excludes) == len(patterns)
+    assert pattern.is_filtered(name) is matches
+
+
+def test_includes_take_precedence_over_excludes():
+    pattern = CompiledPattern(includes=['events'], excludes=['events'])
+
+    assert not pattern.is_filtered('events')
+    assert pattern.is_filtered('logs')
+
+
+def test_empty_pattern_filters_nothing():
+    pattern = CompiledPattern.from_pattern(None)
+
+    assert not pattern
+    assert not pattern.is_filtered('anything')
+
+
+def test_filter_set_from_config():
+    config = {
+        'databaseFilterPattern': {'includes': [r'clickhouse\.default$']},
+        'schemaFilterPattern': SimpleNamespace(includes=None, excludes=[r'.*\.system$']),
+        'tableFilterPattern': {'excludes': [r'clickhouse\.default\.events\.tmp_.*']},
+        'useFqnForFiltering': True,
+    }
+    filters = FilterSet.from_config(config)
+
+    assert not filters.filter_database('clickhouse', 'default')
+    assert filters.filter_database('clickhouse', 'other')
+    assert filters.filter_schema('clickhouse', 'default', 'system')
+    assert not filters.filter_schema('clickhouse', 'default', 'events')
+    assert filters.filter_table('clickhouse', 'default', 'events', 'tmp_1')
+    assert not filters.filter_table('clickhouse', 'default', 'logs', 'tmp_1')
+
+
+def test_filter_set_matches_names_without_fqn():
+    filters = FilterSet.from_config({'tableFilterPattern': {'excludes': ['tmp_.*']}})
+
+    assert filters.filter_table('clickhouse', 'default', 'events', 'tmp_1')
+    assert not filters.filter_table('clickhouse', 'default', 'events', 'hits')
+    assert not FilterSet.from_config({'tableFilterPattern': {'excludes': ['tmp_.*']}}, use_fqn=True).filter_table(
+        'clickhouse', 'default', 'events', 'tmp_1'
+    )
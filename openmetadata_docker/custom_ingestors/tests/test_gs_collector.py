@@ -0,0 +1,53 @@
+from urllib.parse import quote
+
+import pytest
+
+from custom_ingestors.gs_integration.gs_collector import GoogleSheetsCollector
+
+
+@pytest.fixture
+def collector():
+    # Разбиение диапазонов и A1-нотация не обращаются к Google API
+    return object.__new__(GoogleSheetsCollector)
+
+
+def url_length(chunk):
+    return sum(len('&ranges=') + len(quote(a1_range, safe='')) for _, a1_range in chunk)
+
+
+def test_chunk_ranges_splits_by_range_count(collector, monkeypatch):
+    monkeypatch.setattr(GoogleSheetsCollector, 'BATCH_MAX_RANGES', 3)
+    ranges = [(i, f"'Лист {i}'!A:B") for i in range(7)]
+
+    chunks = list(collector._chunk_ranges(ranges))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [item for chunk in chunks for item in chunk] == ranges
+
+
+def test_chunk_ranges_splits_by_url_length(collector, monkeypatch):
+    monkeypatch.setattr(GoogleSheetsCollector, 'BATCH_MAX_URL_LENGTH', 200)
+    ranges = [(i, f"'Очень длинное название листа {i}'!A:B") for i in range(10)]
+
+    chunks = list(collector._chunk_ranges(ranges))
+
+    assert len(chunks) > 1
+    assert all(url_length(chunk) <= 200 for chunk in chunks)
+    assert [item for chunk in chunks for item in chunk] == ranges
+
+
+def test_chunk_ranges_keeps_oversized_range_alone(collector, monkeypatch):
+    monkeypatch.setattr(GoogleSheetsCollector, 'BATCH_MAX_URL_LENGTH', 10)
+    ranges = [('a', 'Sheet1!A:B'), ('b', 'Sheet2!A:B')]
+
+    assert list(collector._chunk_ranges(ranges)) == [[ranges[0]], [ranges[1]]]
+    assert list(collector._chunk_ranges([])) == []
+
+
+@pytest.mark.parametrize('index, letter', [(0, 'A'), (25, 'Z'), (26, 'AA'), (51, 'AZ'), (701, 'ZZ'), (702, 'AAA')])
+def test_column_letter(index, letter):
+    assert GoogleSheetsCollector._column_letter(index) == letter
+
+
+def test_quote_sheet_name():
+    assert GoogleSheetsCollector._quote_sheet_name("Лист Bob's") == "'Лист Bob''s'"
@@ -0,0 +1,24 @@
+"""
+Скрипты openmetadata/ и пакет custom_ingestors разворачиваются отдельно (скрипты - без openmetadata-ingestion,
+пакет - в образе ингестии), поэтому общие модули лежат в обоих деревьях. Копии должны совпадать байт в байт.
+"""
+from pathlib import Path
+
+import pytest
+
+PACKAGE_DIR = Path(__file__).resolve().parents[1] / 'custom_ingestors'
+SCRIPTS_DIR = Path(__file__).resolve().parents[3] / 'openmetadata'
+
+MIRRORED_MODULES = [
+    'om_client.py',
+    'filters.py',
+    'gs_integration/table_resolver.py',
+]
+
+
+@pytest.mark.skipif(not SCRIPTS_DIR.is_dir(), reason='openmetadata/ scripts are not in this checkout')
+@pytest.mark.parametrize('module', MIRRORED_MODULES)
+def test_mirrored_module_is_identical(module):
+    assert (PACKAGE_DIR / module).read_bytes() == (SCRIPTS_DIR / module).read_bytes(), (
+        f'{module} differs between custom_ingestors/ and openmetadata/, apply the change to both copies'
+    )
@@ -0,0 +1,56 @@
+from custom_ingestors.table_fingerprints import TableFingerprintStore
+
+TABLE = 'clickhouse.default.events.hits'
+
+
+def test_compute_depends_on_request_and_modification_time():
+    fingerprint = TableFingerprintStore.compute('{"name": "hits"}', '2024-01-01 00:00:00')
+
+    assert fingerprint == TableFingerprintStore.compute('{"name": "hits"}', '2024-01-01 00:00:00')
+    assert fingerprint != TableFingerprintStore.compute('{"name": "hits", "description": "x"}', '2024-01-01 00:00:00')
+    assert fingerprint != TableFingerprintStore.compute('{"name": "hits"}', '2024-01-02 00:00:00')
+
+
+def test_confirmed_table_is_unchanged_on_next_run(tmp_path):
+    store = TableFingerprintStore('clickhouse', str(tmp_path))
+    assert not store.is_unchanged(TABLE, 'fp', None)
+    store.confirm(TABLE, 'source-hash')
+    store.save()
+
+    store = TableFingerprintStore('clickhouse', str(tmp_path))
+    assert store.is_unchanged(TABLE, 'fp', 'source-hash')
+    assert not store.is_unchanged(TABLE, 'other-fp', 'source-hash')
+
+
+def test_table_is_resent_when_server_hash_differs(tmp_path):
+    store = TableFingerprintStore('clickhouse', str(tmp_path))
+    store.is_unchanged(TABLE, 'fp', None)
+    store.confirm(TABLE, 'source-hash')
+    store.save()
+
+    store = TableFingerprintStore('clickhouse', str(tmp_path))
+    # Запись в sink не удалась: на сервере остался прежний sourceHash (или таблицы нет)
+    assert not store.is_unchanged(TABLE, 'fp', 'previous-hash')
+    assert not store.is_unchanged(TABLE, 'fp', None)
+
+
+def test_unconfirmed_tables_are_not_saved(tmp_path):
+    store = TableFingerprintStore('clickhouse', str(tmp_path))
+    store.is_unchanged(TABLE, 'fp', None)
+    store.is_unchanged('clickhouse.default.events.visits', 'fp', None)
+    store.confirm('clickhouse.default.events.visits', 'source-hash')
+
+    assert store.unconfirmed == 1
+    store.save()
+
+    store = TableFingerprintStore('clickhouse', str(tmp_path))
+    assert not store.is_unchanged(TABLE, 'fp', 'source-hash')
+    assert store.is_unchanged('clickhouse.default.events.visits', 'fp', 'source-hash')
+
+
+def test_old_format_entries_are_ignored(tmp_path):
+    store = TableFingerprintStore('clickhouse', str(tmp_path))
+    store.path.parent.mkdir(parents=True, exist_ok=True)
+    store.path.write_text(f'{{"{TABLE}": "fp"}}', encoding='utf-8')
+
+    assert not TableFingerprintStore('clickhouse', str(tmp_path)).is_unchanged(TABLE, 'fp', 'fp')